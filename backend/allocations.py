@@ -0,0 +1,254 @@
+import numpy as np
+
+CELL_TEMPLATE = "(%s::integer, %s::integer, %s::integer, %s::integer, %s::text, %s::integer)"
+
+
+def _parse_cell(cell):
+    """Return (partner_id, loi, audience_id, country, allocation) or raise ValueError."""
+    try:
+        partner_id = int(cell['partner_id'])
+        loi = int(cell['loi'])
+        audience_id = int(cell['audience_id'])
+        country = str(cell['country'])
+        allocation = cell.get('allocation')
+        allocation = 0 if allocation in ['', None] else int(allocation)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cell: {e}")
+    if allocation < 0:
+        raise ValueError("Allocation cannot be negative")
+    return partner_id, loi, audience_id, country, allocation
+
+
+def _total_status(total):
+    if total['is_best_efforts']:
+        return 'best_efforts'
+    if total['allocated'] > total['required']:
+        return 'over'
+    if total['allocated'] < total['required']:
+        return 'under'
+    return 'ok'
+
+
+def apply_allocations(cur, bid_id, cells):
+    """Apply many allocation cells in one statement.
+
+    Each cell is {partner_id, loi, audience_id, country, allocation}. Returns
+    {'cells': [...], 'totals': [...]}. Every input cell gets a status of
+    'updated', 'not_found', 'invalid' or 'duplicate'; totals compares the
+    allocation summed across partners, per audience/country/LOI, with the
+    required sample_size as it stands after the update.
+    """
+    results = [None] * len(cells)
+    parsed = {}
+    for idx, cell in enumerate(cells):
+        try:
+            partner_id, loi, audience_id, country, allocation = _parse_cell(cell)
+        except ValueError as e:
+            results[idx] = {**cell, 'status': 'invalid', 'error': str(e)}
+            continue
+        # The same cell sent twice: the later value wins
+        key = (partner_id, loi, audience_id, country)
+        if key in parsed:
+            earlier = parsed[key]
+            results[earlier[0]] = {**cells[earlier[0]], 'status': 'duplicate'}
+        parsed[key] = (idx, partner_id, loi, audience_id, country, allocation)
+    rows = sorted(parsed.values())
+
+    totals = []
+    if rows:
+        values = ', '.join(
+            cur.mogrify(CELL_TEMPLATE, row).decode('utf-8') for row in rows)
+        cur.execute(
+            f"""
+            WITH changes (idx, partner_id, loi, audience_id, country, allocation) AS (
+                VALUES {values.replace('%', '%%')}
+            ),
+            updated AS (
+                UPDATE partner_audience_responses par
+                SET allocation = c.allocation
+                FROM changes c
+                JOIN partner_responses pr ON (
+                    pr.partner_id = c.partner_id
+                    AND pr.loi = c.loi
+                )
+                WHERE pr.bid_id = %s
+                AND par.partner_response_id = pr.id
+                AND par.audience_id = c.audience_id
+                AND par.country = c.country
+                RETURNING c.idx, par.id, par.allocation
+            ),
+            cells AS (
+                -- The outer query sees the pre-update snapshot, so fold the
+                -- new values in by hand
+                SELECT
+                    par.audience_id,
+                    par.country,
+                    pr.loi,
+                    COALESCE(u.allocation, par.allocation, 0) as allocation
+                FROM partner_audience_responses par
+                JOIN partner_responses pr ON par.partner_response_id = pr.id
+                LEFT JOIN updated u ON u.id = par.id
+                WHERE pr.bid_id = %s
+            )
+            SELECT
+                (SELECT json_agg(json_build_object('idx', c.idx, 'id', u.id))
+                 FROM changes c
+                 LEFT JOIN updated u ON u.idx = c.idx) as cells,
+                (SELECT json_agg(json_build_object(
+                    'audience_id', bac.audience_id,
+                    'country', bac.country,
+                    'loi', t.loi,
+                    'required', bac.sample_size,
+                    'is_best_efforts', bac.is_best_efforts,
+                    'allocated', t.allocated
+                 ) ORDER BY bac.audience_id, bac.country, t.loi)
+                 FROM (
+                    SELECT x.audience_id, x.country, x.loi,
+                           SUM(x.allocation) as allocated
+                    FROM cells x
+                    WHERE (x.audience_id, x.country, x.loi) IN (
+                        SELECT audience_id, country, loi FROM changes
+                    )
+                    GROUP BY x.audience_id, x.country, x.loi
+                 ) t
+                 JOIN bid_audience_countries bac ON (
+                    bac.audience_id = t.audience_id
+                    AND bac.country = t.country
+                 )) as totals
+        """, (bid_id, bid_id))
+        cell_rows, totals = cur.fetchone()
+        totals = totals or []
+
+        updated_ids = {row['idx']: row['id'] for row in cell_rows or []}
+        for idx, partner_id, loi, audience_id, country, allocation in rows:
+            par_id = updated_ids.get(idx)
+            results[idx] = {
+                'partner_id': partner_id,
+                'loi': loi,
+                'audience_id': audience_id,
+                'country': country,
+                'allocation': allocation,
+                'id': par_id,
+                'status': 'updated' if par_id else 'not_found'
+            }
+
+    for total in totals:
+        total['status'] = _total_status(total)
+
+    return {'cells': results, 'totals': totals}
+
+
+def fetch_solver_cells(cur, bid_id, loi=None):
+    """Every recorded partner cell with its audience/country requirement."""
+    cur.execute(
+        """
+        SELECT
+            pr.partner_id,
+            pr.loi,
+            par.audience_id,
+            par.country,
+            COALESCE(par.commitment, 0),
+            COALESCE(par.commitment_type, 'fixed') = 'be_max'
+                OR COALESCE(par.is_best_efforts, false),
+            COALESCE(par.cpi, 0),
+            bac.sample_size,
+            COALESCE(bac.is_best_efforts, false)
+        FROM partner_audience_responses par
+        JOIN partner_responses pr ON par.partner_response_id = pr.id
+        JOIN bid_audience_countries bac ON (
+            bac.audience_id = par.audience_id
+            AND bac.country = par.country
+        )
+        WHERE pr.bid_id = %s
+        AND (%s IS NULL OR pr.loi = %s)
+    """, (bid_id, loi, loi))
+    return cur.fetchall()
+
+
+def solve_allocations(rows):
+    """Recommend the cheapest split of each required sample across partners.
+
+    rows are (partner_id, loi, audience_id, country, commitment, be_max, cpi,
+    sample_size, country_is_best_efforts) as returned by fetch_solver_cells.
+    Every LOI is solved on its own, per audience/country:
+
+    - partners with a fixed commitment can take up to that commitment;
+      BE/Max partners can take up to the whole requirement
+    - partners are filled cheapest CPI first, fixed commitments before BE/Max
+      at the same CPI, until the sample is covered
+    - BE/Max countries have no fixed target, so every partner is allocated
+      its commitment
+
+    All cells are evaluated together with array operations; nothing is
+    written.
+    """
+    if not rows:
+        return {'allocations': {}, 'groups': [], 'total_cost': 0.0}
+
+    group_keys = {}
+    group = np.array([
+        group_keys.setdefault((row[1], row[2], row[3]), len(group_keys))
+        for row in rows
+    ])
+    n_groups = len(group_keys)
+
+    commitment = np.array([row[4] for row in rows], dtype=float)
+    be_max = np.array([row[5] for row in rows], dtype=bool)
+    cpi = np.array([row[6] for row in rows], dtype=float)
+    required = np.zeros(n_groups)
+    required[group] = [row[7] for row in rows]
+    country_be = np.zeros(n_groups, dtype=bool)
+    country_be[group] = [row[8] for row in rows]
+
+    eligible = (cpi > 0) & ((commitment > 0) | be_max)
+    capacity = np.where(be_max, np.maximum(commitment, required[group]),
+                        commitment)
+    capacity = np.where(eligible, capacity, 0)
+
+    # Fill each group in (cpi, fixed-before-BE/Max) order: a partner gets
+    # whatever the requirement minus everything ahead of it in its group
+    order = np.lexsort((be_max, cpi, group))
+    sorted_group = group[order]
+    sorted_capacity = capacity[order]
+    taken_before = np.cumsum(sorted_capacity) - sorted_capacity
+    group_start = np.r_[True, sorted_group[1:] != sorted_group[:-1]]
+    taken_before -= taken_before[group_start][np.cumsum(group_start) - 1]
+    allocation = np.empty_like(capacity)
+    allocation[order] = np.clip(required[sorted_group] - taken_before, 0,
+                                sorted_capacity)
+
+    allocation = np.where(country_be[group], np.where(eligible, commitment, 0),
+                          allocation)
+    allocation = np.rint(allocation).astype(int)
+
+    allocated = np.bincount(group, weights=allocation, minlength=n_groups)
+    cost = np.bincount(group, weights=allocation * cpi, minlength=n_groups)
+    shortfall = np.where(country_be, 0, np.maximum(required - allocated, 0))
+
+    allocations = {}
+    for row, value in zip(rows, allocation.tolist()):
+        partner_id, loi, audience_id, country = row[:4]
+        allocations[f"{partner_id}-{audience_id}-{country}-{loi}"] = {
+            'partner_id': partner_id,
+            'audience_id': audience_id,
+            'country': country,
+            'loi': loi,
+            'allocation': value
+        }
+
+    groups = [{
+        'loi': loi,
+        'audience_id': audience_id,
+        'country': country,
+        'required': int(required[index]),
+        'is_best_efforts': bool(country_be[index]),
+        'allocated': int(allocated[index]),
+        'shortfall': int(shortfall[index]),
+        'cost': round(float(cost[index]), 2)
+    } for (loi, audience_id, country), index in group_keys.items()]
+
+    return {
+        'allocations': allocations,
+        'groups': groups,
+        'total_cost': round(float(cost.sum()), 2)
+    }
@@ -0,0 +1,100 @@
+"""Throughput check for the read endpoints.
+
+Starts --concurrency clients that request each path in turn for
+--duration seconds and prints requests/second and latency percentiles per
+path. Point it at a running server (dev server or gunicorn) to compare:
+
+    python benchmark.py --url http://localhost:5000 --user-id 1 --team Operations
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+DEFAULT_PATHS = [
+    '/api/bids?page=1&page_size=20',
+    '/api/bids/search?q=33',
+    '/api/queues/infield?page=1&page_size=20',
+    '/api/reference-data',
+    '/api/dashboard',
+    '/',
+]
+
+
+def run(url, paths, headers, concurrency, duration):
+    """{path: [latency seconds]} and the number of failed requests."""
+    latencies = {path: [] for path in paths}
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        i = offset
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            req = urllib.request.Request(url + path, headers=headers)
+            start = time.monotonic()
+            try:
+                with urllib.request.urlopen(req, timeout=30) as response:
+                    response.read()
+                elapsed = time.monotonic() - start
+                with lock:
+                    latencies[path].append(elapsed)
+            except (urllib.error.URLError, OSError):
+                with lock:
+                    errors[0] += 1
+
+    threads = [
+        threading.Thread(target=client, args=(n, ))
+        for n in range(concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure requests/second on the main read endpoints")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--path',
+                        action='append',
+                        dest='paths',
+                        help="path to request (repeatable)")
+    parser.add_argument('--user-id', default='')
+    parser.add_argument('--team', default='')
+    parser.add_argument('--role', default='admin')
+    args = parser.parse_args()
+
+    headers = {
+        'X-User-Id': args.user_id,
+        'X-User-Team': args.team,
+        'X-User-Role': args.role
+    }
+    paths = args.paths or DEFAULT_PATHS
+    latencies, errors = run(args.url.rstrip('/'), paths, headers,
+                            args.concurrency, args.duration)
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{total / args.duration:.1f} req/s over {args.duration:.0f}s "
+          f"with {args.concurrency} clients, {errors} errors")
+    for path, values in latencies.items():
+        if not values:
+            print(f"  {path}: no successful requests")
+            continue
+        values.sort()
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        print(f"  {path}: {len(values)} requests, "
+              f"p50 {statistics.median(values) * 1000:.0f} ms, "
+              f"p95 {p95 * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
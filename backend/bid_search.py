@@ -0,0 +1,155 @@
+# Bid search over bid number, study name and client name. Substring matches
+# are served by the pg_trgm GIN indexes in 0014_add_bid_search.sql; terms
+# shorter than a trigram only match bid number prefixes, which the
+# text_pattern_ops index covers, so neither path scans the bids table.
+
+# Typeahead result size
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+# Shortest term matched as a substring; anything shorter is a prefix search
+MIN_SUBSTRING_LENGTH = 3
+
+
+def like_pattern(term, prefix_only=False):
+    """ILIKE pattern for a user-typed term, with wildcards escaped."""
+    escaped = (term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+    return f"{escaped}%" if prefix_only else f"%{escaped}%"
+
+
+def match_ids_sql(term):
+    """(sql, params) selecting the ids of bids matching term.
+
+    Written as a UNION so each branch can use its own index; an OR across
+    the clients join could not.
+    """
+    if len(term) < MIN_SUBSTRING_LENGTH:
+        return ("SELECT id FROM bids WHERE bid_number LIKE %s",
+                [like_pattern(term, prefix_only=True)])
+    pattern = like_pattern(term)
+    return ("""
+        SELECT id FROM bids
+        WHERE bid_number ILIKE %s OR study_name ILIKE %s
+        UNION
+        SELECT b.id FROM bids b
+        JOIN clients c ON b.client = c.id
+        WHERE c.client_name ILIKE %s
+    """, [pattern, pattern, pattern])
+
+
+def search_query(term, principals=None, limit=SEARCH_DEFAULT_LIMIT):
+    """(sql, params) for the top matches for term, best first.
+
+    Exact and prefix bid number matches rank first, then trigram similarity
+    with any of the three fields. principals limits the results to bids in
+    bid_visibility for those principals; None means no restriction (super
+    admins).
+    """
+    match_sql, params = match_ids_sql(term)
+
+    visibility_filter = ''
+    if principals is not None:
+        visibility_filter = """AND EXISTS (
+            SELECT 1 FROM bid_visibility v
+            WHERE v.bid_id = b.id AND v.principal = ANY(%s)
+        )"""
+        params.append(principals)
+
+    sql = f"""
+        SELECT
+            b.id,
+            b.bid_number,
+            b.study_name,
+            COALESCE(b.status::text, 'draft') as status,
+            COALESCE(c.client_name, 'Unknown Client') as client_name,
+            TO_CHAR(b.bid_date, 'YYYY-MM-DD') as bid_date,
+            CASE
+                WHEN LOWER(b.bid_number) = LOWER(%s) THEN 2
+                WHEN b.bid_number ILIKE %s THEN 1
+                ELSE 0
+            END + GREATEST(
+                similarity(b.bid_number, %s),
+                word_similarity(%s, COALESCE(b.study_name, '')),
+                word_similarity(%s, COALESCE(c.client_name, ''))
+            ) as rank
+        FROM bids b
+        LEFT JOIN clients c ON b.client = c.id
+        WHERE b.id IN ({match_sql})
+        {visibility_filter}
+        ORDER BY rank DESC, b.id DESC
+        LIMIT %s
+    """
+    return sql, ([term, like_pattern(term, prefix_only=True), term, term, term]
+                 + params + [limit])
+
+
+def search_bids(cur, term, principals=None, limit=SEARCH_DEFAULT_LIMIT):
+    """Run search_query; an empty term matches nothing."""
+    term = term.strip()
+    if not term:
+        return []
+    cur.execute(*search_query(term, principals, limit))
+    return cur.fetchall()
+
+
+def _list_filter(principals, restrict, search):
+    conditions = []
+    params = []
+    if restrict:
+        # Grants, creator and VM team are all materialised in
+        # bid_visibility (see visibility.py)
+        conditions.append("""b.id IN (
+            SELECT bid_id FROM bid_visibility WHERE principal = ANY(%s)
+        )""")
+        params.append(principals)
+    if search:
+        match_sql, match_params = match_ids_sql(search)
+        conditions.append(f"b.id IN ({match_sql})")
+        params.extend(match_params)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return where, params
+
+
+def list_query(principals, restrict, search, page_size, offset):
+    """(sql, params) for one page of the bid list, newest bid number first.
+
+    restrict limits the list to bids visible to principals (everyone but
+    super admins); has_access is reported for every row either way.
+    """
+    where, params = _list_filter(principals, restrict, search)
+    sql = f"""
+        SELECT
+            b.id,
+            b.bid_number,
+            b.study_name,
+            TO_CHAR(b.bid_date, 'YYYY-MM-DD') as bid_date,
+            COALESCE(b.status::text, 'draft') as status,
+            COALESCE(c.client_name, 'Unknown Client') as client_name,
+            b.methodology,
+            b.project_requirement,
+            COALESCE(vm.team, 'Unknown Team') as team,
+            COALESCE(vm.vm_name, 'Unknown VM') as vm_name,
+            COALESCE(s.sales_person, 'Unknown Sales') as sales_person,
+            b.created_by,
+            EXISTS (
+                SELECT 1 FROM bid_visibility v
+                WHERE v.bid_id = b.id AND v.principal = ANY(%s)
+            ) as has_access,
+            COUNT(*) OVER() as total_count
+        FROM bids b
+        LEFT JOIN clients c ON b.client = c.id
+        LEFT JOIN vendor_managers vm ON b.vm_contact = vm.id
+        LEFT JOIN sales s ON b.sales_contact = s.id
+        {where}
+        ORDER BY
+            CASE WHEN b.bid_number ~ '^[0-9]+$'
+                 THEN b.bid_number::bigint ELSE 0 END DESC,
+            b.id DESC
+        LIMIT %s OFFSET %s
+    """
+    return sql, [principals] + params + [page_size, offset]
+
+
+def list_count_query(principals, restrict, search):
+    """(sql, params) counting the bids list_query pages through."""
+    where, params = _list_filter(principals, restrict, search)
+    return f"SELECT COUNT(*) as total_count FROM bids b {where}", params
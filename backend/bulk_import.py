@@ -0,0 +1,332 @@
+import argparse
+import io
+import os
+
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+
+import countries
+
+load_dotenv()
+
+# Encodings tried, in order, on the raw upload; latin-1 accepts any byte
+# sequence so detection always settles on one of these.
+ENCODINGS = ['utf-8-sig', 'cp1252', 'latin-1']
+
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+
+# key:      business key used as the ON CONFLICT target
+# unique:   other unique columns; a row that would take one of these from a
+#           different key is rejected instead of failing the whole merge
+# countries: array columns of country names, stored under the form's
+#           spelling (countries.canonical)
+# casts:    SQL cast applied when moving a column out of the text staging table
+IMPORT_SPECS = {
+    'partners': {
+        'columns': [
+            'partner_id', 'partner_name', 'contact_person', 'contact_email',
+            'contact_phone', 'website', 'company_address', 'specialized',
+            'geographic_coverage'
+        ],
+        'required': [
+            'partner_id', 'partner_name', 'contact_person', 'contact_email'
+        ],
+        'key': 'partner_id',
+        'unique': ['contact_email'],
+        'emails': ['contact_email'],
+        'arrays': ['specialized', 'geographic_coverage'],
+        'countries': ['geographic_coverage'],
+        'defaults': {
+            'contact_phone': 'NA',
+            'company_address': 'NA'
+        },
+        'enums': {},
+        'casts': {
+            'specialized': 'text[]',
+            'geographic_coverage': 'text[]'
+        },
+    },
+    'clients': {
+        'columns': [
+            'client_id', 'client_name', 'contact_person', 'email', 'phone',
+            'country'
+        ],
+        'required': [
+            'client_id', 'client_name', 'contact_person', 'email', 'phone',
+            'country'
+        ],
+        'key': 'client_id',
+        'unique': ['email'],
+        'emails': ['email'],
+        'arrays': [],
+        'countries': [],
+        'defaults': {},
+        'enums': {},
+        'casts': {},
+    },
+    'sales': {
+        'columns': [
+            'sales_id', 'sales_person', 'contact_person', 'reporting_manager',
+            'region'
+        ],
+        'required': [
+            'sales_id', 'sales_person', 'contact_person', 'reporting_manager',
+            'region'
+        ],
+        'key': 'sales_id',
+        'unique': [],
+        'emails': [],
+        'arrays': [],
+        'countries': [],
+        'defaults': {},
+        'enums': {
+            'region': ['north', 'south', 'east', 'west']
+        },
+        'casts': {
+            'region': 'region'
+        },
+    },
+}
+
+
+class BulkImportError(Exception):
+    """The file as a whole cannot be imported (bad encoding, missing columns)."""
+
+
+def detect_encoding(raw):
+    """Decode the upload once, returning (text, encoding)."""
+    for encoding in ENCODINGS:
+        try:
+            return raw.decode(encoding), encoding
+        except UnicodeDecodeError:
+            continue
+    raise BulkImportError("Could not decode the file with any supported encoding")
+
+
+def _canonical_countries(series):
+    # "{USA,UAE}" becomes "United States,United Arab Emirates"
+    return series.map(lambda value: ','.join(
+        countries.canonical_list(
+            v.strip().strip('"') for v in value.strip('{}').split(','))))
+
+
+def _to_pg_array(series):
+    # "{B2B,B2C}" and "B2B, B2C" both become {"B2B","B2C"}
+    cleaned = (series.str.strip().str.strip('{}').str.replace(
+        '\\', '\\\\', regex=False).str.replace('"', '\\"', regex=False))
+    cleaned = cleaned.str.replace(r'\s*,\s*', '","', regex=True)
+    return ('{"' + cleaned + '"}').where(cleaned != '', None)
+
+
+def validate_frame(df, spec):
+    """Normalise and validate every column at once.
+
+    Returns (valid_df, rejects) where valid_df carries a row_number column
+    (the line in the source file) and rejects is a list of
+    {'row': ..., 'reason': ...}.
+    """
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    missing = [c for c in spec['columns'] if c not in df.columns]
+    if missing:
+        raise BulkImportError(f"Missing columns: {', '.join(missing)}")
+
+    df = df[spec['columns']].copy()
+    # Header is line 1, so data starts on line 2
+    df.insert(0, 'row_number', df.index + 2)
+
+    for column in spec['columns']:
+        df[column] = df[column].fillna('').astype(str).str.strip()
+
+    for column, default in spec['defaults'].items():
+        df.loc[df[column] == '', column] = default
+
+    reasons = pd.Series('', index=df.index)
+
+    for column in spec['required']:
+        reasons = reasons.where(df[column] != '',
+                                reasons + f"{column} is required; ")
+
+    for column in spec['emails']:
+        bad = (df[column] != '') & ~df[column].str.match(EMAIL_PATTERN)
+        reasons = reasons.where(~bad, reasons + f"{column} is not an email; ")
+
+    for column, allowed in spec['enums'].items():
+        df[column] = df[column].str.lower()
+        bad = (df[column] != '') & ~df[column].isin(allowed)
+        reasons = reasons.where(
+            ~bad, reasons + f"{column} must be one of {', '.join(allowed)}; ")
+
+    for column in spec['countries']:
+        df[column] = _canonical_countries(df[column])
+
+    for column in spec['arrays']:
+        df[column] = _to_pg_array(df[column])
+
+    rejected = reasons != ''
+    rejects = [{
+        'row': int(row),
+        'reason': reason.rstrip('; ')
+    } for row, reason in zip(df.loc[rejected, 'row_number'],
+                             reasons[rejected])]
+    return df[~rejected], rejects
+
+
+def _copy_to_staging(cur, df, spec):
+    columns = ['row_number'] + spec['columns']
+    column_defs = ', '.join(['row_number integer'] +
+                            [f"{c} text" for c in spec['columns']])
+    cur.execute(
+        f"CREATE TEMP TABLE import_staging ({column_defs}) ON COMMIT DROP")
+
+    buffer = io.StringIO()
+    df.to_csv(buffer, columns=columns, index=False, header=False)
+    buffer.seek(0)
+    cur.copy_expert(
+        f"COPY import_staging ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer)
+
+
+def _reject_conflicts(cur, table, spec):
+    """Drop staging rows the merge could not apply, returning them as rejects."""
+    key = spec['key']
+    rejects = []
+
+    # Repeated keys in one file: the last occurrence wins
+    cur.execute(f"""
+        DELETE FROM import_staging s
+        USING import_staging later
+        WHERE later.{key} = s.{key}
+        AND later.row_number > s.row_number
+        RETURNING s.row_number, s.{key}
+    """)
+    rejects += [{
+        'row': row,
+        'reason': f"duplicate {key} {value} later in file"
+    } for row, value in cur.fetchall()]
+
+    for column in spec['unique']:
+        cur.execute(f"""
+            DELETE FROM import_staging s
+            USING import_staging other
+            WHERE other.{column} = s.{column}
+            AND other.{key} <> s.{key}
+            AND other.row_number > s.row_number
+            RETURNING s.row_number, s.{column}
+        """)
+        rejects += [{
+            'row': row,
+            'reason': f"{column} {value} is repeated later in file"
+        } for row, value in cur.fetchall()]
+
+        cur.execute(f"""
+            DELETE FROM import_staging s
+            USING {table} t
+            WHERE t.{column} = s.{column}
+            AND t.{key} <> s.{key}
+            RETURNING s.row_number, s.{column}, t.{key}
+        """)
+        rejects += [{
+            'row': row,
+            'reason': f"{column} {value} already belongs to {key} {owner}"
+        } for row, value, owner in cur.fetchall()]
+
+    return rejects
+
+
+def _merge(cur, table, spec):
+    key = spec['key']
+    columns = spec['columns']
+    select_list = ', '.join(
+        f"{c}::{spec['casts'][c]}" if c in spec['casts'] else c
+        for c in columns)
+    update_list = ', '.join(f"{c} = EXCLUDED.{c}" for c in columns
+                            if c != key)
+    cur.execute(f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT {select_list}
+        FROM import_staging
+        ORDER BY row_number
+        ON CONFLICT ({key}) DO UPDATE SET
+            {update_list},
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING (xmax = 0) AS inserted
+    """)
+    flags = [row[0] for row in cur.fetchall()]
+    inserted = sum(1 for flag in flags if flag)
+    return inserted, len(flags) - inserted
+
+
+def import_file(conn, table, raw, dry_run=False):
+    """Import one CSV upload into partners, clients or sales.
+
+    Valid rows are upserted on the table's business key; invalid rows are
+    skipped and reported. With dry_run the merge runs and is rolled back.
+    """
+    if table not in IMPORT_SPECS:
+        raise BulkImportError(f"Unsupported import table: {table}")
+    spec = IMPORT_SPECS[table]
+
+    text, encoding = detect_encoding(raw)
+    df = pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False)
+    total_rows = len(df)
+    valid_df, rejects = validate_frame(df, spec)
+
+    cur = conn.cursor()
+    try:
+        _copy_to_staging(cur, valid_df, spec)
+        rejects += _reject_conflicts(cur, table, spec)
+        inserted, updated = _merge(cur, table, spec)
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    rejects.sort(key=lambda r: r['row'])
+    return {
+        'table': table,
+        'encoding': encoding,
+        'total_rows': total_rows,
+        'inserted': inserted,
+        'updated': updated,
+        'rejected': len(rejects),
+        'rejects': rejects,
+        'dry_run': dry_run
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bulk import partners, clients or sales from a CSV file")
+    parser.add_argument('table', choices=sorted(IMPORT_SPECS))
+    parser.add_argument('csv_file')
+    parser.add_argument('--dry-run',
+                        action='store_true',
+                        help="validate and merge, then roll back")
+    args = parser.parse_args()
+
+    with open(args.csv_file, 'rb') as f:
+        raw = f.read()
+
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        result = import_file(conn, args.table, raw, dry_run=args.dry_run)
+    finally:
+        conn.close()
+
+    print(f"Read {result['total_rows']} rows ({result['encoding']})")
+    print(f"Inserted: {result['inserted']}, updated: {result['updated']}, "
+          f"rejected: {result['rejected']}")
+    for reject in result['rejects']:
+        print(f"  line {reject['row']}: {reject['reason']}")
+    if result['dry_run']:
+        print("Dry run - no changes committed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Columns the closure screens may change, with the SQL type used for the
+# VALUES list
+CLOSURE_COLUMNS = [
+    ('n_delivered', 'integer'),
+    ('field_close_date', 'date'),
+    ('final_loi', 'numeric'),
+    ('final_ir', 'numeric'),
+    ('final_timeline', 'integer'),
+    ('quality_rejects', 'integer'),
+    ('communication', 'text'),
+    ('engagement', 'text'),
+    ('problem_solving', 'text'),
+    ('additional_feedback', 'text'),
+]
+
+# Payload field -> (column, converter)
+METRIC_FIELDS = {
+    'finalLOI': ('final_loi', float),
+    'finalIR': ('final_ir', float),
+    'finalTimeline': ('final_timeline', int),
+    'qualityRejects': ('quality_rejects', int),
+    'communication': ('communication', int),
+    'engagement': ('engagement', int),
+    'problemSolving': ('problem_solving', int),
+    'additionalFeedback': ('additional_feedback', None),
+}
+
+
+def _blank_to_none(value, convert=None):
+    if value in ['', None]:
+        return None
+    return convert(value) if convert else value
+
+
+def parse_metrics(metrics):
+    """Map a metrics object from the closure form to column values."""
+    return {
+        column: _blank_to_none(metrics.get(field), convert)
+        for field, (column, convert) in METRIC_FIELDS.items()
+    }
+
+
+def parse_delivered(value):
+    return _blank_to_none(value, int)
+
+
+def fetch_cells(cur, bid_id, partner_name, loi):
+    """Allocated cells for one partner/LOI as (id, audience_id, country)."""
+    cur.execute(
+        """
+        SELECT par.id, par.audience_id, par.country
+        FROM partner_audience_responses par
+        JOIN partner_responses pr ON par.partner_response_id = pr.id
+        JOIN partners p ON pr.partner_id = p.id
+        WHERE pr.bid_id = %s
+        AND p.partner_name = %s
+        AND pr.loi = %s
+        AND par.allocation > 0
+    """, (bid_id, partner_name, loi))
+    return cur.fetchall()
+
+
+def apply_cell_updates(cur, updates):
+    """Apply {par_id: {column: value}} in one statement.
+
+    Only the columns present for a cell are changed; everything else keeps
+    its current value. Returns the number of rows updated.
+    """
+    if not updates:
+        return 0
+
+    template = '(' + ', '.join(
+        ['%s::integer'] +
+        [f'%s::boolean, %s::{sql_type}'
+         for _, sql_type in CLOSURE_COLUMNS]) + ')'
+    rows = []
+    for par_id, changes in updates.items():
+        row = [par_id]
+        for column, _ in CLOSURE_COLUMNS:
+            row += [column in changes, changes.get(column)]
+        rows.append(cur.mogrify(template, row).decode('utf-8'))
+
+    value_columns = ['id'] + [
+        name for column, _ in CLOSURE_COLUMNS
+        for name in (f'set_{column}', column)
+    ]
+    set_list = ',\n            '.join(
+        f"{column} = CASE WHEN v.set_{column} THEN v.{column} ELSE par.{column} END"
+        for column, _ in CLOSURE_COLUMNS)
+
+    cur.execute(f"""
+        UPDATE partner_audience_responses par
+        SET
+            {set_list},
+            updated_at = CURRENT_TIMESTAMP
+        FROM (VALUES {', '.join(rows)}) AS v ({', '.join(value_columns)})
+        WHERE par.id = v.id
+    """)
+    return cur.rowcount
@@ -0,0 +1,59 @@
+# Country names as the bid and partner forms list them, and the other
+# spellings found in partner uploads ("USA", "UAE", ...). Partner coverage is
+# stored under the form's name; partners saved before that are still found
+# because searches match every spelling of a country.
+ALIASES = {
+    'United States': [
+        'USA', 'US', 'U.S.', 'U.S.A.', 'United States of America', 'America'
+    ],
+    'United Arab Emirates': ['UAE', 'U.A.E.'],
+    'United Kingdom': [
+        'UK', 'U.K.', 'Great Britain', 'Britain', 'England'
+    ],
+    'South Korea': ['Korea', 'Republic of Korea', 'Korea, South'],
+    'North Korea': ['Korea, North'],
+    'Czech Republic': ['Czechia'],
+    'Ivory Coast': ["Cote d'Ivoire", "Côte d'Ivoire"],
+    'Russia': ['Russian Federation'],
+    'Vietnam': ['Viet Nam'],
+    'Eswatini': ['Swaziland'],
+    'Cabo Verde': ['Cape Verde'],
+    'Netherlands': ['The Netherlands', 'Holland'],
+    'Turkey': ['Türkiye', 'Turkiye'],
+    'Myanmar': ['Burma'],
+    'North Macedonia': ['Macedonia'],
+    'Timor-Leste': ['East Timor'],
+    'Laos': ["Lao People's Democratic Republic"],
+    'Syria': ['Syrian Arab Republic'],
+    'Iran': ['Iran, Islamic Republic of'],
+    'Vatican City': ['Holy See', 'Vatican'],
+    'Democratic Republic of the Congo': ['DRC', 'DR Congo', 'Congo-Kinshasa'],
+    'Congo': ['Republic of the Congo', 'Congo-Brazzaville'],
+}
+
+_CANONICAL = {}
+for _name, _aliases in ALIASES.items():
+    for _alias in [_name] + _aliases:
+        _CANONICAL[_alias.lower()] = _name
+
+
+def canonical(name):
+    """The form's name for a country; unknown names come back trimmed."""
+    name = (name or '').strip()
+    return _CANONICAL.get(name.lower(), name)
+
+
+def canonical_list(names):
+    """canonical() of each name, duplicates dropped, order kept."""
+    result = []
+    for name in names or []:
+        name = canonical(name)
+        if name and name not in result:
+            result.append(name)
+    return result
+
+
+def spellings(name):
+    """Every stored spelling that means the same country as name."""
+    name = canonical(name)
+    return [name] + ALIASES.get(name, [])
@@ -0,0 +1,8 @@
+-- Rejected bids: a 'rejected' status plus the reason and comments
+-- entered when rejecting. Adds the value to the existing bid_status type;
+-- the live schema never used a separate type for it.
+ALTER TYPE bid_status ADD VALUE IF NOT EXISTS 'rejected';
+
+ALTER TABLE bids
+ADD COLUMN IF NOT EXISTS rejection_reason VARCHAR(100),
+ADD COLUMN IF NOT EXISTS rejection_comments TEXT;
@@ -0,0 +1,2 @@
+-- 'quant' methodology (was add_methodology.py)
+ALTER TYPE methodology ADD VALUE IF NOT EXISTS 'quant';
@@ -0,0 +1,33 @@
+-- Typed proposal summary columns, filled by create_proposal/update_proposal,
+-- so the proposal list no longer parses the JSONB document
+ALTER TABLE proposals
+ADD COLUMN IF NOT EXISTS total_cost NUMERIC(14,2),
+ADD COLUMN IF NOT EXISTS total_revenue NUMERIC(14,2),
+ADD COLUMN IF NOT EXISTS total_margin NUMERIC(14,2),
+ADD COLUMN IF NOT EXISTS effective_margin NUMERIC(8,2),
+ADD COLUMN IF NOT EXISTS avg_cpi NUMERIC(10,2),
+ADD COLUMN IF NOT EXISTS margin_percentage NUMERIC(8,2);
+
+-- Backfill existing proposals from their stored summary
+UPDATE proposals p
+SET
+    total_cost = CASE WHEN s.summary->>'totalCost' ~ '^-?[0-9]+(\.[0-9]+)?$'
+                      THEN (s.summary->>'totalCost')::NUMERIC END,
+    total_revenue = CASE WHEN s.summary->>'totalRevenue' ~ '^-?[0-9]+(\.[0-9]+)?$'
+                         THEN (s.summary->>'totalRevenue')::NUMERIC END,
+    total_margin = CASE WHEN s.summary->>'totalMargin' ~ '^-?[0-9]+(\.[0-9]+)?$'
+                        THEN (s.summary->>'totalMargin')::NUMERIC END,
+    effective_margin = CASE WHEN s.summary->>'effectiveMargin' ~ '^-?[0-9]+(\.[0-9]+)?$'
+                            THEN (s.summary->>'effectiveMargin')::NUMERIC END,
+    avg_cpi = CASE WHEN s.summary->>'avgCPI' ~ '^-?[0-9]+(\.[0-9]+)?$'
+                   THEN (s.summary->>'avgCPI')::NUMERIC END,
+    margin_percentage = CASE WHEN p.data->'data'->>'marginPercentage' ~ '^-?[0-9]+(\.[0-9]+)?$'
+                             THEN (p.data->'data'->>'marginPercentage')::NUMERIC END
+FROM (
+    SELECT id, data->'data'->'summary' as summary FROM proposals
+) s
+WHERE s.id = p.id
+AND p.total_cost IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_proposals_created_at ON proposals (created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_proposals_bid_id ON proposals (bid_id);
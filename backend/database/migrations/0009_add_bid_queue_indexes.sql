@@ -0,0 +1,6 @@
+-- Status queues (infield, closure, invoice) page bids by status, most
+-- recently updated first
+CREATE INDEX IF NOT EXISTS idx_bids_status_updated_at ON bids (status, updated_at DESC);
+
+-- Latest PO number per bid for the queue lists
+CREATE INDEX IF NOT EXISTS idx_bid_po_numbers_bid_id ON bid_po_numbers (bid_id, id DESC);
@@ -0,0 +1,61 @@
+-- Columns and unique keys the handlers rely on that neither the initial
+-- schema nor the live dump declares. Idempotent, so it also brings a
+-- database baselined through 0001 (or an older live copy) into line.
+
+-- Bid ownership, written by create_bid and copy_bid and read by the
+-- visibility rules (0012) and the team metrics
+ALTER TABLE bids ADD COLUMN IF NOT EXISTS created_by INTEGER REFERENCES users(id);
+ALTER TABLE bids ADD COLUMN IF NOT EXISTS team VARCHAR(100);
+
+-- Bid sharing tables, missing from live copies that predate 0001
+CREATE TABLE IF NOT EXISTS bid_access (
+    id SERIAL PRIMARY KEY,
+    bid_id INTEGER REFERENCES bids(id) ON DELETE CASCADE,
+    user_id INTEGER REFERENCES users(id), -- nullable if granting by team
+    team VARCHAR(100), -- nullable if granting by user
+    granted_by INTEGER REFERENCES users(id),
+    granted_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (bid_id, user_id, team)
+);
+
+CREATE TABLE IF NOT EXISTS bid_access_requests (
+    id SERIAL PRIMARY KEY,
+    bid_id INTEGER REFERENCES bids(id) ON DELETE CASCADE,
+    user_id INTEGER REFERENCES users(id), -- nullable if requesting by team
+    team VARCHAR(100), -- nullable if requesting by user
+    requested_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    status VARCHAR(20) DEFAULT 'pending', -- pending, granted, denied
+    UNIQUE (bid_id, user_id, team)
+);
+
+-- ON CONFLICT targets of the PO number and allocation upserts. Rows that
+-- would violate the key are duplicates the upserts were meant to replace,
+-- so the latest one is kept.
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint
+                   WHERE conname = 'bid_po_numbers_bid_id_key') THEN
+        DELETE FROM bid_po_numbers p
+        USING bid_po_numbers newer
+        WHERE newer.bid_id = p.bid_id
+        AND newer.id > p.id;
+
+        ALTER TABLE bid_po_numbers
+        ADD CONSTRAINT bid_po_numbers_bid_id_key UNIQUE (bid_id);
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint
+                   WHERE conname = 'partner_audience_responses_cell_key') THEN
+        DELETE FROM partner_audience_responses par
+        USING partner_audience_responses newer
+        WHERE newer.bid_id = par.bid_id
+        AND newer.partner_response_id = par.partner_response_id
+        AND newer.audience_id = par.audience_id
+        AND newer.country = par.country
+        AND newer.id > par.id;
+
+        ALTER TABLE partner_audience_responses
+        ADD CONSTRAINT partner_audience_responses_cell_key
+        UNIQUE (bid_id, partner_response_id, audience_id, country);
+    END IF;
+END $$;
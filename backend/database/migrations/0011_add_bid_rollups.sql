@@ -0,0 +1,208 @@
+-- Delivered, cost and savings rollups per bid and per bid/partner/LOI, kept
+-- current by triggers on partner_audience_responses so list screens read one
+-- row per bid instead of re-aggregating every cell.
+
+-- Single definition of the rollup formulas. A cell counts once it has an
+-- allocation or deliveries; averages ignore cells with no value recorded.
+-- Stored costs default to 0, so an unset cost falls back to the CPI.
+CREATE OR REPLACE VIEW bid_partner_rollup_source AS
+SELECT
+    pr.id as partner_response_id,
+    pr.bid_id,
+    pr.partner_id,
+    pr.loi,
+    COUNT(par.id) as cell_count,
+    COALESCE(SUM(par.allocation), 0) as allocation,
+    COALESCE(SUM(par.n_delivered), 0) as n_delivered,
+    COALESCE(SUM(par.quality_rejects), 0) as quality_rejects,
+    ROUND(AVG(par.final_loi), 2) as avg_final_loi,
+    ROUND(AVG(par.final_ir), 2) as avg_final_ir,
+    ROUND(AVG(par.cpi), 2) as avg_initial_cpi,
+    ROUND(AVG(COALESCE(par.final_cpi, par.cpi)), 2) as avg_final_cpi,
+    ROUND(COALESCE(SUM(COALESCE(NULLIF(par.initial_cost, 0), par.n_delivered * par.cpi)), 0), 2) as initial_cost,
+    ROUND(COALESCE(SUM(COALESCE(NULLIF(par.final_cost, 0), par.n_delivered * COALESCE(par.final_cpi, par.cpi))), 0), 2) as final_cost
+FROM partner_responses pr
+JOIN partner_audience_responses par ON (
+    par.partner_response_id = pr.id
+    AND (par.allocation > 0 OR par.n_delivered > 0)
+)
+GROUP BY pr.id, pr.bid_id, pr.partner_id, pr.loi;
+
+CREATE OR REPLACE VIEW bid_rollup_source AS
+SELECT
+    pr.bid_id,
+    COUNT(par.id) as cell_count,
+    COALESCE(SUM(par.allocation), 0) as allocation,
+    COALESCE(SUM(par.n_delivered), 0) as n_delivered,
+    COALESCE(SUM(par.quality_rejects), 0) as quality_rejects,
+    ROUND(AVG(par.final_loi), 2) as avg_final_loi,
+    ROUND(AVG(par.final_ir), 2) as avg_final_ir,
+    ROUND(AVG(par.cpi), 2) as avg_initial_cpi,
+    ROUND(AVG(COALESCE(par.final_cpi, par.cpi)), 2) as avg_final_cpi,
+    ROUND(COALESCE(SUM(COALESCE(NULLIF(par.initial_cost, 0), par.n_delivered * par.cpi)), 0), 2) as initial_cost,
+    ROUND(COALESCE(SUM(COALESCE(NULLIF(par.final_cost, 0), par.n_delivered * COALESCE(par.final_cpi, par.cpi))), 0), 2) as final_cost
+FROM partner_responses pr
+JOIN partner_audience_responses par ON (
+    par.partner_response_id = pr.id
+    AND (par.allocation > 0 OR par.n_delivered > 0)
+)
+GROUP BY pr.bid_id;
+
+CREATE TABLE IF NOT EXISTS bid_rollups (
+    bid_id INTEGER PRIMARY KEY REFERENCES bids(id) ON DELETE CASCADE,
+    cell_count INTEGER NOT NULL DEFAULT 0,
+    allocation BIGINT NOT NULL DEFAULT 0,
+    n_delivered BIGINT NOT NULL DEFAULT 0,
+    quality_rejects BIGINT NOT NULL DEFAULT 0,
+    avg_final_loi NUMERIC(10,2),
+    avg_final_ir NUMERIC(10,2),
+    avg_initial_cpi NUMERIC(12,2),
+    avg_final_cpi NUMERIC(12,2),
+    initial_cost NUMERIC(14,2) NOT NULL DEFAULT 0,
+    final_cost NUMERIC(14,2) NOT NULL DEFAULT 0,
+    savings NUMERIC(14,2) GENERATED ALWAYS AS (initial_cost - final_cost) STORED,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS bid_partner_rollups (
+    partner_response_id INTEGER PRIMARY KEY REFERENCES partner_responses(id) ON DELETE CASCADE,
+    bid_id INTEGER NOT NULL REFERENCES bids(id) ON DELETE CASCADE,
+    partner_id INTEGER NOT NULL,
+    loi INTEGER NOT NULL,
+    cell_count INTEGER NOT NULL DEFAULT 0,
+    allocation BIGINT NOT NULL DEFAULT 0,
+    n_delivered BIGINT NOT NULL DEFAULT 0,
+    quality_rejects BIGINT NOT NULL DEFAULT 0,
+    avg_final_loi NUMERIC(10,2),
+    avg_final_ir NUMERIC(10,2),
+    avg_initial_cpi NUMERIC(12,2),
+    avg_final_cpi NUMERIC(12,2),
+    initial_cost NUMERIC(14,2) NOT NULL DEFAULT 0,
+    final_cost NUMERIC(14,2) NOT NULL DEFAULT 0,
+    savings NUMERIC(14,2) GENERATED ALWAYS AS (initial_cost - final_cost) STORED,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_bid_partner_rollups_bid_id ON bid_partner_rollups (bid_id);
+
+-- Recompute both rollups for the given bids from the source views
+CREATE OR REPLACE FUNCTION refresh_bid_rollups(bid_ids INTEGER[])
+RETURNS void AS $$
+BEGIN
+    DELETE FROM bid_partner_rollups WHERE bid_id = ANY(bid_ids);
+    INSERT INTO bid_partner_rollups (
+        partner_response_id, bid_id, partner_id, loi, cell_count, allocation,
+        n_delivered, quality_rejects, avg_final_loi, avg_final_ir,
+        avg_initial_cpi, avg_final_cpi, initial_cost, final_cost
+    )
+    SELECT
+        partner_response_id, bid_id, partner_id, loi, cell_count, allocation,
+        n_delivered, quality_rejects, avg_final_loi, avg_final_ir,
+        avg_initial_cpi, avg_final_cpi, initial_cost, final_cost
+    FROM bid_partner_rollup_source
+    WHERE bid_id = ANY(bid_ids);
+
+    DELETE FROM bid_rollups r
+    WHERE r.bid_id = ANY(bid_ids)
+    AND NOT EXISTS (SELECT 1 FROM bid_rollup_source s WHERE s.bid_id = r.bid_id);
+    INSERT INTO bid_rollups (
+        bid_id, cell_count, allocation, n_delivered, quality_rejects,
+        avg_final_loi, avg_final_ir, avg_initial_cpi, avg_final_cpi,
+        initial_cost, final_cost
+    )
+    SELECT
+        s.bid_id, s.cell_count, s.allocation, s.n_delivered, s.quality_rejects,
+        s.avg_final_loi, s.avg_final_ir, s.avg_initial_cpi, s.avg_final_cpi,
+        s.initial_cost, s.final_cost
+    FROM bid_rollup_source s
+    JOIN bids b ON b.id = s.bid_id
+    WHERE s.bid_id = ANY(bid_ids)
+    ON CONFLICT (bid_id) DO UPDATE SET
+        cell_count = EXCLUDED.cell_count,
+        allocation = EXCLUDED.allocation,
+        n_delivered = EXCLUDED.n_delivered,
+        quality_rejects = EXCLUDED.quality_rejects,
+        avg_final_loi = EXCLUDED.avg_final_loi,
+        avg_final_ir = EXCLUDED.avg_final_ir,
+        avg_initial_cpi = EXCLUDED.avg_initial_cpi,
+        avg_final_cpi = EXCLUDED.avg_final_cpi,
+        initial_cost = EXCLUDED.initial_cost,
+        final_cost = EXCLUDED.final_cost,
+        refreshed_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level: a bulk write refreshes each affected bid once. The bid
+-- is taken from the response where it still exists, otherwise from the cell.
+CREATE OR REPLACE FUNCTION refresh_rollups_from_cells()
+RETURNS trigger AS $$
+DECLARE
+    affected INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT COALESCE(pr.bid_id, c.bid_id)) INTO affected
+        FROM new_cells c
+        LEFT JOIN partner_responses pr ON pr.id = c.partner_response_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT COALESCE(pr.bid_id, c.bid_id)) INTO affected
+        FROM old_cells c
+        LEFT JOIN partner_responses pr ON pr.id = c.partner_response_id;
+    ELSE
+        SELECT array_agg(DISTINCT x.bid_id) INTO affected
+        FROM (
+            SELECT COALESCE(pr.bid_id, c.bid_id) as bid_id
+            FROM new_cells c
+            LEFT JOIN partner_responses pr ON pr.id = c.partner_response_id
+            UNION
+            SELECT COALESCE(pr.bid_id, c.bid_id)
+            FROM old_cells c
+            LEFT JOIN partner_responses pr ON pr.id = c.partner_response_id
+        ) x;
+    END IF;
+
+    IF affected IS NOT NULL THEN
+        PERFORM refresh_bid_rollups(affected);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS partner_audience_responses_rollup_insert ON partner_audience_responses;
+CREATE TRIGGER partner_audience_responses_rollup_insert
+AFTER INSERT ON partner_audience_responses
+REFERENCING NEW TABLE AS new_cells
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_rollups_from_cells();
+
+DROP TRIGGER IF EXISTS partner_audience_responses_rollup_update ON partner_audience_responses;
+CREATE TRIGGER partner_audience_responses_rollup_update
+AFTER UPDATE ON partner_audience_responses
+REFERENCING OLD TABLE AS old_cells NEW TABLE AS new_cells
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_rollups_from_cells();
+
+DROP TRIGGER IF EXISTS partner_audience_responses_rollup_delete ON partner_audience_responses;
+CREATE TRIGGER partner_audience_responses_rollup_delete
+AFTER DELETE ON partner_audience_responses
+REFERENCING OLD TABLE AS old_cells
+FOR EACH STATEMENT EXECUTE FUNCTION refresh_rollups_from_cells();
+
+-- A response moved to another bid, partner or LOI changes which rollup its
+-- cells belong to
+CREATE OR REPLACE FUNCTION refresh_rollups_from_response()
+RETURNS trigger AS $$
+BEGIN
+    PERFORM refresh_bid_rollups(ARRAY[OLD.bid_id, NEW.bid_id]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS partner_responses_rollup_update ON partner_responses;
+CREATE TRIGGER partner_responses_rollup_update
+AFTER UPDATE OF bid_id, partner_id, loi ON partner_responses
+FOR EACH ROW
+WHEN (OLD.bid_id IS DISTINCT FROM NEW.bid_id
+      OR OLD.partner_id IS DISTINCT FROM NEW.partner_id
+      OR OLD.loi IS DISTINCT FROM NEW.loi)
+EXECUTE FUNCTION refresh_rollups_from_response();
+
+-- Backfill
+SELECT refresh_bid_rollups(ARRAY(SELECT id FROM bids));
@@ -0,0 +1,30 @@
+-- Materialised bid visibility, maintained by the bid and access handlers
+-- (see visibility.py). Rebuild at any time with `python visibility.py`.
+CREATE TABLE IF NOT EXISTS bid_visibility (
+    principal VARCHAR(120) NOT NULL, -- 'user:<id>' or 'team:<normalised team>'
+    bid_id INTEGER NOT NULL REFERENCES bids(id) ON DELETE CASCADE,
+    reason VARCHAR(20) NOT NULL, -- grant, creator, team
+    PRIMARY KEY (principal, bid_id, reason)
+);
+
+CREATE INDEX IF NOT EXISTS idx_bid_visibility_bid_id ON bid_visibility (bid_id);
+
+-- Backfill
+INSERT INTO bid_visibility (principal, bid_id, reason)
+SELECT 'user:' || ba.user_id, ba.bid_id, 'grant'
+FROM bid_access ba
+WHERE ba.user_id IS NOT NULL
+UNION
+SELECT 'team:' || LOWER(REPLACE(ba.team, ' ', '')), ba.bid_id, 'grant'
+FROM bid_access ba
+WHERE COALESCE(ba.team, '') <> ''
+UNION
+SELECT 'user:' || b.created_by, b.id, 'creator'
+FROM bids b
+WHERE b.created_by IS NOT NULL
+UNION
+SELECT 'team:' || LOWER(REPLACE(vm.team, ' ', '')), b.id, 'team'
+FROM bids b
+JOIN vendor_managers vm ON b.vm_contact = vm.id
+WHERE COALESCE(vm.team, '') <> ''
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,21 @@
+-- Outgoing emails, one row per recipient, delivered by the send_email_outbox
+-- background job so request handlers never wait on SMTP
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id SERIAL PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    bid_id INTEGER REFERENCES bids(id) ON DELETE CASCADE,
+    email VARCHAR(255) NOT NULL,
+    name VARCHAR(255),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, sent, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (next_attempt_at, id) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_email_outbox_bid_id ON email_outbox (bid_id);
+
+-- A recipient has at most one pending copy of the same email
+CREATE UNIQUE INDEX IF NOT EXISTS uq_email_outbox_pending ON email_outbox (kind, bid_id, email) WHERE status = 'pending';
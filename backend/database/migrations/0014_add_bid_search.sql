@@ -0,0 +1,10 @@
+-- Trigram indexes for bid search (see bid_search.py). ILIKE '%term%' on
+-- these columns is answered from the index instead of a scan of every bid.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_bids_bid_number_trgm ON bids USING gin (bid_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_bids_study_name_trgm ON bids USING gin (study_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_clients_client_name_trgm ON clients USING gin (client_name gin_trgm_ops);
+
+-- Prefix matches for terms too short to have a trigram
+CREATE INDEX IF NOT EXISTS idx_bids_bid_number_prefix ON bids (bid_number text_pattern_ops);
@@ -0,0 +1,5 @@
+-- Partner picker filters (see partner_search.py): overlap/containment on the
+-- specialization and coverage arrays, and a case-insensitive name prefix
+CREATE INDEX IF NOT EXISTS idx_partners_specialized ON partners USING gin (specialized);
+CREATE INDEX IF NOT EXISTS idx_partners_geographic_coverage ON partners USING gin (geographic_coverage);
+CREATE INDEX IF NOT EXISTS idx_partners_name_prefix ON partners (LOWER(partner_name) text_pattern_ops);
@@ -0,0 +1,22 @@
+-- Default admin login and sample reference rows for an empty database.
+-- These used to be written (and the admin password re-hashed) every time
+-- the app started. The admin password is 'admin'; change it after the
+-- first login.
+INSERT INTO users (email, name, password_hash, role, team, employee_id, created_at, updated_at)
+SELECT 'admin@example.com', 'Admin User',
+       'pbkdf2:sha256:600000$3IlnoouXyt5RBmp5$3cf47826bcec23da20fde6c6a36d24ad10a7432c40a50293f1f559d8b887d853',
+       'admin', 'Operations', 'EMP001', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+WHERE NOT EXISTS (SELECT 1 FROM users WHERE email = 'admin@example.com');
+
+INSERT INTO clients (client_id, client_name, contact_person, email, phone, country, created_at, updated_at)
+SELECT 'CLIENT001', 'Sample Client Inc', 'John Doe', 'john@sampleclient.com', '+1-555-0123', 'USA',
+       CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+WHERE NOT EXISTS (SELECT 1 FROM clients);
+
+INSERT INTO vendor_managers (vm_id, vm_name, contact_person, reporting_manager, team, created_at, updated_at)
+SELECT 'VM001', 'Sample VM', 'Jane Smith', 'Bob Manager', 'Operations', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+WHERE NOT EXISTS (SELECT 1 FROM vendor_managers);
+
+INSERT INTO sales (sales_id, sales_person, contact_person, reporting_manager, region, created_at, updated_at)
+SELECT 'SALES001', 'Mike Sales', 'Mike Contact', 'Sales Manager', 'north', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+WHERE NOT EXISTS (SELECT 1 FROM sales);
@@ -0,0 +1,31 @@
+-- Indexes for the hot filters that had none; explain_check.py checks that
+-- each hot query uses them.
+
+-- Bid list order (newest numeric bid number first) and the next bid number
+CREATE INDEX IF NOT EXISTS idx_bids_list_order ON bids (
+    (CASE WHEN bid_number ~ '^[0-9]+$' THEN bid_number::bigint ELSE 0 END) DESC,
+    id DESC
+);
+CREATE INDEX IF NOT EXISTS idx_bids_numeric_bid_number ON bids ((bid_number::bigint))
+WHERE bid_number ~ '^[0-9]+$';
+
+-- Creator visibility rows (visibility.py) and "my bids"
+CREATE INDEX IF NOT EXISTS idx_bids_created_by ON bids (created_by);
+
+-- Nightly check_expiring_links job: only links not yet notified
+CREATE INDEX IF NOT EXISTS idx_partner_links_expiring ON partner_links (expires_at)
+WHERE notification_sent = false;
+-- Partner response form looks links up by token
+CREATE INDEX IF NOT EXISTS idx_partner_links_token ON partner_links (token);
+
+-- Per-user grants; per-bid lookups already use the (bid_id, user_id, team)
+-- unique index and per-team visibility is read from bid_visibility
+CREATE INDEX IF NOT EXISTS idx_bid_access_user_id ON bid_access (user_id)
+WHERE user_id IS NOT NULL;
+
+-- Pending access request counts and lists per bid
+CREATE INDEX IF NOT EXISTS idx_bid_access_requests_pending ON bid_access_requests (bid_id, requested_on)
+WHERE status = 'pending';
+
+-- Team expansion for bid access emails (notifications.py)
+CREATE INDEX IF NOT EXISTS idx_users_team ON users (team);
@@ -0,0 +1,111 @@
+-- Append-only log of bid status transitions and per-bid time-in-state
+-- rollups, both written by triggers on bids so every status change is
+-- recorded whichever handler makes it. The handlers only name the user
+-- (status_history.set_actor); turnaround and stage-duration metrics read
+-- bid_state_durations (see status_history.py).
+CREATE TABLE IF NOT EXISTS bid_status_history (
+    id BIGSERIAL PRIMARY KEY,
+    bid_id INTEGER NOT NULL REFERENCES bids(id) ON DELETE CASCADE,
+    from_status bid_status, -- NULL for the bid's first row
+    to_status bid_status NOT NULL,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    changed_by INTEGER, -- users.id, NULL when unknown
+    seconds_in_previous NUMERIC(14,2) -- time spent in from_status
+);
+
+CREATE INDEX IF NOT EXISTS idx_bid_status_history_bid_id ON bid_status_history (bid_id, changed_at);
+CREATE INDEX IF NOT EXISTS idx_bid_status_history_to_status ON bid_status_history (to_status, changed_at);
+
+-- One row per bid and status it has been in. seconds and visits cover the
+-- completed stays; a bid's current status has left_at NULL until it moves on.
+CREATE TABLE IF NOT EXISTS bid_state_durations (
+    bid_id INTEGER NOT NULL REFERENCES bids(id) ON DELETE CASCADE,
+    status bid_status NOT NULL,
+    first_entered_at TIMESTAMP NOT NULL,
+    last_entered_at TIMESTAMP NOT NULL,
+    left_at TIMESTAMP,
+    visits INTEGER NOT NULL DEFAULT 1,
+    seconds NUMERIC(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (bid_id, status)
+);
+
+CREATE INDEX IF NOT EXISTS idx_bid_state_durations_status ON bid_state_durations (status, first_entered_at);
+
+CREATE OR REPLACE FUNCTION record_bid_status(
+    p_bid_id INTEGER,
+    p_from bid_status,
+    p_to bid_status,
+    p_at TIMESTAMP,
+    p_by INTEGER
+)
+RETURNS void AS $$
+DECLARE
+    stay NUMERIC(14,2);
+BEGIN
+    IF p_from IS NOT NULL THEN
+        UPDATE bid_state_durations
+        SET seconds = seconds + GREATEST(EXTRACT(EPOCH FROM p_at - last_entered_at), 0),
+            left_at = p_at
+        WHERE bid_id = p_bid_id AND status = p_from
+        RETURNING GREATEST(EXTRACT(EPOCH FROM p_at - last_entered_at), 0) INTO stay;
+    END IF;
+
+    INSERT INTO bid_status_history (
+        bid_id, from_status, to_status, changed_at, changed_by, seconds_in_previous
+    ) VALUES (p_bid_id, p_from, p_to, p_at, p_by, stay);
+
+    INSERT INTO bid_state_durations (bid_id, status, first_entered_at, last_entered_at)
+    VALUES (p_bid_id, p_to, p_at, p_at)
+    ON CONFLICT (bid_id, status) DO UPDATE SET
+        last_entered_at = EXCLUDED.last_entered_at,
+        left_at = NULL,
+        visits = bid_state_durations.visits + 1;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The acting user is set per transaction with
+-- set_config('bidm.user_id', ..., true); unset means unknown
+CREATE OR REPLACE FUNCTION log_bid_status_change()
+RETURNS trigger AS $$
+BEGIN
+    PERFORM record_bid_status(
+        NEW.id,
+        CASE WHEN TG_OP = 'UPDATE' THEN OLD.status END,
+        NEW.status,
+        CURRENT_TIMESTAMP::timestamp,
+        NULLIF(current_setting('bidm.user_id', true), '')::integer
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS bids_status_history_insert ON bids;
+CREATE TRIGGER bids_status_history_insert
+AFTER INSERT ON bids
+FOR EACH ROW
+WHEN (NEW.status IS NOT NULL)
+EXECUTE FUNCTION log_bid_status_change();
+
+DROP TRIGGER IF EXISTS bids_status_history_update ON bids;
+CREATE TRIGGER bids_status_history_update
+AFTER UPDATE OF status ON bids
+FOR EACH ROW
+WHEN (OLD.status IS DISTINCT FROM NEW.status AND NEW.status IS NOT NULL)
+EXECUTE FUNCTION log_bid_status_change();
+
+-- Backfill. Earlier transitions were never recorded, so each existing bid
+-- gets the best available estimate: draft at created_at and, if it has
+-- moved on, its current status at updated_at.
+SELECT record_bid_status(b.id, NULL, 'draft', COALESCE(b.created_at, b.updated_at, CURRENT_TIMESTAMP::timestamp), NULL)
+FROM bids b
+WHERE b.status IS NOT NULL
+AND NOT EXISTS (SELECT 1 FROM bid_status_history h WHERE h.bid_id = b.id)
+ORDER BY b.id;
+
+SELECT record_bid_status(b.id, 'draft', b.status, GREATEST(b.updated_at, b.created_at), NULL)
+FROM bids b
+WHERE b.status IS NOT NULL
+AND b.status <> 'draft'
+AND b.updated_at IS NOT NULL
+AND (SELECT COUNT(*) FROM bid_status_history h WHERE h.bid_id = b.id) = 1
+ORDER BY b.id;
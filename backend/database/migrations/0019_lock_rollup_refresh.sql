@@ -0,0 +1,76 @@
+-- Concurrent cell writes on one bid both ran refresh_bid_rollups. Under
+-- READ COMMITTED the second DELETE could not see the rows the first had
+-- just inserted, so its INSERT failed on the primary key. Refreshes of a
+-- bid now queue on a per-bid transaction lock (taken in bid order, so two
+-- multi-bid refreshes cannot deadlock) and both inserts upsert.
+CREATE OR REPLACE FUNCTION refresh_bid_rollups(bid_ids INTEGER[])
+RETURNS void AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(734210039, id)
+    FROM (SELECT DISTINCT unnest(bid_ids) as id) ids
+    WHERE id IS NOT NULL
+    ORDER BY id;
+
+    DELETE FROM bid_partner_rollups r
+    WHERE r.bid_id = ANY(bid_ids)
+    AND NOT EXISTS (
+        SELECT 1 FROM bid_partner_rollup_source s
+        WHERE s.partner_response_id = r.partner_response_id
+        AND s.bid_id = r.bid_id
+    );
+    INSERT INTO bid_partner_rollups (
+        partner_response_id, bid_id, partner_id, loi, cell_count, allocation,
+        n_delivered, quality_rejects, avg_final_loi, avg_final_ir,
+        avg_initial_cpi, avg_final_cpi, initial_cost, final_cost
+    )
+    SELECT
+        partner_response_id, bid_id, partner_id, loi, cell_count, allocation,
+        n_delivered, quality_rejects, avg_final_loi, avg_final_ir,
+        avg_initial_cpi, avg_final_cpi, initial_cost, final_cost
+    FROM bid_partner_rollup_source
+    WHERE bid_id = ANY(bid_ids)
+    ON CONFLICT (partner_response_id) DO UPDATE SET
+        bid_id = EXCLUDED.bid_id,
+        partner_id = EXCLUDED.partner_id,
+        loi = EXCLUDED.loi,
+        cell_count = EXCLUDED.cell_count,
+        allocation = EXCLUDED.allocation,
+        n_delivered = EXCLUDED.n_delivered,
+        quality_rejects = EXCLUDED.quality_rejects,
+        avg_final_loi = EXCLUDED.avg_final_loi,
+        avg_final_ir = EXCLUDED.avg_final_ir,
+        avg_initial_cpi = EXCLUDED.avg_initial_cpi,
+        avg_final_cpi = EXCLUDED.avg_final_cpi,
+        initial_cost = EXCLUDED.initial_cost,
+        final_cost = EXCLUDED.final_cost,
+        refreshed_at = CURRENT_TIMESTAMP;
+
+    DELETE FROM bid_rollups r
+    WHERE r.bid_id = ANY(bid_ids)
+    AND NOT EXISTS (SELECT 1 FROM bid_rollup_source s WHERE s.bid_id = r.bid_id);
+    INSERT INTO bid_rollups (
+        bid_id, cell_count, allocation, n_delivered, quality_rejects,
+        avg_final_loi, avg_final_ir, avg_initial_cpi, avg_final_cpi,
+        initial_cost, final_cost
+    )
+    SELECT
+        s.bid_id, s.cell_count, s.allocation, s.n_delivered, s.quality_rejects,
+        s.avg_final_loi, s.avg_final_ir, s.avg_initial_cpi, s.avg_final_cpi,
+        s.initial_cost, s.final_cost
+    FROM bid_rollup_source s
+    JOIN bids b ON b.id = s.bid_id
+    WHERE s.bid_id = ANY(bid_ids)
+    ON CONFLICT (bid_id) DO UPDATE SET
+        cell_count = EXCLUDED.cell_count,
+        allocation = EXCLUDED.allocation,
+        n_delivered = EXCLUDED.n_delivered,
+        quality_rejects = EXCLUDED.quality_rejects,
+        avg_final_loi = EXCLUDED.avg_final_loi,
+        avg_final_ir = EXCLUDED.avg_final_ir,
+        avg_initial_cpi = EXCLUDED.avg_initial_cpi,
+        avg_final_cpi = EXCLUDED.avg_final_cpi,
+        initial_cost = EXCLUDED.initial_cost,
+        final_cost = EXCLUDED.final_cost,
+        refreshed_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
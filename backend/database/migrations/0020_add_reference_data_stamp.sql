@@ -0,0 +1,34 @@
+-- One-row change counter for the reference tables, bumped by statement
+-- triggers on every write. Each worker's ReferenceDataCache compares it
+-- with the value it loaded under (see reference_cache.py), so a write made
+-- through any worker, the bulk import or plain SQL reaches every worker.
+CREATE TABLE IF NOT EXISTS reference_data_stamp (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    counter BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO reference_data_stamp (id) VALUES (TRUE) ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_reference_data_stamp()
+RETURNS trigger AS $$
+BEGIN
+    UPDATE reference_data_stamp
+    SET counter = counter + 1,
+        changed_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['clients', 'vendor_managers', 'sales', 'partners'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_reference_stamp', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_reference_data_stamp()',
+            t || '_reference_stamp', t);
+    END LOOP;
+END $$;
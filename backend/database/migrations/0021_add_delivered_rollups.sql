@@ -0,0 +1,120 @@
+-- The invoice queue's averages, as it computed them before 0011: over
+-- delivered cells only, with LOI falling back to the quoted timeline. The
+-- general columns, which also count allocated but undelivered cells, are
+-- unchanged.
+ALTER TABLE bid_rollups
+    ADD COLUMN IF NOT EXISTS delivered_allocation BIGINT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS delivered_avg_final_loi NUMERIC(10,2),
+    ADD COLUMN IF NOT EXISTS delivered_avg_final_ir NUMERIC(10,2),
+    ADD COLUMN IF NOT EXISTS delivered_avg_initial_cpi NUMERIC(12,2),
+    ADD COLUMN IF NOT EXISTS delivered_avg_final_cpi NUMERIC(12,2);
+
+CREATE OR REPLACE VIEW bid_rollup_source AS
+SELECT
+    pr.bid_id,
+    COUNT(par.id) as cell_count,
+    COALESCE(SUM(par.allocation), 0) as allocation,
+    COALESCE(SUM(par.n_delivered), 0) as n_delivered,
+    COALESCE(SUM(par.quality_rejects), 0) as quality_rejects,
+    ROUND(AVG(par.final_loi), 2) as avg_final_loi,
+    ROUND(AVG(par.final_ir), 2) as avg_final_ir,
+    ROUND(AVG(par.cpi), 2) as avg_initial_cpi,
+    ROUND(AVG(COALESCE(par.final_cpi, par.cpi)), 2) as avg_final_cpi,
+    ROUND(COALESCE(SUM(COALESCE(NULLIF(par.initial_cost, 0), par.n_delivered * par.cpi)), 0), 2) as initial_cost,
+    ROUND(COALESCE(SUM(COALESCE(NULLIF(par.final_cost, 0), par.n_delivered * COALESCE(par.final_cpi, par.cpi))), 0), 2) as final_cost,
+    COALESCE(SUM(par.allocation) FILTER (WHERE par.n_delivered > 0), 0) as delivered_allocation,
+    ROUND(AVG(COALESCE(par.final_loi, par.timeline_days)) FILTER (WHERE par.n_delivered > 0), 2) as delivered_avg_final_loi,
+    ROUND(AVG(par.final_ir) FILTER (WHERE par.n_delivered > 0), 2) as delivered_avg_final_ir,
+    ROUND(AVG(par.cpi) FILTER (WHERE par.n_delivered > 0), 2) as delivered_avg_initial_cpi,
+    ROUND(AVG(COALESCE(par.final_cpi, par.cpi)) FILTER (WHERE par.n_delivered > 0), 2) as delivered_avg_final_cpi
+FROM partner_responses pr
+JOIN partner_audience_responses par ON (
+    par.partner_response_id = pr.id
+    AND (par.allocation > 0 OR par.n_delivered > 0)
+)
+GROUP BY pr.bid_id;
+
+-- As in 0019, plus the delivered-only columns
+CREATE OR REPLACE FUNCTION refresh_bid_rollups(bid_ids INTEGER[])
+RETURNS void AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(734210039, id)
+    FROM (SELECT DISTINCT unnest(bid_ids) as id) ids
+    WHERE id IS NOT NULL
+    ORDER BY id;
+
+    DELETE FROM bid_partner_rollups r
+    WHERE r.bid_id = ANY(bid_ids)
+    AND NOT EXISTS (
+        SELECT 1 FROM bid_partner_rollup_source s
+        WHERE s.partner_response_id = r.partner_response_id
+        AND s.bid_id = r.bid_id
+    );
+    INSERT INTO bid_partner_rollups (
+        partner_response_id, bid_id, partner_id, loi, cell_count, allocation,
+        n_delivered, quality_rejects, avg_final_loi, avg_final_ir,
+        avg_initial_cpi, avg_final_cpi, initial_cost, final_cost
+    )
+    SELECT
+        partner_response_id, bid_id, partner_id, loi, cell_count, allocation,
+        n_delivered, quality_rejects, avg_final_loi, avg_final_ir,
+        avg_initial_cpi, avg_final_cpi, initial_cost, final_cost
+    FROM bid_partner_rollup_source
+    WHERE bid_id = ANY(bid_ids)
+    ON CONFLICT (partner_response_id) DO UPDATE SET
+        bid_id = EXCLUDED.bid_id,
+        partner_id = EXCLUDED.partner_id,
+        loi = EXCLUDED.loi,
+        cell_count = EXCLUDED.cell_count,
+        allocation = EXCLUDED.allocation,
+        n_delivered = EXCLUDED.n_delivered,
+        quality_rejects = EXCLUDED.quality_rejects,
+        avg_final_loi = EXCLUDED.avg_final_loi,
+        avg_final_ir = EXCLUDED.avg_final_ir,
+        avg_initial_cpi = EXCLUDED.avg_initial_cpi,
+        avg_final_cpi = EXCLUDED.avg_final_cpi,
+        initial_cost = EXCLUDED.initial_cost,
+        final_cost = EXCLUDED.final_cost,
+        refreshed_at = CURRENT_TIMESTAMP;
+
+    DELETE FROM bid_rollups r
+    WHERE r.bid_id = ANY(bid_ids)
+    AND NOT EXISTS (SELECT 1 FROM bid_rollup_source s WHERE s.bid_id = r.bid_id);
+    INSERT INTO bid_rollups (
+        bid_id, cell_count, allocation, n_delivered, quality_rejects,
+        avg_final_loi, avg_final_ir, avg_initial_cpi, avg_final_cpi,
+        initial_cost, final_cost, delivered_allocation,
+        delivered_avg_final_loi, delivered_avg_final_ir,
+        delivered_avg_initial_cpi, delivered_avg_final_cpi
+    )
+    SELECT
+        s.bid_id, s.cell_count, s.allocation, s.n_delivered, s.quality_rejects,
+        s.avg_final_loi, s.avg_final_ir, s.avg_initial_cpi, s.avg_final_cpi,
+        s.initial_cost, s.final_cost, s.delivered_allocation,
+        s.delivered_avg_final_loi, s.delivered_avg_final_ir,
+        s.delivered_avg_initial_cpi, s.delivered_avg_final_cpi
+    FROM bid_rollup_source s
+    JOIN bids b ON b.id = s.bid_id
+    WHERE s.bid_id = ANY(bid_ids)
+    ON CONFLICT (bid_id) DO UPDATE SET
+        cell_count = EXCLUDED.cell_count,
+        allocation = EXCLUDED.allocation,
+        n_delivered = EXCLUDED.n_delivered,
+        quality_rejects = EXCLUDED.quality_rejects,
+        avg_final_loi = EXCLUDED.avg_final_loi,
+        avg_final_ir = EXCLUDED.avg_final_ir,
+        avg_initial_cpi = EXCLUDED.avg_initial_cpi,
+        avg_final_cpi = EXCLUDED.avg_final_cpi,
+        initial_cost = EXCLUDED.initial_cost,
+        final_cost = EXCLUDED.final_cost,
+        delivered_allocation = EXCLUDED.delivered_allocation,
+        delivered_avg_final_loi = EXCLUDED.delivered_avg_final_loi,
+        delivered_avg_final_ir = EXCLUDED.delivered_avg_final_ir,
+        delivered_avg_initial_cpi = EXCLUDED.delivered_avg_initial_cpi,
+        delivered_avg_final_cpi = EXCLUDED.delivered_avg_final_cpi,
+        refreshed_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill
+SELECT refresh_bid_rollups(ARRAY(SELECT id FROM bids));
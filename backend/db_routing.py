@@ -0,0 +1,157 @@
+# Local check against two Postgres instances: point DATABASE_URL at one and
+# DATABASE_REPLICA_URL at the other (a standby, or a plain copy restored from
+# migrate.py up), then watch the X-DB-Route response header. Reads marked
+# @replica_read report 'replica'; after a POST/PUT they report 'primary'
+# until X-Primary-Until passes. Stopping the second instance, or setting
+# REPLICA_MAX_LAG_SECONDS=-1, sends everything back to the primary.
+import os
+import threading
+import time
+
+import psycopg2
+
+# A replica further behind the primary than this is skipped
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))
+# Replica lag is measured at most this often per worker
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv('REPLICA_LAG_CHECK_SECONDS', 2))
+# How long a client keeps reading from the primary after its own write. Kept
+# at least as long as the lag we accept plus the age the cached measurement
+# can reach, so a write is always visible to the client that made it.
+REPLICA_STICKY_SECONDS = max(
+    float(os.getenv('REPLICA_STICKY_SECONDS', 10)),
+    REPLICA_MAX_LAG_SECONDS + REPLICA_LAG_CHECK_SECONDS)
+
+# Epoch time until which a client reads from the primary. Sent back on
+# successful writes and echoed by the frontend on later requests; a header
+# rather than a cookie so it also works when the API is on another origin.
+STICKY_HEADER = 'X-Primary-Until'
+
+# Read on the primary just before LAG_QUERY runs on the replica
+PRIMARY_LSN_QUERY = "SELECT pg_current_wal_lsn()"
+
+# 0 when the replica is not a standby (two independent local instances) or
+# has replayed everything the primary had written when PRIMARY_LSN_QUERY
+# ran; otherwise seconds since the last replayed transaction. Comparing
+# against the primary rather than against what the standby received means
+# a standby that stopped receiving WAL shows its lag growing instead of 0.
+# NULL (nothing replayed yet) counts as unusable.
+LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_replay_lsn() >= %s::pg_lsn THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+class DatabaseRouter:
+    """Hands out primary or read-replica connections.
+
+    The replica is only used when DATABASE_REPLICA_URL is set, the caller
+    asked for a read, and the last lag measurement is within
+    REPLICA_MAX_LAG_SECONDS. Replica connections are read-only sessions, so
+    a handler that writes by mistake fails instead of diverging.
+    """
+
+    def __init__(self,
+                 primary_url=None,
+                 replica_url=None,
+                 max_lag=REPLICA_MAX_LAG_SECONDS,
+                 lag_check_interval=REPLICA_LAG_CHECK_SECONDS):
+        self.primary_url = primary_url or os.getenv('DATABASE_URL')
+        self.replica_url = replica_url or os.getenv('DATABASE_REPLICA_URL')
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self._lock = threading.Lock()
+        # (lag seconds or None when unreachable, measured_at)
+        self._lag = None
+
+    def reset(self):
+        """Forget lag state copied from the parent in a forked worker."""
+        self._lock = threading.Lock()
+        self._lag = None
+
+    @property
+    def has_replica(self):
+        return bool(self.replica_url)
+
+    def connect_primary(self):
+        if not self.primary_url:
+            raise Exception("DATABASE_URL environment variable not set")
+        return psycopg2.connect(self.primary_url)
+
+    def _primary_lsn(self):
+        conn = psycopg2.connect(self.primary_url, connect_timeout=2)
+        try:
+            cur = conn.cursor()
+            cur.execute(PRIMARY_LSN_QUERY)
+            return cur.fetchone()[0]
+        finally:
+            conn.close()
+
+    def _measure_lag(self):
+        try:
+            primary_lsn = self._primary_lsn()
+        except psycopg2.Error as e:
+            print(f"Error reading primary WAL position: {str(e)}")
+            return None
+        try:
+            conn = psycopg2.connect(self.replica_url, connect_timeout=2)
+        except psycopg2.Error as e:
+            print(f"Replica unreachable: {str(e)}")
+            return None
+        try:
+            cur = conn.cursor()
+            cur.execute(LAG_QUERY, (primary_lsn, ))
+            lag = cur.fetchone()[0]
+            return float(lag) if lag is not None else None
+        except psycopg2.Error as e:
+            print(f"Error measuring replica lag: {str(e)}")
+            return None
+        finally:
+            conn.close()
+
+    def replica_lag(self):
+        """Last measured lag in seconds, or None if the replica is unusable."""
+        with self._lock:
+            entry = self._lag
+            if entry is None or time.monotonic(
+            ) - entry[1] >= self.lag_check_interval:
+                entry = (self._measure_lag(), time.monotonic())
+                self._lag = entry
+        return entry[0]
+
+    def replica_usable(self):
+        if not self.has_replica:
+            return False
+        lag = self.replica_lag()
+        return lag is not None and lag <= self.max_lag
+
+    def connect(self, read_only=False):
+        """Return (connection, 'replica' | 'primary')."""
+        if read_only and self.replica_usable():
+            try:
+                conn = psycopg2.connect(self.replica_url)
+                conn.set_session(readonly=True)
+                return conn, 'replica'
+            except psycopg2.Error as e:
+                print(f"Replica connection failed, using primary: {str(e)}")
+                with self._lock:
+                    self._lag = (None, time.monotonic())
+        return self.connect_primary(), 'primary'
+
+
+def sticky_until(header_value):
+    try:
+        return float(header_value or 0)
+    except ValueError:
+        return 0.0
+
+
+def is_sticky(header_value, now=None):
+    """True while a client should still read its own writes from the primary."""
+    return sticky_until(header_value) > (now or time.time())
+
+
+def next_sticky_until(now=None):
+    return (now or time.time()) + REPLICA_STICKY_SECONDS
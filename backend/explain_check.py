@@ -0,0 +1,187 @@
+"""EXPLAIN regression check for the hot queries.
+
+Runs EXPLAIN on each query in hot_queries() with sequential scans
+disabled, and fails if a large table is still read with a Seq Scan, i.e.
+no index can serve that query at all. With enable_seqscan off the planner
+only falls back to a Seq Scan when there is no alternative, so the check
+gives the same answer on a freshly migrated empty database as on a seeded
+copy of production:
+
+    python migrate.py && python explain_check.py
+    python explain_check.py --verbose     # print every plan
+
+Queries built by the backend modules are taken from those modules; the
+few that only exist inline in main.py are repeated here and named after
+their handler, so keep them in step when the handler changes.
+"""
+import argparse
+import json
+import os
+
+import psycopg2
+from dotenv import load_dotenv
+
+import bid_search
+import notifications
+import partner_search
+import queues
+import status_history
+import visibility
+
+load_dotenv()
+
+# Tables expected to grow with the business; a Seq Scan on any of these is
+# a failure. Reference tables (clients, partners, sales, vendor_managers)
+# stay small and are allowed to be scanned.
+LARGE_TABLES = {
+    'bids', 'bid_target_audiences', 'bid_audience_countries',
+    'bid_po_numbers', 'partner_responses', 'partner_audience_responses',
+    'partner_links', 'proposals', 'bid_access', 'bid_access_requests',
+    'bid_visibility', 'bid_rollups', 'bid_partner_rollups', 'email_outbox',
+    'users', 'bid_status_history', 'bid_state_durations'
+}
+
+
+class QueryArgs(dict):
+    """Stands in for request.args."""
+
+    def getlist(self, name):
+        value = self.get(name)
+        return [value] if value is not None else []
+
+
+def hot_queries():
+    """[(name, sql, params)]"""
+    principals = visibility.principals(1, 'Operations')
+    queries = [
+        ('get_bids', *bid_search.list_query(principals, True, '', 20, 0)),
+        ('get_bids (super admin)',
+         *bid_search.list_query(principals, False, '', 20, 0)),
+        ('get_bids (search)',
+         *bid_search.list_query(principals, True, 'survey', 20, 0)),
+        ('get_bids (short search)',
+         *bid_search.list_query(principals, True, '33', 20, 0)),
+        ('search_bids', *bid_search.search_query('survey', principals)),
+        ('search_partners',
+         *partner_search.partner_query(
+             QueryArgs(countries='India,Japan', name='ac'), 1, 20)),
+        ('check_bid_access', """
+            SELECT EXISTS (
+                SELECT 1 FROM bid_visibility
+                WHERE principal = ANY(%s) AND bid_id = %s
+            )
+        """, [principals, 1]),
+        ('next_bid_number', """
+            SELECT MAX(bid_number::bigint) as max_bid_number
+            FROM bids
+            WHERE bid_number ~ '^[0-9]+$'
+        """, []),
+        ('check_expiring_links', """
+            SELECT pl.*, p.contact_email, p.partner_name, b.bid_number, b.study_name
+            FROM partner_links pl
+            JOIN partners p ON p.id = pl.partner_id
+            JOIN bids b ON b.id = pl.bid_id
+            WHERE pl.expires_at BETWEEN NOW() AND NOW() + INTERVAL '3 days'
+            AND pl.notification_sent = false
+        """, []),
+        ('partner link by token', """
+            SELECT bid_id, partner_id, expires_at FROM partner_links WHERE token = %s
+        """, ['token']),
+        ('get_pending_requests_batch', """
+            SELECT bid_id, COUNT(*) as pending_count
+            FROM bid_access_requests
+            WHERE bid_id = ANY(%s) AND status = 'pending'
+            GROUP BY bid_id
+        """, [[1, 2, 3]]),
+        ('get_access_requests', """
+            SELECT r.id, r.user_id, r.team, r.requested_on, r.status, u.email, u.name
+            FROM bid_access_requests r
+            LEFT JOIN users u ON r.user_id = u.id
+            WHERE r.bid_id = %s AND r.status = 'pending'
+            ORDER BY r.requested_on
+        """, [1]),
+        ('enqueue_bid_access',
+         *notifications.enqueue_bid_access_query(1, 1, 'Operations')),
+        ('send_email_outbox', *notifications.claim_batch_query()),
+        ('bid status history', """
+            SELECT h.from_status, h.to_status, h.changed_at
+            FROM bid_status_history h
+            WHERE h.bid_id = %s
+            ORDER BY h.changed_at, h.id
+        """, [1]),
+    ]
+    for group_by in status_history.GROUPS:
+        queries.append((f"turnaround ({group_by})",
+                        *status_history.turnaround_query(group_by)))
+    for queue in queues.QUEUES:
+        queries.append((f"get_queue ({queue})",
+                        *queues.queue_query(queue, QueryArgs(), 1, 20)))
+        queries.append((f"get_queue ({queue}, search)",
+                        *queues.queue_query(queue, QueryArgs(search='acme'),
+                                            1, 20)))
+    return queries
+
+
+def seq_scans(plan):
+    """Relations read by a Seq Scan anywhere in a JSON plan node."""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def check(conn, verbose=False):
+    """[(query name, [large tables scanned])] for every failing query."""
+    failures = []
+    cur = conn.cursor()
+    try:
+        cur.execute("SET enable_seqscan = off")
+        for name, sql, params in hot_queries():
+            cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cur.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            root = plan[0]['Plan']
+            if verbose:
+                cur.execute(f"EXPLAIN {sql}", params)
+                print(f"-- {name}")
+                print('\n'.join(row[0] for row in cur.fetchall()))
+            scanned = sorted(
+                {t
+                 for t in seq_scans(root) if t in LARGE_TABLES})
+            if scanned:
+                failures.append((name, scanned))
+    finally:
+        conn.rollback()
+        cur.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fail if a hot query needs a sequential scan")
+    parser.add_argument('--verbose',
+                        action='store_true',
+                        help="print the plan of every query")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        failures = check(conn, verbose=args.verbose)
+    finally:
+        conn.close()
+
+    checked = len(hot_queries())
+    if not failures:
+        print(f"{checked} hot queries checked, no sequential scans")
+        return
+    for name, tables in failures:
+        print(f"  {name}: Seq Scan on {', '.join(tables)}")
+    print(f"{len(failures)} of {checked} hot queries need a sequential scan")
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
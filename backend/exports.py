@@ -0,0 +1,298 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response, stream_with_context
+
+# Rows pulled from the server-side cursor per round trip
+EXPORT_ITERSIZE = int(os.getenv('EXPORT_ITERSIZE', 2000))
+# Rows buffered before a CSV chunk is handed to the client
+CSV_CHUNK_ROWS = 500
+XLSX_READ_CHUNK = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+BID_LIST_COLUMNS = [
+    'bid_id', 'bid_number', 'bid_date', 'study_name', 'methodology', 'status',
+    'client_name', 'team', 'vm_name', 'sales_person', 'po_number',
+    'created_at', 'updated_at'
+]
+
+BID_MATRIX_COLUMNS = [
+    'bid_number', 'study_name', 'partner_id', 'partner_name', 'loi',
+    'response_status', 'currency', 'pmf', 'audience_id', 'audience_name',
+    'ta_category', 'broader_category', 'mode', 'country', 'sample_size',
+    'commitment_type', 'commitment', 'cpi', 'timeline_days', 'allocation',
+    'n_delivered', 'quality_rejects', 'final_loi', 'final_ir',
+    'final_timeline', 'final_cpi', 'initial_cost', 'final_cost', 'savings',
+    'field_close_date', 'comments'
+]
+
+INVOICE_COLUMNS = [
+    'bid_number', 'po_number', 'partner_id', 'partner_name', 'loi',
+    'invoice_date', 'invoice_sent', 'invoice_serial', 'invoice_number',
+    'invoice_amount', 'audience_id', 'audience_name', 'country', 'allocation',
+    'n_delivered', 'initial_cpi', 'final_cpi', 'initial_cost', 'final_cost',
+    'savings'
+]
+
+
+def parse_format(value):
+    """Validate the ?format= argument, defaulting to CSV."""
+    export_format = (value or 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    return export_format
+
+
+def bid_list_query(args, principals=None):
+    """Bid list export filtered by status, client, team and bid date range.
+
+    principals limits the export to bids in bid_visibility for those
+    principals, as get_bids does; None means every bid (super admins).
+    """
+    conditions = []
+    params = []
+
+    if principals is not None:
+        conditions.append("""b.id IN (
+            SELECT bid_id FROM bid_visibility WHERE principal = ANY(%s)
+        )""")
+        params.append(principals)
+
+    if args.get('status'):
+        conditions.append("b.status::text = ANY(%s)")
+        params.append(args.get('status').split(','))
+    if args.get('client'):
+        conditions.append("b.client = %s")
+        params.append(int(args.get('client')))
+    if args.get('team'):
+        # Same normalisation get_bids uses for team matching
+        conditions.append(
+            "LOWER(REPLACE(vm.team, ' ', '')) = LOWER(REPLACE(%s, ' ', ''))")
+        params.append(args.get('team'))
+    if args.get('date_from'):
+        conditions.append("b.bid_date >= %s::date")
+        params.append(args.get('date_from'))
+    if args.get('date_to'):
+        conditions.append("b.bid_date <= %s::date")
+        params.append(args.get('date_to'))
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    sql = f"""
+        SELECT
+            b.id as bid_id,
+            b.bid_number,
+            b.bid_date,
+            b.study_name,
+            b.methodology,
+            b.status,
+            c.client_name,
+            vm.team,
+            vm.vm_name,
+            s.sales_person,
+            bpo.po_number,
+            b.created_at,
+            b.updated_at
+        FROM bids b
+        LEFT JOIN clients c ON b.client = c.id
+        LEFT JOIN vendor_managers vm ON b.vm_contact = vm.id
+        LEFT JOIN sales s ON b.sales_contact = s.id
+        LEFT JOIN bid_po_numbers bpo ON bpo.bid_id = b.id
+        {where}
+        ORDER BY b.bid_date DESC, b.id DESC
+    """
+    return sql, params
+
+
+def bid_matrix_query(bid_id):
+    """Every partner x audience x country x LOI cell recorded for a bid."""
+    sql = """
+        SELECT
+            b.bid_number,
+            b.study_name,
+            p.id as partner_id,
+            p.partner_name,
+            pr.loi,
+            pr.status as response_status,
+            pr.currency,
+            pr.pmf,
+            bta.id as audience_id,
+            bta.audience_name,
+            bta.ta_category,
+            bta.broader_category,
+            bta.mode,
+            par.country,
+            bac.sample_size,
+            par.commitment_type,
+            par.commitment,
+            par.cpi,
+            par.timeline_days,
+            par.allocation,
+            par.n_delivered,
+            par.quality_rejects,
+            par.final_loi,
+            par.final_ir,
+            par.final_timeline,
+            par.final_cpi,
+            par.initial_cost,
+            par.final_cost,
+            par.savings,
+            par.field_close_date,
+            par.comments
+        FROM partner_audience_responses par
+        JOIN partner_responses pr ON par.partner_response_id = pr.id
+        JOIN partners p ON pr.partner_id = p.id
+        JOIN bids b ON par.bid_id = b.id
+        JOIN bid_target_audiences bta ON par.audience_id = bta.id
+        LEFT JOIN bid_audience_countries bac ON (
+            bac.audience_id = par.audience_id
+            AND bac.country = par.country
+        )
+        WHERE par.bid_id = %s
+        ORDER BY p.partner_name, pr.loi, bta.id, par.country
+    """
+    return sql, [bid_id]
+
+
+def invoice_deliverables_query(bid_id):
+    """Delivered cells with invoice headers, as shown on the invoice screen."""
+    sql = """
+        SELECT
+            b.bid_number,
+            bpo.po_number,
+            p.id as partner_id,
+            p.partner_name,
+            pr.loi,
+            pr.invoice_date,
+            pr.invoice_sent,
+            pr.invoice_serial,
+            pr.invoice_number,
+            pr.invoice_amount,
+            par.audience_id,
+            bta.audience_name,
+            par.country,
+            par.allocation,
+            par.n_delivered,
+            par.cpi as initial_cpi,
+            COALESCE(par.final_cpi, par.cpi) as final_cpi,
+            COALESCE(par.initial_cost, par.n_delivered * par.cpi) as initial_cost,
+            COALESCE(par.final_cost, par.final_cpi * par.n_delivered) as final_cost,
+            COALESCE(par.initial_cost, par.n_delivered * par.cpi)
+                - COALESCE(par.final_cost, par.final_cpi * par.n_delivered) as savings
+        FROM partner_audience_responses par
+        JOIN partner_responses pr ON par.partner_response_id = pr.id
+        JOIN partners p ON pr.partner_id = p.id
+        JOIN bids b ON par.bid_id = b.id
+        JOIN bid_target_audiences bta ON par.audience_id = bta.id
+        LEFT JOIN bid_po_numbers bpo ON bpo.bid_id = b.id
+        WHERE par.bid_id = %s
+        AND par.n_delivered > 0
+        ORDER BY p.partner_name, pr.loi, par.audience_id, par.country
+    """
+    return sql, [bid_id]
+
+
+def _stream_rows(conn, cursor_name, sql, params):
+    """Yield rows from a named (server-side) cursor, EXPORT_ITERSIZE at a time."""
+    try:
+        conn.readonly = True
+        cur = conn.cursor(name=cursor_name)
+        cur.itersize = EXPORT_ITERSIZE
+        cur.execute(sql, params)
+        for row in cur:
+            yield row
+        cur.close()
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def _text_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(v) for v in value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _xlsx_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(v) for v in value)
+    return value
+
+
+def _csv_chunks(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for index, row in enumerate(rows, 1):
+        writer.writerow([_text_value(value) for value in row])
+        if index % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def _xlsx_chunks(columns, rows, sheet_name):
+    # constant_memory flushes each finished row to a temp file, so only the
+    # final zip step touches the whole workbook, and that happens on disk.
+    import xlsxwriter
+
+    with tempfile.NamedTemporaryFile(suffix='.xlsx') as tmp:
+        workbook = xlsxwriter.Workbook(
+            tmp.name, {
+                'constant_memory': True,
+                'default_date_format': 'yyyy-mm-dd',
+                'remove_timezone': True
+            })
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        worksheet.write_row(0, 0, columns)
+        for index, row in enumerate(rows, 1):
+            worksheet.write_row(index, 0,
+                                [_xlsx_value(value) for value in row])
+        workbook.close()
+
+        with open(tmp.name, 'rb') as f:
+            while True:
+                chunk = f.read(XLSX_READ_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+
+
+def export_response(connection_factory, name, columns, sql, params,
+                    export_format):
+    """Stream a query result to the client as a CSV or XLSX download."""
+    # Connect before the response starts, so routing headers (X-DB-Route)
+    # are set and a connection failure is still an ordinary error response
+    conn = connection_factory()
+    rows = _stream_rows(conn, f"export_{name}", sql, params)
+    if export_format == 'xlsx':
+        chunks = _xlsx_chunks(columns, rows, name)
+    else:
+        chunks = _csv_chunks(columns, rows)
+
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    response = Response(stream_with_context(chunks),
+                        mimetype=EXPORT_FORMATS[export_format],
+                        headers={
+                            'Content-Disposition':
+                            f'attachment; filename="{filename}"',
+                            'X-Accel-Buffering': 'no'
+                        })
+    # The generator's cleanup never runs if the client goes away before the
+    # first chunk
+    response.call_on_close(conn.close)
+    return response
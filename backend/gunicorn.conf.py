@@ -0,0 +1,71 @@
+"""Production server settings.
+
+Run from backend/, after `python migrate.py`:
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is imported once in the master (preload_app), so module imports,
+the reference data cache and the static asset index are built once and
+shared copy-on-write by the forked workers. Each worker then resets its
+replica-lag state and tries to become the one process that runs the
+scheduled jobs (see start_scheduler in main.py).
+
+Sizing: every request thread may hold one database connection, so
+workers * threads is kept within DB_MAX_CONNECTIONS. WEB_CONCURRENCY and
+GUNICORN_THREADS override the derived values.
+
+Reloading: because the app is preloaded, SIGHUP restarts workers but
+keeps the old code. To deploy new code without dropping requests:
+
+    kill -USR2 $(cat $GUNICORN_PIDFILE)        # start a new master + workers
+    kill -QUIT $(cat $GUNICORN_PIDFILE.oldbin) # old master drains and exits
+
+In-flight requests get graceful_timeout seconds to finish.
+
+Throughput: benchmark.py drives the read endpoints with concurrent
+clients. Run it against `python main.py` and then against this config,
+on the same database, and compare the requests/second and p95 it prints.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+preload_app = True
+
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# Database connections this deployment may open across all workers
+DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 40))
+workers = int(
+    os.getenv(
+        'WEB_CONCURRENCY',
+        max(1,
+            min(multiprocessing.cpu_count() * 2 + 1,
+                DB_MAX_CONNECTIONS // threads))))
+
+# Exports and imports can run for a while
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then, staggered so they do not restart together
+max_requests = 2000
+max_requests_jitter = 200
+
+pidfile = os.getenv('GUNICORN_PIDFILE', '/tmp/bidm-gunicorn.pid')
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    # Load the reference data in the master so every worker starts warm
+    import main
+    try:
+        main.reference_cache.snapshot()
+    except Exception as e:
+        server.log.warning(f"Could not preload reference data: {str(e)}")
+
+
+def post_fork(server, worker):
+    import main
+    main.db_router.reset()
+    main.start_scheduler()
@@ -2,7 +2,8 @@ import os
 from dotenv import load_dotenv
 
 load_dotenv()
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, g, has_request_context
+from functools import wraps
 from flask_cors import CORS
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
@@ -16,10 +17,28 @@ import jwt
 from constants import ROLES_AND_PERMISSIONS
 import uuid
 import secrets
+import threading
 from flask_mail import Message, Mail
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import STATE_PAUSED, STATE_RUNNING
 from apscheduler.triggers.cron import CronTrigger
 from urllib.parse import urlsplit, urlunsplit
+from reference_cache import ReferenceDataCache
+from static_assets import StaticAssets
+import exports
+import bulk_import
+import closure_writes
+import allocations
+import proposal_costing
+import queues
+import rollups
+import db_routing
+import visibility
+import notifications
+import bid_search
+import countries
+import partner_search
+import status_history
 
 
 # --- Custom JSON Encoder must be defined before app = Flask(__name__) ---
@@ -48,11 +67,14 @@ CORS(app,
              "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
              "allow_headers": [
                  "Content-Type", "Authorization", "X-User-Id", "X-User-Team",
-                 "X-User-Role", "X-User-Name"
+                 "X-User-Role", "X-User-Name", "X-Primary-Until"
              ],
              "supports_credentials":
              True,
-             "expose_headers": ["Content-Type", "Authorization"]
+             "expose_headers": [
+                 "Content-Type", "Authorization", "X-DB-Route",
+                 "X-Primary-Until"
+             ]
          }
      })
 
@@ -161,100 +183,244 @@ def check_expiring_links():
                 conn.close()
 
 
+def send_email_outbox():
+    """Deliver queued emails (see notifications.py) on one SMTP connection."""
+    with app.app_context():
+        try:
+            conn = get_db_connection()
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            while True:
+                batch = notifications.claim_batch(cur)
+                if not batch:
+                    break
+
+                sent_ids = []
+                failures = {}
+                try:
+                    with mail.connect() as smtp:
+                        for row in batch:
+                            try:
+                                subject, body = notifications.render(row)
+                                msg = Message(
+                                    subject=subject,
+                                    sender=app.config['MAIL_DEFAULT_SENDER'],
+                                    recipients=[row['email']])
+                                msg.body = body
+                                smtp.send(msg)
+                                sent_ids.append(row['id'])
+                            except Exception as email_error:
+                                failures[row['id']] = str(email_error)
+                except Exception as smtp_error:
+                    # Could not connect at all: every unsent row retries
+                    print(f"Error connecting to SMTP server: {str(smtp_error)}")
+                    for row in batch:
+                        if row['id'] not in sent_ids:
+                            failures[row['id']] = str(smtp_error)
+
+                notifications.record_results(cur, sent_ids, failures)
+                conn.commit()
+                print(f"Email outbox: {len(sent_ids)} sent, "
+                      f"{len(failures)} failed")
+                if failures and not sent_ids:
+                    break
+        except Exception as e:
+            print(f"Error sending email outbox: {str(e)}")
+        finally:
+            if 'cur' in locals():
+                cur.close()
+            if 'conn' in locals():
+                conn.close()
+
+
+def wake_email_outbox():
+    # Run the outbox job now instead of waiting for its next interval. In
+    # a process that is not running the scheduler, send from a thread;
+    # claim_batch's SKIP LOCKED keeps that safe next to the scheduled job.
+    try:
+        if scheduler.state == STATE_RUNNING:
+            scheduler.modify_job('send_email_outbox',
+                                 next_run_time=datetime.now())
+        else:
+            threading.Thread(target=send_email_outbox, daemon=True).start()
+    except Exception as e:
+        print(f"Error scheduling email outbox: {str(e)}")
+
+
+scheduler.add_job(send_email_outbox,
+                  'interval',
+                  seconds=int(os.getenv('EMAIL_OUTBOX_INTERVAL', 60)),
+                  id='send_email_outbox',
+                  max_instances=1,
+                  coalesce=True,
+                  replace_existing=True)
+
 # Schedule the task to run daily at midnight
 scheduler.add_job(check_expiring_links,
                   CronTrigger(hour=0, minute=0),
                   id='check_expiring_links',
                   replace_existing=True)
 
-# Start the scheduler when the app starts
-scheduler.start()
+# One process per database runs the scheduled jobs. It holds this session
+# advisory lock on a dedicated connection; the other processes retry every
+# SCHEDULER_RETRY_SECONDS and take over once the holder exits. The holder
+# checks every SCHEDULER_LOCK_CHECK_SECONDS that it still has the lock.
+SCHEDULER_LOCK_KEY = 734_210_049
+SCHEDULER_RETRY_SECONDS = int(os.getenv('SCHEDULER_RETRY_SECONDS', 60))
+SCHEDULER_LOCK_CHECK_SECONDS = int(
+    os.getenv('SCHEDULER_LOCK_CHECK_SECONDS', 10))
+scheduler_lock_conn = None
+
+# pg_locks shows a bigint advisory key split into classid (high 32 bits)
+# and objid (low 32 bits), with objsubid 1
+SCHEDULER_LOCK_HELD_QUERY = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_locks
+        WHERE locktype = 'advisory'
+        AND pid = pg_backend_pid()
+        AND classid = %s AND objid = %s AND objsubid = 1
+        AND granted
+    )
+"""
+
+
+def start_scheduler():
+    """Start the scheduler in this process unless another one runs it.
+
+    Called by __main__ for the dev server and by the gunicorn post_fork hook
+    in each worker, never at import: with preload_app the module is
+    imported by the gunicorn master, and a thread started there would not
+    survive the fork.
+    """
+    global scheduler_lock_conn
+    if scheduler.state == STATE_RUNNING:
+        return True
+    try:
+        conn = db_router.connect_primary()
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (SCHEDULER_LOCK_KEY, ))
+        if cur.fetchone()[0]:
+            scheduler_lock_conn = conn
+            if scheduler.state == STATE_PAUSED:
+                scheduler.resume()
+            else:
+                scheduler.start()
+            print(f"Scheduler started in process {os.getpid()}")
+            return True
+        conn.close()
+    except Exception as e:
+        print(f"Error starting scheduler: {str(e)}")
+    retry_start_scheduler()
+    return False
+
+
+def retry_start_scheduler():
+    retry = threading.Timer(SCHEDULER_RETRY_SECONDS, start_scheduler)
+    retry.daemon = True
+    retry.start()
+
+
+def check_scheduler_lock():
+    """Stop running jobs here once the scheduler lock is gone.
+
+    The lock lasts only as long as scheduler_lock_conn's session, so after
+    a server restart, network drop or idle timeout another process can take
+    it over while this one would otherwise keep running every job too.
+    """
+    global scheduler_lock_conn
+    try:
+        with scheduler_lock_conn.cursor() as cur:
+            cur.execute(SCHEDULER_LOCK_HELD_QUERY,
+                        (SCHEDULER_LOCK_KEY >> 32,
+                         SCHEDULER_LOCK_KEY & 0xFFFFFFFF))
+            if cur.fetchone()[0]:
+                return
+        print("Scheduler lock no longer held")
+    except Exception as e:
+        print(f"Scheduler lock connection lost: {str(e)}")
+    try:
+        scheduler_lock_conn.close()
+    except Exception:
+        pass
+    scheduler_lock_conn = None
+    # Paused rather than shut down: shutdown drops the in-memory jobs, and
+    # start_scheduler resumes it once this process holds the lock again
+    scheduler.pause()
+    print(f"Scheduler paused in process {os.getpid()}")
+    retry_start_scheduler()
+
+
+scheduler.add_job(check_scheduler_lock,
+                  'interval',
+                  seconds=SCHEDULER_LOCK_CHECK_SECONDS,
+                  id='check_scheduler_lock',
+                  max_instances=1,
+                  coalesce=True,
+                  replace_existing=True)
+
+
+# Primary plus optional DATABASE_REPLICA_URL; see db_routing.py
+db_router = db_routing.DatabaseRouter()
+
+
+def replica_read(f):
+    """Let a read-only handler use the replica (see get_db_connection)."""
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        g.replica_read = True
+        return f(*args, **kwargs)
+
+    return wrapper
+
+
+def restricted_principals():
+    """Visibility principals of the requesting user, or None for a super
+    admin, who sees every bid (same rule as get_bids)."""
+    user_role = (request.headers.get('X-User-Role') or '').lower()
+    user_name = (request.headers.get('X-User-Name') or '').lower()
+    if user_role == 'super_admin' or 'kamal vallecha' in user_name:
+        return None
+    return visibility.principals(request.headers.get('X-User-Id'),
+                                 request.headers.get('X-User-Team'))
 
 
 def get_db_connection():
-    """Return PostgreSQL database connection"""
-    import psycopg2
-    from psycopg2.extras import RealDictCursor
-    
+    """Return PostgreSQL database connection
+
+    Handlers marked with @replica_read get a read-only replica connection,
+    unless the client wrote recently (read-your-writes) or the replica is
+    lagging; everything else gets the primary.
+    """
     try:
-        DATABASE_URL = os.getenv('DATABASE_URL')
-        if not DATABASE_URL:
-            raise Exception("DATABASE_URL environment variable not set")
-        
-        conn = psycopg2.connect(DATABASE_URL)
+        use_replica = (has_request_context() and g.get('replica_read', False)
+                       and not db_routing.is_sticky(
+                           request.headers.get(db_routing.STICKY_HEADER)))
+        conn, route = db_router.connect(read_only=use_replica)
+        if has_request_context():
+            g.db_route = route
         return conn
     except Exception as e:
         print(f"Database connection error: {str(e)}")
         raise e
 
 
-def init_postgresql_db():
-    """Initialize PostgreSQL database with default data"""
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Check if admin user exists, if not create one, or update existing one with correct hash
-        cur.execute("SELECT COUNT(*) FROM users WHERE email = 'admin@example.com'")
-        if cur.fetchone()[0] == 0:
-            from werkzeug.security import generate_password_hash
-            password_hash = generate_password_hash('admin', method='pbkdf2:sha256')
-            
-            cur.execute("""
-                INSERT INTO users (email, name, password_hash, role, team, employee_id, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """, ('admin@example.com', 'Admin User', password_hash, 'admin', 'Operations', 'EMP001'))
-            print("Default admin user created")
-        else:
-            # Update existing admin user with correct password hash
-            from werkzeug.security import generate_password_hash
-            password_hash = generate_password_hash('admin', method='pbkdf2:sha256')
-            cur.execute("""
-                UPDATE users SET password_hash = %s WHERE email = 'admin@example.com'
-            """, (password_hash,))
-            print("Admin user password hash updated")
-            
-        # Verify the admin user has the correct password hash format
-        cur.execute("SELECT password_hash FROM users WHERE email = 'admin@example.com'")
-        current_hash = cur.fetchone()
-        if current_hash and not current_hash[0].startswith('pbkdf2:sha256'):
-            print("Admin password hash needs updating to pbkdf2 format")
-            new_hash = generate_password_hash('admin', method='pbkdf2:sha256')
-            cur.execute("UPDATE users SET password_hash = %s WHERE email = 'admin@example.com'", (new_hash,))
-            print("Admin password hash updated to pbkdf2 format")
-        
-        # Check and create sample data if tables are empty
-        cur.execute("SELECT COUNT(*) FROM clients")
-        if cur.fetchone()[0] == 0:
-            cur.execute("""
-                INSERT INTO clients (client_id, client_name, contact_person, email, phone, country, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """, ('CLIENT001', 'Sample Client Inc', 'John Doe', 'john@sampleclient.com', '+1-555-0123', 'USA'))
-            print("Sample client data created")
-        
-        cur.execute("SELECT COUNT(*) FROM vendor_managers")
-        if cur.fetchone()[0] == 0:
-            cur.execute("""
-                INSERT INTO vendor_managers (vm_id, vm_name, contact_person, reporting_manager, team, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """, ('VM001', 'Sample VM', 'Jane Smith', 'Bob Manager', 'Operations'))
-            print("Sample VM data created")
-        
-        cur.execute("SELECT COUNT(*) FROM sales")
-        if cur.fetchone()[0] == 0:
-            cur.execute("""
-                INSERT INTO sales (sales_id, sales_person, contact_person, reporting_manager, region, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """, ('SALES001', 'Mike Sales', 'Mike Contact', 'Sales Manager', 'north'))
-            print("Sample sales data created")
-            
-        conn.commit()
-        cur.close()
-        conn.close()
-        print("PostgreSQL database initialization completed")
-    except Exception as e:
-        print(f"Error initializing PostgreSQL database: {str(e)}")
-        raise e
+@app.after_request
+def track_db_route(response):
+    # A successful write keeps this client on the primary for a while so it
+    # sees its own changes
+    if (db_router.has_replica and not g.get('replica_read')
+            and request.method in ('POST', 'PUT', 'PATCH', 'DELETE')
+            and response.status_code < 400):
+        response.headers[db_routing.STICKY_HEADER] = str(
+            db_routing.next_sticky_until())
+    if g.get('db_route'):
+        response.headers['X-DB-Route'] = g.db_route
+    return response
+
+
+# Shared in-memory copy of the clients, VMs, sales and partners tables
+reference_cache = ReferenceDataCache(get_db_connection)
 
 
 @app.route('/api/users', methods=['GET', 'POST'])
@@ -314,21 +480,85 @@ def handle_users():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/reference-data', methods=['GET'])
+def get_reference_data():
+    """Sales, VMs, clients and partners in one response, served from memory.
+
+    Clients pass the version they already hold as ?version=...; if it is
+    still current only the version is returned.
+    """
+    try:
+        version, data = reference_cache.snapshot()
+        if request.args.get('version') == version:
+            return jsonify({'version': version, 'unchanged': True})
+        return jsonify({'version': version, 'unchanged': False, **data})
+    except Exception as e:
+        print(f"Error in get_reference_data: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/admin/import/<table>', methods=['POST'])
+def bulk_import_reference(table):
+    """Upsert partners, clients or sales from an uploaded CSV file."""
+    try:
+        user_role = (request.headers.get('X-User-Role') or '').lower()
+        if user_role not in ('admin', 'super_admin'):
+            return jsonify({"error": "Only admins can run imports"}), 403
+
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({"error": "No file uploaded"}), 400
+        dry_run = request.form.get('dry_run', 'false').lower() == 'true'
+
+        conn = get_db_connection()
+        result = bulk_import.import_file(conn, table, upload.read(),
+                                         dry_run=dry_run)
+        if not dry_run:
+            reference_cache.invalidate()
+        return jsonify(result)
+    except bulk_import.BulkImportError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error importing {table}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+@app.route('/api/admin/rollups/check', methods=['GET'])
+@app.route('/api/admin/rollups/fix', methods=['POST'])
+def check_bid_rollups():
+    """Verify bid rollups against the raw cells; POST to /fix recomputes
+    the bids that disagree."""
+    try:
+        user_role = (request.headers.get('X-User-Role') or '').lower()
+        if user_role not in ('admin', 'super_admin'):
+            return jsonify({"error": "Only admins can check rollups"}), 403
+
+        bid_ids = request.args.getlist('bid_id')
+        if request.method == 'POST':
+            bid_ids = bid_ids or (request.get_json(silent=True)
+                                  or {}).get('bid_ids', [])
+        bid_ids = [int(b) for b in bid_ids] or None
+        fix = request.method == 'POST'
+
+        conn = get_db_connection()
+        return jsonify(rollups.check_rollups(conn, bid_ids, fix=fix))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error checking rollups: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
 @app.route('/api/vms', methods=['GET'])
 def get_vms():
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT id, vm_id, vm_name, contact_person, reporting_manager, team, created_at, updated_at
-            FROM vendor_managers ORDER BY id
-        """)
-        
-        vms = cur.fetchall()
-        cur.close()
-        conn.close()
-        return jsonify(vms)
+        return jsonify(reference_cache.get('vms'))
     except Exception as e:
         print(f"Error in get_vms: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -362,6 +592,7 @@ def create_vm():
 
         new_id = cur.fetchone()[0]
         conn.commit()
+        reference_cache.invalidate()
         cur.close()
         conn.close()
 
@@ -375,18 +606,7 @@ def create_vm():
 @app.route('/api/sales', methods=['GET'])
 def get_sales():
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT id, sales_id, sales_person, contact_person, reporting_manager, region, created_at, updated_at
-            FROM sales ORDER BY id
-        """)
-        
-        sales_list = cur.fetchall()
-        cur.close()
-        conn.close()
-        return jsonify(sales_list)
+        return jsonify(reference_cache.get('sales'))
     except Exception as e:
         print(f"Error in get_sales: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -445,6 +665,7 @@ def create_sale():
 
         new_id = cur.fetchone()[0]
         conn.commit()
+        reference_cache.invalidate()
         cur.close()
         conn.close()
 
@@ -465,23 +686,38 @@ def create_sale():
 
 @app.route('/api/partners', methods=['GET'])
 def get_partners():
+    try:
+        return jsonify(reference_cache.get('partners'))
+    except Exception as e:
+        print(f"Error in get_partners: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/partners/search', methods=['GET'])
+@replica_read
+def search_partners():
+    """Paged partner picker search: ?specialized=&countries=&match=&name="""
     try:
         conn = get_db_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT id, partner_id, partner_name, contact_person, contact_email, contact_phone, 
-                   website, company_address, specialized, geographic_coverage, created_at, updated_at
-            FROM partners ORDER BY id
-        """)
-        
-        partners_list = cur.fetchall()
-        cur.close()
-        conn.close()
-        return jsonify(partners_list)
+        partners, total, page, page_size = partner_search.search_partners(
+            cur, request.args)
+        return jsonify({
+            'partners': partners,
+            'total': total,
+            'page': page,
+            'page_size': page_size
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in get_partners: {str(e)}")
+        print(f"Error in search_partners: {str(e)}")
         return jsonify({"error": str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
 
 
 # Add this function to generate partner ID
@@ -519,7 +755,8 @@ def create_partner():
 
         # Convert specialized and geographic_coverage to proper PostgreSQL arrays
         specialized = data.get('specialized', [])
-        geographic_coverage = data.get('geographic_coverage', [])
+        geographic_coverage = countries.canonical_list(
+            data.get('geographic_coverage', []))
 
         conn = get_db_connection()
         cur = conn.cursor()
@@ -547,6 +784,7 @@ def create_partner():
 
         new_id = cur.fetchone()[0]
         conn.commit()
+        reference_cache.invalidate()
 
         return jsonify({
             "id": new_id,
@@ -567,18 +805,7 @@ def create_partner():
 @app.route('/api/clients', methods=['GET'])
 def get_clients():
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT id, client_id, client_name, contact_person, email, phone, country, created_at, updated_at
-            FROM clients ORDER BY id
-        """)
-        
-        clients_list = cur.fetchall()
-        cur.close()
-        conn.close()
-        return jsonify(clients_list)
+        return jsonify(reference_cache.get('clients'))
     except Exception as e:
         print(f"Error in get_clients: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -629,6 +856,7 @@ def create_client():
 
         new_id = cur.fetchone()[0]
         conn.commit()
+        reference_cache.invalidate()
         cur.close()
         conn.close()
 
@@ -693,6 +921,7 @@ def update_client(client_id):
               data['email'], data['phone'], data['country'], client_id))
 
         conn.commit()
+        reference_cache.invalidate()
         cur.close()
         conn.close()
 
@@ -718,6 +947,7 @@ def delete_client(client_id):
         # Delete the client
         cur.execute("DELETE FROM clients WHERE id = %s", (client_id, ))
         conn.commit()
+        reference_cache.invalidate()
 
         return jsonify({"message": "Client deleted successfully"})
 
@@ -731,13 +961,64 @@ def delete_client(client_id):
             conn.close()
 
 
+@app.route('/api/exports/bids', methods=['GET'])
+@replica_read
+def export_bids():
+    try:
+        export_format = exports.parse_format(request.args.get('format'))
+        sql, params = exports.bid_list_query(request.args,
+                                             restricted_principals())
+        return exports.export_response(get_db_connection, 'bids',
+                                       exports.BID_LIST_COLUMNS, sql, params,
+                                       export_format)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error exporting bids: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/exports/bids/<int:bid_id>/responses', methods=['GET'])
+@replica_read
+def export_bid_responses(bid_id):
+    try:
+        export_format = exports.parse_format(request.args.get('format'))
+        sql, params = exports.bid_matrix_query(bid_id)
+        return exports.export_response(get_db_connection,
+                                       f'bid_{bid_id}_responses',
+                                       exports.BID_MATRIX_COLUMNS, sql, params,
+                                       export_format)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error exporting bid responses: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/exports/bids/<int:bid_id>/invoice', methods=['GET'])
+@replica_read
+def export_bid_invoice(bid_id):
+    try:
+        export_format = exports.parse_format(request.args.get('format'))
+        sql, params = exports.invoice_deliverables_query(bid_id)
+        return exports.export_response(get_db_connection,
+                                       f'bid_{bid_id}_invoice',
+                                       exports.INVOICE_COLUMNS, sql, params,
+                                       export_format)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error exporting invoice deliverables: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/bids', methods=['GET'])
+@replica_read
 def get_bids():
     try:
-        page = int(request.args.get('page', 1))
-        page_size = int(request.args.get('page_size', 20))
+        page, page_size = queues.parse_paging(request.args)
         offset = (page - 1) * page_size
-        search = request.args.get('search', '').strip().lower()
+        search = request.args.get('search', '').strip()
 
         # Get user info from headers
         user_id = request.headers.get('X-User-Id')
@@ -745,214 +1026,35 @@ def get_bids():
         user_role = (request.headers.get('X-User-Role') or '').lower()
         user_name = (request.headers.get('X-User-Name') or '').lower()
 
-        # Debug: Print incoming user info
-        print("/api/bids DEBUG: Incoming user info:")
-        print(f"  user_id: {user_id}")
-        print(f"  user_team: {user_team}")
-        print(f"  user_role: {user_role}")
-        print(f"  user_name: {user_name}")
-        
         # Super Admin logic: role is super_admin or Kamal by name
         is_super_admin = user_role == 'super_admin' or 'kamal vallecha' in user_name
-        is_admin = user_role == 'admin'
+        user_principals = visibility.principals(user_id, user_team)
 
-        # Get bids from PostgreSQL
         conn = get_db_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Debug: Check what's actually in the bid_access table
-        cur.execute("SELECT * FROM bid_access")
-        all_bid_access = cur.fetchall()
-        print(f"DEBUG: All bid_access records: {all_bid_access}")
-        
-        cur.execute("""
-            SELECT b.id, b.bid_number, b.study_name, b.bid_date, b.status, b.methodology, 
-                   b.project_requirement, b.client, b.vm_contact, b.sales_contact, b.created_by,
-                   c.client_name, vm.vm_name, vm.team, s.sales_person
-            FROM bids b
-            LEFT JOIN clients c ON b.client = c.id
-            LEFT JOIN vendor_managers vm ON b.vm_contact = vm.id
-            LEFT JOIN sales s ON b.sales_contact = s.id
-        """)
-        
-        bids_raw = cur.fetchall()
-        
-        # Convert to the expected format
-        bids_data = {}
-        for bid in bids_raw:
-            bids_data[str(bid['id'])] = {
-                'id': bid['id'],
-                'bid_number': bid['bid_number'],
-                'study_name': bid['study_name'],
-                'bid_date': bid['bid_date'],
-                'status': bid['status'],
-                'methodology': bid['methodology'],
-                'project_requirement': bid['project_requirement'],
-                'client': bid['client'],
-                'vm_contact': bid['vm_contact'],
-                'sales_contact': bid['sales_contact'],
-                'created_by': bid['created_by']
-            }
-        
-        clients_data = {}
-        vm_data = {}
-        sales_data = {}
-        
-        # Get clients data
-        cur.execute("SELECT id, client_name FROM clients")
-        for client in cur.fetchall():
-            clients_data[str(client['id'])] = {'client_name': client['client_name']}
-        
-        # Get VM data
-        cur.execute("SELECT id, vm_name, team FROM vendor_managers")
-        for vm in cur.fetchall():
-            vm_data[str(vm['id'])] = {'vm_name': vm['vm_name'], 'team': vm['team']}
-        
-        # Get sales data
-        cur.execute("SELECT id, sales_person FROM sales")
-        for sales in cur.fetchall():
-            sales_data[str(sales['id'])] = {'sales_person': sales['sales_person']}
-        
-        print(f"DEBUG: Found {len(bids_data)} bids in database")
-        print(f"DEBUG: Found {len(clients_data)} clients in database")
-        print(f"DEBUG: Found {len(vm_data)} VMs in database")
-
-        # Convert to list format
-        all_bids = []
-        for bid_id, bid in bids_data.items():
-            # Get client name
-            client_name = 'Unknown Client'
-            if bid.get('client'):
-                client_id = str(bid['client'])
-                if client_id in clients_data:
-                    client_name = clients_data[client_id].get(
-                        'client_name', 'Unknown Client')
-
-            # Get VM team and name
-            vm_team = 'Unknown Team'
-            vm_name = 'Unknown VM'
-            if bid.get('vm_contact'):
-                vm_id = str(bid['vm_contact'])
-                if vm_id in vm_data:
-                    vm_team = vm_data[vm_id].get('team', 'Unknown Team')
-                    vm_name = vm_data[vm_id].get('vm_name', 'Unknown VM')
-
-            # Get sales person
-            sales_person = 'Unknown Sales'
-            if bid.get('sales_contact'):
-                sales_id = str(bid['sales_contact'])
-                if sales_id in sales_data:
-                    sales_person = sales_data[sales_id].get(
-                        'sales_person', 'Unknown Sales')
-
-            # Convert date to string if it exists
-            bid_date = bid.get('bid_date')
-            if bid_date and hasattr(bid_date, 'strftime'):
-                bid_date = bid_date.strftime('%Y-%m-%d')
-            elif bid_date and hasattr(bid_date, 'isoformat'):
-                bid_date = bid_date.isoformat()
-            
-            bid_obj = {
-                'id': bid.get('id'),
-                'bid_number': bid.get('bid_number'),
-                'study_name': bid.get('study_name'),
-                'bid_date': bid_date,
-                'status': bid.get('status', 'draft'),
-                'client_name': client_name,
-                'methodology': bid.get('methodology'),
-                'project_requirement': bid.get('project_requirement'),
-                'team': vm_team,
-                'vm_name': vm_name,
-                'sales_person': sales_person,
-                'created_by': bid.get('created_by')
-            }
-            all_bids.append(bid_obj)
+        cur.execute(*bid_search.list_query(user_principals, not is_super_admin,
+                                           search, page_size, offset))
+        bids = cur.fetchall()
 
-        # Get explicitly granted access for this user/team before closing connection
-        # Check for both user-specific and team-specific grants
-        cur.execute(
-            """
-            SELECT DISTINCT bid_id FROM bid_access 
-            WHERE (user_id = %s) OR (team = %s)
-            """, (user_id, user_team))
-        granted_bid_ids = set(row['bid_id'] for row in cur.fetchall())
-        print(f"DEBUG: Found explicitly granted access for bid IDs: {granted_bid_ids}")
-        
-        # Debug: Show all access records for this user/team
-        cur.execute(
-            """
-            SELECT bid_id, user_id, team FROM bid_access 
-            WHERE (user_id = %s) OR (team = %s)
-            """, (user_id, user_team))
-        all_access_records = cur.fetchall()
-        print(f"DEBUG: All access records for user {user_id}/{user_team}: {all_access_records}")
+        total = bids[0]['total_count'] if bids else 0
+        if not bids and offset:
+            cur.execute(*bid_search.list_count_query(
+                user_principals, not is_super_admin, search))
+            total = cur.fetchone()['total_count']
+        for bid in bids:
+            del bid['total_count']
 
         cur.close()
         conn.close()
 
-        # Apply access control filters
-        filtered_bids = []
-        for bid in all_bids:
-            # Check access
-            has_access = False
-
-            # Super admin and Kamal (by name) can see all bids
-            if is_super_admin:
-                has_access = True
-                print(f"DEBUG: Bid {bid.get('bid_number')} - User: {user_name} - Super admin access")
-            # Check for explicitly granted access in bid_access table (this should take precedence)
-            elif bid.get('id') in granted_bid_ids:
-                has_access = True
-                print(f"DEBUG: Bid {bid.get('bid_number')} - User: {user_name} has explicitly granted access")
-            # Bid creator can always see their own bids
-            elif str(bid.get('created_by')) == str(user_id):
-                has_access = True
-                print(f"DEBUG: Bid {bid.get('bid_number')} - User: {user_name} - Bid creator access")
-            # Team-based access: only if user's team matches bid's team
-            elif user_team and bid.get('team'):
-                # Normalize team names for comparison (remove spaces, convert to lowercase)
-                user_team_norm = user_team.replace(' ', '').lower()
-                bid_team_norm = bid['team'].replace(' ', '').lower()
-                print(f"DEBUG: Team access check - User team: '{user_team_norm}', Bid team: '{bid_team_norm}'")
-                if user_team_norm == bid_team_norm:
-                    has_access = True
-                    print(f"DEBUG: Bid {bid.get('bid_number')} - User: {user_name} - Team access granted")
-            
-            if not has_access:
-                print(f"DEBUG: Bid {bid.get('bid_number')} - User: {user_name} - No access found. Bid ID: {bid.get('id')}, Granted IDs: {granted_bid_ids}")
-            
-            print(f"DEBUG: Bid {bid.get('bid_number')} - User: {user_name} (Team: {user_team}) - Has access: {has_access}")
-
-            if has_access:
-                # Apply search filter
-                if search:
-                    search_fields = [
-                        str(bid.get('bid_number', '')).lower(),
-                        str(bid.get('study_name', '')).lower(),
-                        str(bid.get('client_name', '')).lower()
-                    ]
-                    if any(search in field for field in search_fields):
-                        filtered_bids.append(bid)
-                else:
-                    filtered_bids.append(bid)
-
-        # Sort by bid number (descending)
-        filtered_bids.sort(key=lambda x: int(x.get('bid_number', 0) or 0),
-                           reverse=True)
-
-        # Apply pagination
-        total = len(filtered_bids)
-        paginated_bids = filtered_bids[offset:offset + page_size]
-
-        print(f"/api/bids DEBUG: Number of bids found: {len(paginated_bids)}")
-        print(f"/api/bids DEBUG: Total bids after filtering: {total}")
-
         return jsonify({
-            'bids': paginated_bids,
+            'bids': bids,
             'total': total,
             'page': page,
             'page_size': page_size
         })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in get_bids: {str(e)}")
         import traceback
@@ -960,6 +1062,36 @@ def get_bids():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/bids/search', methods=['GET'])
+@replica_read
+def search_bids():
+    """Typeahead: top matches for ?q= among the bids the user can see."""
+    try:
+        term = request.args.get('q', '').strip()
+        limit = min(
+            max(int(request.args.get('limit', bid_search.SEARCH_DEFAULT_LIMIT)),
+                1), bid_search.SEARCH_MAX_LIMIT)
+        if not term:
+            return jsonify({'bids': []})
+
+        principals = restricted_principals()
+
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        bids = bid_search.search_bids(cur, term, principals, limit)
+        return jsonify({'bids': bids})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in search_bids: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
+
+
 @app.route('/api/bids', methods=['POST'])
 def create_bid():
     try:
@@ -987,6 +1119,7 @@ def create_bid():
 
         conn = get_db_connection()
         cur = conn.cursor()
+        status_history.set_actor(cur, user_id)
 
         # Insert new bid record
         cur.execute(
@@ -1055,6 +1188,7 @@ def create_bid():
                 ''', (bid_id, audience_id, country, sample_data['sample_size'],
                       sample_data['is_best_efforts']))
 
+        visibility.refresh_bids(cur, [bid_id])
         conn.commit()
         return jsonify({
             'bid_id': bid_id,
@@ -1108,121 +1242,95 @@ def get_pending_requests_batch():
         return jsonify({})
 
 
+# The whole bid document (bid, target audiences with their country samples,
+# partners and LOIs) is built by Postgres and returned as JSON text, so it
+# goes to the client untouched
+BID_DOCUMENT_QUERY = """
+        SELECT (
+            to_jsonb(b) || jsonb_build_object(
+                'client_name', c.client_name,
+                'sales_person', s.sales_person,
+                'vm_name', vm.vm_name,
+                'countries', COALESCE((
+                    SELECT jsonb_agg(DISTINCT bac.country)
+                    FROM bid_audience_countries bac
+                    WHERE bac.bid_id = b.id
+                ), '[]'::jsonb),
+                'target_audiences', COALESCE((
+                    SELECT jsonb_agg(jsonb_build_object(
+                        'id', bta.id,
+                        'uniqueId', 'audience-' || bta.id,
+                        'name', bta.audience_name,
+                        'ta_category', bta.ta_category,
+                        'broader_category', bta.broader_category,
+                        'exact_ta_definition', bta.exact_ta_definition,
+                        'mode', bta.mode,
+                        'sample_required', bta.sample_required,
+                        'ir', bta.ir,
+                        'comments', bta.comments,
+                        'is_best_efforts', bta.is_best_efforts,
+                        'country_samples', COALESCE((
+                            SELECT jsonb_object_agg(
+                                bac.country,
+                                jsonb_build_object(
+                                    'sample_size', bac.sample_size,
+                                    'is_best_efforts', bac.is_best_efforts
+                                )
+                            )
+                            FROM bid_audience_countries bac
+                            WHERE bac.audience_id = bta.id
+                            AND bac.country IS NOT NULL
+                        ), '{}'::jsonb)
+                    ) ORDER BY bta.id)
+                    FROM bid_target_audiences bta
+                    WHERE bta.bid_id = b.id
+                ), '[]'::jsonb),
+                'partners', COALESCE((
+                    SELECT jsonb_agg(jsonb_build_object(
+                        'id', p.id,
+                        'partner_name', p.partner_name
+                    ) ORDER BY p.id)
+                    FROM partners p
+                    WHERE p.id IN (
+                        SELECT pr.partner_id
+                        FROM partner_responses pr
+                        WHERE pr.bid_id = b.id
+                    )
+                ), '[]'::jsonb),
+                'loi', COALESCE((
+                    SELECT jsonb_agg(DISTINCT pr.loi)
+                    FROM partner_responses pr
+                    WHERE pr.bid_id = b.id
+                ), '[]'::jsonb)
+            )
+        )::text
+        FROM bids b
+        LEFT JOIN clients c ON b.client = c.id
+        LEFT JOIN sales s ON b.sales_contact = s.id
+        LEFT JOIN vendor_managers vm ON b.vm_contact = vm.id
+        WHERE b.id = %s
+"""
+
+
+def fetch_bid_document(cur, bid_id):
+    """The bid document as JSON text, or None if there is no such bid."""
+    cur.execute(BID_DOCUMENT_QUERY, (bid_id, ))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
 @app.route('/api/bids/<bid_id>', methods=['GET'])
+@replica_read
 def get_bid(bid_id):
     try:
         conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        # Get main bid data
-        cur.execute(
-            """
-            SELECT 
-                b.*,
-                c.client_name,
-                s.sales_person,
-                vm.vm_name,
-                ARRAY_AGG(DISTINCT bac.country) as countries
-            FROM bids b
-            LEFT JOIN clients c ON b.client = c.id
-            LEFT JOIN sales s ON b.sales_contact = s.id
-            LEFT JOIN vendor_managers vm ON b.vm_contact = vm.id
-            LEFT JOIN bid_audience_countries bac ON b.id = bac.bid_id
-            WHERE b.id = %s
-            GROUP BY b.id, c.client_name, s.sales_person, vm.vm_name
-        """, (bid_id, ))
+        cur = conn.cursor()
 
-        bid = cur.fetchone()
-        if not bid:
+        document = fetch_bid_document(cur, bid_id)
+        if document is None:
             return jsonify({"error": "Bid not found"}), 404
 
-        if bid['bid_date']:
-            bid['bid_date'] = bid['bid_date'].strftime('%Y-%m-%d')
-
-        # Get target audiences with sample sizes
-        cur.execute(
-            """
-            SELECT 
-                bta.id,
-                bta.audience_name as name,
-                bta.ta_category,
-                bta.broader_category,
-                bta.exact_ta_definition,
-                bta.mode,
-                bta.sample_required,
-                bta.ir,
-                bta.comments,
-                bta.is_best_efforts,
-                bac.country,
-                bac.sample_size,
-                bac.is_best_efforts as country_is_best_efforts
-            FROM bid_target_audiences bta
-            LEFT JOIN bid_audience_countries bac ON bta.id = bac.audience_id
-            WHERE bta.bid_id = %s
-        """, (bid_id, ))
-
-        rows = cur.fetchall()
-
-        # Format target audiences with their sample sizes
-        target_audiences = {}
-        for row in rows:
-            audience_id = row['id']
-            if audience_id not in target_audiences:
-                target_audiences[audience_id] = {
-                    'id': row['id'],
-                    'uniqueId':
-                    f"audience-{audience_id}",  # Add unique identifier
-                    'name': row['name'],
-                    'ta_category': row['ta_category'],
-                    'broader_category': row['broader_category'],
-                    'exact_ta_definition': row['exact_ta_definition'],
-                    'mode': row['mode'],
-                    'sample_required': row['sample_required'],
-                    'ir': row['ir'],
-                    'comments': row['comments'],
-                    'is_best_efforts': row['is_best_efforts'],
-                    'country_samples': {}
-                }
-            if row['country']:
-                target_audiences[audience_id]['country_samples'][
-                    row['country']] = {
-                        'sample_size': row['sample_size'],
-                        'is_best_efforts': row['country_is_best_efforts']
-                    }
-
-        # Get partners and LOIs with full partner details
-        cur.execute(
-            """
-            SELECT DISTINCT 
-                pr.partner_id,
-                p.partner_name,
-                pr.loi
-            FROM partner_responses pr
-            JOIN partners p ON pr.partner_id = p.id
-            WHERE pr.bid_id = %s
-        """, (bid_id, ))
-
-        partner_lois = cur.fetchall()
-        partners = []
-        seen_partners = set()
-
-        for row in partner_lois:
-            if row['partner_id'] not in seen_partners:
-                partners.append({
-                    'id': row['partner_id'],
-                    'partner_name': row['partner_name']
-                })
-                seen_partners.add(row['partner_id'])
-
-        lois = list(set([r['loi'] for r in partner_lois]))
-
-        response = {
-            **bid, 'target_audiences': list(target_audiences.values()),
-            'partners': partners,
-            'loi': lois
-        }
-
-        return jsonify(response)
+        return app.response_class(document, mimetype='application/json')
 
     except Exception as e:
         print(f"Error getting bid: {str(e)}")
@@ -1518,6 +1626,8 @@ def update_bid(bid_id):
                         )
                         raise
 
+        # The VM contact, and with it the bid's team, may have changed
+        visibility.refresh_bids(cur, [bid_id])
         conn.commit()
         print("Successfully updated bid and country samples")
         return jsonify({"message": "Bid updated successfully"}), 200
@@ -1666,42 +1776,63 @@ def get_partner_responses(bid_id):
             conn.close()
 
 
-@app.route('/api/bids/infield', methods=['GET'])
-def get_infield_bids():
+@app.route('/api/queues/<queue>', methods=['GET'])
+@replica_read
+def get_queue(queue):
+    """One page of the infield, closure or invoice queue.
+
+    Query params: page, page_size, client, team, search, date_from,
+    date_to, sort and order. Metrics are only computed for the bids on the
+    page.
+    """
     try:
+        page, page_size = queues.parse_paging(request.args)
         conn = get_db_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
+        bids, total = queues.fetch_queue(cur, queue, request.args, page,
+                                         page_size)
+        return jsonify({
+            'bids': bids,
+            'total': total,
+            'page': page,
+            'page_size': page_size
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error fetching {queue} queue: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
 
-        # Fixed query with correct column names
-        cur.execute("""
-            SELECT DISTINCT ON (b.id)
-                b.id,
-                bpo.po_number,
-                b.bid_number,
-                b.study_name,
-                c.client_name,
-                b.methodology as mode,
-                s.sales_person as sales_contact,  -- Changed from s.name to s.sales_person
-                v.vm_name as vm_contact,
-                b.status
-            FROM bids b
-            LEFT JOIN bid_po_numbers bpo ON b.id = bpo.bid_id
-            LEFT JOIN clients c ON b.client = c.id
-            LEFT JOIN sales s ON b.sales_contact = s.id
-            LEFT JOIN vendor_managers v ON b.vm_contact = v.id
-            WHERE b.status = 'infield'
-            ORDER BY b.id, b.updated_at DESC
-        """)
-
-        bids = cur.fetchall()
-        cur.close()
-        conn.close()
 
+def queue_list(queue, label):
+    # The older list endpoints return the whole queue as a plain list; they
+    # share the queue query so metrics still cover only the queue's bids
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        bids, _ = queues.fetch_queue(cur, queue, request.args)
         return jsonify(bids)
-
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error fetching infield bids: {str(e)}")
+        print(f"Error fetching {label}: {str(e)}")
         return jsonify({"error": str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
+
+
+@app.route('/api/bids/infield', methods=['GET'])
+@replica_read
+def get_infield_bids():
+    return queue_list('infield', 'infield bids')
 
 
 @app.route('/api/bids/<bid_id>/po', methods=['POST'])
@@ -1713,8 +1844,11 @@ def add_po_number(bid_id):
 
         cur.execute(
             """
-            INSERT INTO bid_po_numbers (bid_id, po_number)
-            VALUES (%s, %s)
+            INSERT INTO bid_po_numbers (bid_id, po_number, created_at)
+            VALUES (%s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (bid_id) DO UPDATE
+            SET po_number = EXCLUDED.po_number,
+                updated_at = CURRENT_TIMESTAMP
             RETURNING id
         """, (bid_id, data['po_number']))
 
@@ -1736,12 +1870,14 @@ def move_to_closure(bid_number):
         cur = conn.cursor()
 
         print(f"Moving bid {bid_number} to closure...")
+        status_history.set_actor(cur, request.headers.get('X-User-Id'))
 
         # Update bid status using bid_number
         cur.execute(
             """
             UPDATE bids 
-            SET status = 'closure'
+            SET status = 'closure',
+                updated_at = CURRENT_TIMESTAMP
             WHERE bid_number = %s
             RETURNING id, bid_number, status
         """, (bid_number, ))
@@ -1771,6 +1907,7 @@ def move_to_closure(bid_number):
 
 
 @app.route('/api/bids/<bid_id>/field-data', methods=['GET'])
+@replica_read
 def get_field_data(bid_id):
     try:
         print(f"Fetching field data for bid: {bid_id}")  # Debug log
@@ -1800,98 +1937,54 @@ def get_field_data(bid_id):
         loi_options = [{'loi': row['loi']} for row in cur.fetchall()]
         print(f"Found LOI options: {loi_options}")  # Debug log
 
-        # Get audiences with their countries and responses
+        # Audiences with their countries, one entry per real country
         cur.execute(
             """
-            SELECT 
+            SELECT
                 bta.id,
                 bta.audience_name,
                 bta.ta_category,
                 bta.broader_category,
                 bta.mode,
                 bta.ir,
-                bta.is_best_efforts as audience_is_best_efforts,
-                bac.country,
-                bac.sample_size,
-                bac.is_best_efforts as country_is_best_efforts,
-                pr.partner_id,
-                pr.loi,
-                par.commitment,
-                par.commitment_type,
-                par.cpi,
-                par.allocation
+                bta.is_best_efforts,
+                json_agg(json_build_object(
+                    'country', bac.country,
+                    'sample_size', bac.sample_size,
+                    'is_best_efforts', bac.is_best_efforts
+                ) ORDER BY bac.country) as countries
             FROM bid_target_audiences bta
             JOIN bid_audience_countries bac ON bta.id = bac.audience_id
-            LEFT JOIN partner_responses pr ON pr.bid_id = bta.bid_id
-            LEFT JOIN partner_audience_responses par ON (
-                par.partner_response_id = pr.id 
-                AND par.audience_id = bta.id 
-                AND par.country = bac.country
-            )
             WHERE bta.bid_id = %s
-            ORDER BY bta.id, bac.country
+            GROUP BY bta.id
+            ORDER BY bta.id
         """, (bid_id, ))
-        rows = cur.fetchall()
-        print(f"Found {len(rows)} audience rows")  # Debug log
-
-        # Structure audiences data
-        audiences = []
-        current_audience = None
-        current_countries = []
-
-        for row in rows:
-            if not current_audience or current_audience['id'] != row['id']:
-                if current_audience:
-                    current_audience['countries'] = current_countries
-                    audiences.append(current_audience)
-                    current_countries = []
-
-                current_audience = {
-                    'id': row['id'],
-                    'audience_name': row['audience_name'],
-                    'ta_category': row['ta_category'],
-                    'broader_category': row['broader_category'],
-                    'mode': row['mode'],
-                    'ir': row['ir'],
-                    'is_best_efforts': row['audience_is_best_efforts'],
-                    'countries': []
-                }
-
-            if row['country']:
-                country_data = {
-                    'country': row['country'],
-                    'sample_size': row['sample_size'],
-                    'is_best_efforts': row['country_is_best_efforts']
-                }
-                current_countries.append(country_data)
-
-        if current_audience:
-            current_audience['countries'] = current_countries
-            audiences.append(current_audience)
+        audiences = cur.fetchall()
+        print(f"Found {len(audiences)} audiences")  # Debug log
 
-        # Get responses separately
-        responses = []
-        for row in rows:
-            if row['partner_id'] and row['loi']:
-                responses.append({
-                    'partner_id':
-                    row['partner_id'],
-                    'audience_id':
-                    row['id'],
-                    'country':
-                    row['country'],
-                    'loi':
-                    row['loi'],
-                    'commitment':
-                    row['commitment'] or 0,
-                    'commitment_type':
-                    row['commitment_type']
-                    if 'commitment_type' in row else 'fixed',
-                    'cpi':
-                    float(row['cpi']) if row['cpi'] is not None else 0,
-                    'allocation':
-                    row['allocation'] or 0
-                })
+        # Responses keyed "<partner_id>-<audience_id>-<country>-<loi>", only
+        # for cells that exist; missing keys mean nothing was recorded yet
+        cur.execute(
+            """
+            SELECT COALESCE(json_object_agg(
+                pr.partner_id || '-' || par.audience_id || '-' || par.country || '-' || pr.loi,
+                json_build_object(
+                    'partner_id', pr.partner_id,
+                    'audience_id', par.audience_id,
+                    'country', par.country,
+                    'loi', pr.loi,
+                    'commitment', COALESCE(par.commitment, 0),
+                    'commitment_type', COALESCE(par.commitment_type, 'fixed'),
+                    'cpi', COALESCE(par.cpi, 0)::float,
+                    'allocation', COALESCE(par.allocation, 0)
+                )
+            ), '{}'::json) as responses
+            FROM partner_audience_responses par
+            JOIN partner_responses pr ON par.partner_response_id = pr.id
+            WHERE pr.bid_id = %s
+        """, (bid_id, ))
+        responses = cur.fetchone()['responses']
+        print(f"Found {len(responses)} response cells")  # Debug log
 
         result = {
             'partners': partners,
@@ -1899,7 +1992,6 @@ def get_field_data(bid_id):
             'audiences': audiences,
             'responses': responses
         }
-        print(f"Returning data: {result}")  # Debug log
         return jsonify(result)
 
     except Exception as e:
@@ -1919,70 +2011,49 @@ def update_field_allocation(bid_id):
             conn = get_db_connection()
             cur = conn.cursor(cursor_factory=RealDictCursor)
 
-            # First get all audiences for this bid
+            # Audiences -> countries -> "<partner_id>-<loi>" cells, built
+            # from the cells that exist rather than every partner/LOI
             cur.execute(
                 """
-                SELECT 
-                    bta.id,
-                    bta.audience_name,
-                    bta.ta_category,
-                    bac.country,
-                    bac.sample_size as required,
-                    bac.is_best_efforts as country_is_best_efforts,
-                    pr.partner_id,
-                    pr.loi,
-                    par.commitment,
-                    par.commitment_type,
-                    par.cpi,
-                    par.allocation
+                SELECT COALESCE(json_agg(json_build_object(
+                    'id', bta.id,
+                    'name', bta.audience_name,
+                    'ta_category', bta.ta_category,
+                    'countries', (
+                        SELECT json_object_agg(bac.country, json_build_object(
+                            'required', bac.sample_size,
+                            'is_best_efforts', bac.is_best_efforts,
+                            'partners', COALESCE((
+                                SELECT json_object_agg(
+                                    pr.partner_id || '-' || pr.loi,
+                                    json_build_object(
+                                        'commitment', COALESCE(par.commitment, 0),
+                                        'is_best_efforts', bac.is_best_efforts,
+                                        'commitment_type', COALESCE(par.commitment_type, 'fixed'),
+                                        'cpi', COALESCE(par.cpi, 0)::float,
+                                        'allocation', COALESCE(par.allocation, 0)
+                                    )
+                                )
+                                FROM partner_audience_responses par
+                                JOIN partner_responses pr ON par.partner_response_id = pr.id
+                                WHERE par.audience_id = bta.id
+                                AND par.country = bac.country
+                            ), '{}'::json)
+                        ))
+                        FROM bid_audience_countries bac
+                        WHERE bac.audience_id = bta.id
+                    )
+                ) ORDER BY bta.id), '[]'::json)::text as audiences
                 FROM bid_target_audiences bta
-                JOIN bid_audience_countries bac ON bta.id = bac.audience_id
-                LEFT JOIN partner_responses pr ON pr.bid_id = bta.bid_id
-                LEFT JOIN partner_audience_responses par ON (
-                    par.partner_response_id = pr.id 
-                    AND par.audience_id = bta.id 
-                    AND par.country = bac.country
-                )
                 WHERE bta.bid_id = %s
-                ORDER BY bta.id, bac.country
+                AND EXISTS (
+                    SELECT 1 FROM bid_audience_countries bac
+                    WHERE bac.audience_id = bta.id
+                )
             """, (bid_id, ))
 
-            rows = cur.fetchall()
-
-            # Structure the response
-            audiences = {}
-            for row in rows:
-                audience_id = row['id']
-                if audience_id not in audiences:
-                    audiences[audience_id] = {
-                        'id': audience_id,
-                        'name': row['audience_name'],
-                        'ta_category': row['ta_category'],
-                        'countries': {}
-                    }
-
-                country = row['country']
-                if country not in audiences[audience_id]['countries']:
-                    audiences[audience_id]['countries'][country] = {
-                        'required': row['required'],
-                        'is_best_efforts': row['country_is_best_efforts'],
-                        'partners': {}
-                    }
-
-                if row['partner_id'] and row['loi']:
-                    partner_key = f"{row['partner_id']}-{row['loi']}"
-                    audiences[audience_id]['countries'][country]['partners'][
-                        partner_key] = {
-                            'commitment': row['commitment'] or 0,
-                            'is_best_efforts': row['country_is_best_efforts'],
-                            'commitment_type': row['commitment_type']
-                            or 'fixed',
-                            'cpi':
-                            float(row['cpi']) if row['cpi'] is not None else 0,
-                            'allocation': row['allocation'] or 0
-                        }
-
-            return jsonify(list(audiences.values()))
+            return app.response_class(cur.fetchone()['audiences'],
+                                      mimetype='application/json')
 
         except Exception as e:
             print(f"Error getting field allocations: {str(e)}")
@@ -2041,50 +2112,61 @@ def update_field_allocation(bid_id):
                 conn.close()
 
 
-@app.route('/api/bids/closure', methods=['GET'])
-def get_closure_bids():
+@app.route('/api/bids/<bid_id>/field-allocations/bulk', methods=['POST'])
+def bulk_update_field_allocations(bid_id):
+    """Save a whole grid of allocations in one request.
+
+    Body: {"allocations": [{partner_id, loi, audience_id, country,
+    allocation}, ...], "strict": false}. With strict, any audience/country/LOI
+    allocated beyond its required sample rolls the whole save back.
+    """
+    try:
+        data = request.json or {}
+        cells = data.get('allocations') or []
+        if not isinstance(cells, list):
+            return jsonify({"error": "allocations must be a list"}), 400
+
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        result = allocations.apply_allocations(cur, bid_id, cells)
+        over = [t for t in result['totals'] if t['status'] == 'over']
+        if data.get('strict') and over:
+            conn.rollback()
+            return jsonify({
+                "error": "Allocation exceeds required sample",
+                **result
+            }), 422
+
+        conn.commit()
+        return jsonify(result)
+
+    except Exception as e:
+        if 'conn' in locals():
+            conn.rollback()
+        print(f"Error bulk updating allocations: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
+
+
+@app.route('/api/bids/<bid_id>/field-allocations/solve', methods=['POST'])
+def solve_field_allocations(bid_id):
+    """Recommended allocation for every audience/country, returned as a
+    draft for the allocation grid; nothing is saved."""
     try:
+        data = request.json or {}
         conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        # Modified query to correctly calculate total N-delivered
-        cur.execute("""
-            WITH metrics AS (
-                SELECT 
-                    pr.bid_id,
-                    SUM(COALESCE(par.n_delivered, 0)) as total_delivered,
-                    SUM(COALESCE(par.quality_rejects, 0)) as total_rejects,
-                    AVG(COALESCE(par.final_loi, 0)) as avg_loi,
-                    AVG(COALESCE(par.final_ir, 0)) as avg_ir
-                FROM partner_responses pr
-                JOIN partner_audience_responses par ON par.partner_response_id = pr.id
-                WHERE par.allocation > 0
-                GROUP BY pr.bid_id
-            )
-            SELECT DISTINCT ON (b.id)
-                b.id,
-                bpo.po_number,
-                b.bid_number,
-                b.study_name,
-                c.client_name,
-                COALESCE(m.total_delivered, 0) as total_delivered,
-                COALESCE(m.total_rejects, 0) as quality_rejects,
-                ROUND(COALESCE(m.avg_loi, 0)::numeric, 2) as avg_loi,
-                ROUND(COALESCE(m.avg_ir, 0)::numeric, 2) as avg_ir,
-                b.status
-            FROM bids b
-            LEFT JOIN bid_po_numbers bpo ON b.id = bpo.bid_id
-            LEFT JOIN clients c ON b.client = c.id
-            LEFT JOIN metrics m ON b.id = m.bid_id
-            WHERE b.status = 'closure'
-            ORDER BY b.id, b.updated_at DESC
-        """)
+        cur = conn.cursor()
 
-        bids = cur.fetchall()
-        return jsonify(bids)
+        rows = allocations.fetch_solver_cells(cur, bid_id, data.get('loi'))
+        return jsonify(allocations.solve_allocations(rows))
 
     except Exception as e:
-        print(f"Error fetching closure bids: {str(e)}")
+        print(f"Error solving allocations: {str(e)}")
         return jsonify({"error": str(e)}), 500
     finally:
         if 'cur' in locals():
@@ -2093,6 +2175,12 @@ def get_closure_bids():
             conn.close()
 
 
+@app.route('/api/bids/closure', methods=['GET'])
+@replica_read
+def get_closure_bids():
+    return queue_list('closure', 'closure bids')
+
+
 @app.route('/api/bids/closure/<int:bid_id>', methods=['GET'])
 def get_closure_bid_details(bid_id):
     try:
@@ -2383,85 +2471,36 @@ def save_closure_data(bid_id):
         conn = get_db_connection()
         cur = conn.cursor()
 
-        # Get partner_response_id for this partner and LOI
-        cur.execute(
-            """
-            SELECT pr.id 
-            FROM partner_responses pr
-            JOIN partners p ON pr.partner_id = p.id
-            WHERE pr.bid_id = %s AND p.partner_name = %s AND pr.loi = %s
-        """, (bid_id, partner, loi))
-
-        partner_response_id = cur.fetchone()[0]
+        # Allocated cells for this partner and LOI
+        cells = closure_writes.fetch_cells(cur, bid_id, partner, loi)
+        cells_by_audience = {}
+        cell_ids = {}
+        for par_id, audience_id, country in cells:
+            cells_by_audience.setdefault(str(audience_id), []).append(par_id)
+            cell_ids[(str(audience_id), country)] = par_id
 
-        # Update partner_audience_responses table
+        updates = {}
         for key, value in form_data.items():
             if key.startswith('metrics_'):
                 # Parse the metrics key format: metrics_audienceId_partner_loi
-                parts = key.split('_')
-                if len(parts) >= 4 and parts[2] == partner and int(
-                        parts[3]) == int(loi):
-                    audience_id = parts[1]
-                    metrics = value
-
-                    # Convert empty strings to None for numeric fields
-                    final_loi = int(metrics.get('finalLOI')) if metrics.get(
-                        'finalLOI') not in ['', None] else None
-                    final_ir = float(metrics.get('finalIR')) if metrics.get(
-                        'finalIR') not in ['', None] else None
-                    final_timeline = int(
-                        metrics.get('finalTimeline')) if metrics.get(
-                            'finalTimeline') not in ['', None] else None
-                    quality_rejects = int(
-                        metrics.get('qualityRejects')) if metrics.get(
-                            'qualityRejects') not in ['', None] else None
-                    communication = int(
-                        metrics.get('communication')) if metrics.get(
-                            'communication') not in ['', None] else None
-                    engagement = int(metrics.get('engagement')) if metrics.get(
-                        'engagement') not in ['', None] else None
-                    problem_solving = int(
-                        metrics.get('problemSolving')) if metrics.get(
-                            'problemSolving') not in ['', None] else None
-
-                    cur.execute(
-                        """
-                        UPDATE partner_audience_responses par
-                        SET 
-                            final_loi = %s,
-                            final_ir = %s,
-                            final_timeline = %s,
-                            quality_rejects = %s,
-                            communication = %s,
-                            engagement = %s,
-                            problem_solving = %s,
-                            additional_feedback = %s
-                        WHERE partner_response_id = %s 
-                        AND audience_id = %s
-                        AND allocation > 0
-                    """, (final_loi, final_ir, final_timeline, quality_rejects,
-                          communication, engagement, problem_solving,
-                          metrics.get('additionalFeedback'),
-                          partner_response_id, audience_id))
+                # (the partner name itself may contain underscores)
+                audience_id, _, rest = key[len('metrics_'):].partition('_')
+                key_partner, _, key_loi = rest.rpartition('_')
+                if key_partner != partner or not key_loi.isdigit() or int(
+                        key_loi) != int(loi):
+                    continue
+                metrics = closure_writes.parse_metrics(value)
+                for par_id in cells_by_audience.get(audience_id, []):
+                    updates.setdefault(par_id, {}).update(metrics)
             else:
                 # Handle delivered numbers for this partner/LOI
-                audience_id, country = key.split('_')
-                delivered = value.get('delivered')
-
-                # Convert empty string to None for n_delivered
-                n_delivered = int(delivered) if delivered not in ['', None
-                                                                  ] else None
-
-                cur.execute(
-                    """
-                    UPDATE partner_audience_responses par
-                    SET n_delivered = %s
-                    WHERE partner_response_id = %s 
-                    AND audience_id = %s 
-                    AND country = %s
-                    AND allocation > 0
-                """, (n_delivered, partner_response_id, audience_id, country))
+                audience_id, _, country = key.partition('_')
+                par_id = cell_ids.get((audience_id, country))
+                if par_id is not None:
+                    updates.setdefault(par_id, {})['n_delivered'] = (
+                        closure_writes.parse_delivered(value.get('delivered')))
 
+        closure_writes.apply_cell_updates(cur, updates)
         conn.commit()
         return jsonify({"message": "Closure data saved successfully"}), 200
 
@@ -2576,85 +2615,38 @@ def get_closure_data(bid_id):
 
 
 @app.route('/api/bids/ready-for-invoice', methods=['GET'])
+@replica_read
 def get_ready_for_invoice_bids():
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            WITH bid_metrics AS (
-                SELECT 
-                    par.bid_id,
-                    SUM(par.n_delivered) as total_delivered,
-                    AVG(COALESCE(par.final_loi, par.timeline_days)) as avg_final_loi,
-                    AVG(par.cpi) as avg_initial_cpi,
-                    AVG(par.final_ir) as avg_final_ir,
-                    AVG(COALESCE(par.final_cpi, par.cpi)) as avg_final_cpi,
-                    SUM(COALESCE(par.final_cost, par.cpi * par.n_delivered)) as total_final_cost,
-                    SUM(par.allocation) as total_allocation
-                FROM partner_audience_responses par
-                WHERE par.n_delivered > 0
-                GROUP BY par.bid_id
-            )
-            SELECT DISTINCT ON (b.id)
-                bpo.po_number,
-                b.bid_number,
-                b.study_name,
-                c.client_name,
-                ROUND(COALESCE(bm.avg_initial_cpi, 0)::numeric, 2) as avg_initial_cpi,
-                COALESCE(bm.total_allocation, 0) as allocation,
-                COALESCE(bm.total_delivered, 0) as n_delivered,
-                ROUND(COALESCE(bm.avg_final_loi, 0)::numeric, 2) as avg_final_loi,
-                ROUND(COALESCE(bm.avg_final_ir, 0)::numeric, 2) as avg_final_ir,
-                ROUND(COALESCE(bm.avg_final_cpi, 0)::numeric, 2) as avg_final_cpi,
-                ROUND(COALESCE(bm.total_final_cost, 0)::numeric, 2) as invoice_amount,
-                b.status
-            FROM bids b
-            LEFT JOIN bid_po_numbers bpo ON b.id = bpo.bid_id
-            LEFT JOIN clients c ON b.client = c.id
-            LEFT JOIN bid_metrics bm ON b.id = bm.bid_id
-            WHERE b.status IN ('ready_for_invoice', 'invoiced')
-            ORDER BY b.id, b.updated_at DESC
-        """)
-
-        bids = cur.fetchall()
-        cur.close()
-        conn.close()
-
-        return jsonify(bids)
-
-    except Exception as e:
-        print(f"Error fetching ready for invoice bids: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+    return queue_list('invoice', 'ready for invoice bids')
 
 
 @app.route('/api/invoice/<int:bid_id>/partner-data', methods=['GET'])
 def get_partner_loi_data(bid_id):
     try:
         conn = get_db_connection()
-        cur = conn.cursor()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
 
-        # Get bid id from bid_number
-        cur.execute("SELECT id FROM bids WHERE bid_number = %s",
-                    (str(bid_id), ))
+        # Get bid id and PO number from bid_number
+        cur.execute(
+            """
+            SELECT b.id, bpo.po_number
+            FROM bids b
+            LEFT JOIN bid_po_numbers bpo ON bpo.bid_id = b.id
+            WHERE b.bid_number = %s
+        """, (str(bid_id), ))
         bid = cur.fetchone()
         if not bid:
             return jsonify({"error": f"Bid {bid_id} not found"}), 404
-        actual_bid_id = bid[0]
-
-        # Get PO number
-        cur.execute(
-            """
-            SELECT po_number 
-            FROM bid_po_numbers 
-            WHERE bid_id = %s
-        """, (actual_bid_id, ))
-        po_result = cur.fetchone()
-        po_number = po_result[0] if po_result else ''
+        actual_bid_id = bid['id']
+        po_number = bid['po_number'] or ''
 
-        # Get saved invoice details for all partners and LOIs
+        # Invoice headers and delivered cells for every partner/LOI, with a
+        # single pass over partner_audience_responses
         cur.execute(
             """
-            SELECT 
+            SELECT
+                pr.id as response_id,
+                p.id as partner_id,
                 p.partner_name,
                 pr.loi,
                 pr.invoice_date,
@@ -2662,167 +2654,88 @@ def get_partner_loi_data(bid_id):
                 pr.invoice_serial,
                 pr.invoice_number,
                 pr.invoice_amount,
-                pr.id as response_id
-            FROM partner_responses pr
-            JOIN partners p ON p.id = pr.partner_id
-            WHERE pr.bid_id = %s
-            AND EXISTS (
-                SELECT 1 
-                FROM partner_audience_responses par 
-                WHERE par.partner_response_id = pr.id 
-                AND par.n_delivered > 0
-            )
-        """, (actual_bid_id, ))
-
-        invoice_details_map = {}
-        partner_invoice_fields = {}
-        invoice_rows = cur.fetchall()
-        for row in invoice_rows:
-            partner_name = row[0]
-            loi = row[1]
-            key = f"{partner_name}_{loi}"
-            invoice_date = row[2].strftime('%Y-%m-%d') if row[2] else ''
-            invoice_sent = row[3].strftime('%Y-%m-%d') if row[3] else ''
-            invoice_serial = row[4] or ''
-            invoice_number = row[5] or ''
-            invoice_amount = str(row[6]) if row[6] else '0.00'
-
-            # Save the first non-empty invoice fields for this partner
-            if partner_name not in partner_invoice_fields or (
-                    not partner_invoice_fields[partner_name]['invoice_date']
-                    and invoice_date):
-                partner_invoice_fields[partner_name] = {
-                    'invoice_date': invoice_date,
-                    'invoice_sent': invoice_sent,
-                    'invoice_serial': invoice_serial,
-                    'invoice_number': invoice_number,
-                    'invoice_amount': invoice_amount
-                }
-
-            invoice_details_map[key] = {
-                'invoice_date': invoice_date,
-                'invoice_sent': invoice_sent,
-                'invoice_serial': invoice_serial,
-                'invoice_number': invoice_number,
-                'invoice_amount': invoice_amount
-            }
-
-        # Get deliverables data
-        cur.execute(
-            """
-            WITH partner_lois AS (
-                SELECT 
-                    p.id as partner_id,
-                    p.partner_name,
-                    pr.id as response_id,
-                    pr.loi,
-                    pr.invoice_date,
-                    pr.invoice_sent,
-                    pr.invoice_serial,
-                    pr.invoice_number,
-                    pr.invoice_amount
-                FROM partners p
-                JOIN partner_responses pr ON pr.partner_id = p.id
-                WHERE pr.bid_id = %s
-                AND EXISTS (
-                    SELECT 1 
-                    FROM partner_audience_responses par 
-                    WHERE par.partner_response_id = pr.id 
-                    AND par.n_delivered > 0
-                )
-            )
-            SELECT 
-                pl.partner_name,
-                pl.loi,
-                pl.invoice_date,
-                pl.invoice_sent,
-                pl.invoice_serial,
-                pl.invoice_number,
-                pl.invoice_amount,
-                par.audience_id,
-                par.country,
-                par.allocation,
-                par.n_delivered,
-                par.cpi as initial_cpi,
-                COALESCE(par.final_cpi, par.cpi) as final_cpi,
-                COALESCE(par.initial_cost, (par.n_delivered * par.cpi)) as initial_cost,
-                COALESCE(par.final_cost, (par.final_cpi * par.n_delivered)) as final_cost
-            FROM partner_lois pl
-            JOIN partner_audience_responses par ON par.partner_response_id = pl.response_id
-            WHERE par.n_delivered > 0
-            ORDER BY pl.partner_name, pl.loi, par.audience_id, par.country
+                json_build_object(
+                    'n_delivered', COALESCE(r.n_delivered, 0),
+                    'initial_cost', COALESCE(r.initial_cost, 0)::float,
+                    'final_cost', COALESCE(r.final_cost, 0)::float,
+                    'savings', COALESCE(r.savings, 0)::float
+                ) as totals,
+                json_agg(json_build_object(
+                    'partner_name', p.partner_name,
+                    'loi', pr.loi,
+                    'audience_id', par.audience_id,
+                    'country', par.country,
+                    'allocation', par.allocation,
+                    'n_delivered', par.n_delivered,
+                    'initial_cpi', COALESCE(par.cpi, 0)::float,
+                    'final_cpi', COALESCE(par.final_cpi, par.cpi, 0)::float,
+                    -- Same cell formulas as bid_partner_rollup_source
+                    'initial_cost', COALESCE(NULLIF(par.initial_cost, 0), par.n_delivered * par.cpi, 0)::float,
+                    'final_cost', COALESCE(NULLIF(par.final_cost, 0), par.n_delivered * COALESCE(par.final_cpi, par.cpi), 0)::float,
+                    'savings', COALESCE(
+                        COALESCE(NULLIF(par.initial_cost, 0), par.n_delivered * par.cpi)
+                        - COALESCE(NULLIF(par.final_cost, 0), par.n_delivered * COALESCE(par.final_cpi, par.cpi)),
+                        0)::float
+                ) ORDER BY par.audience_id, par.country) as deliverables
+            FROM partner_audience_responses par
+            JOIN partner_responses pr ON par.partner_response_id = pr.id
+            JOIN partners p ON pr.partner_id = p.id
+            LEFT JOIN bid_partner_rollups r ON r.partner_response_id = pr.id
+            WHERE par.bid_id = %s
+            AND par.n_delivered > 0
+            GROUP BY pr.id, p.id, r.partner_response_id
+            ORDER BY p.partner_name, pr.loi
         """, (actual_bid_id, ))
 
-        results = cur.fetchall()
-        if not results:
+        rows = cur.fetchall()
+        if not rows:
             return jsonify({"error":
                             "No partner data found for this bid"}), 404
 
-        # Group deliverables by partner and LOI
-        deliverables_by_partner = {}
-        for row in results:
-            partner_name = row[0]
-            loi = row[1]
-            key = f"{partner_name}_{loi}"
-
-            if key not in deliverables_by_partner:
-                deliverables_by_partner[key] = []
+        invoice_fields = [
+            'invoice_date', 'invoice_sent', 'invoice_serial', 'invoice_number',
+            'invoice_amount'
+        ]
+        partner_data = {}
+        partner_invoice_fields = {}
+        for row in rows:
+            details = {
+                'invoice_date':
+                row['invoice_date'].strftime('%Y-%m-%d')
+                if row['invoice_date'] else '',
+                'invoice_sent':
+                row['invoice_sent'].strftime('%Y-%m-%d')
+                if row['invoice_sent'] else '',
+                'invoice_serial': row['invoice_serial'] or '',
+                'invoice_number': row['invoice_number'] or '',
+                'invoice_amount':
+                str(row['invoice_amount']) if row['invoice_amount'] else '0.00'
+            }
 
-            deliverables_by_partner[key].append({
-                "partner_name":
-                partner_name,
-                "loi":
-                loi,
-                "audience_id":
-                row[7],
-                "country":
-                row[8],
-                "allocation":
-                row[9],
-                "n_delivered":
-                row[10] if row[10] is not None else 0,
-                "initial_cpi":
-                float(row[11]) if row[11] is not None else 0.0,
-                "final_cpi":
-                float(row[12]) if row[12] is not None else 0.0,
-                "initial_cost":
-                float(row[13]) if row[13] is not None else 0.0,
-                "final_cost":
-                float(row[14]) if row[14] is not None else 0.0,
-                "savings":
-                float(row[13] - row[14])
-                if row[13] is not None and row[14] is not None else 0.0
-            })
+            # Save the first non-empty invoice fields for this partner
+            partner_id = row['partner_id']
+            if partner_id not in partner_invoice_fields or (
+                    not partner_invoice_fields[partner_id]['invoice_date']
+                    and details['invoice_date']):
+                partner_invoice_fields[partner_id] = details
 
-        # Build response, always use the partner's default invoice fields if this LOI's are empty
-        response_data = {
-            "po_number": po_number,
-            "partner_data": {
-                key: {
-                    'invoice_date':
-                    invoice_details_map[key]['invoice_date']
-                    or partner_invoice_fields[partner_name]['invoice_date'],
-                    'invoice_sent':
-                    invoice_details_map[key]['invoice_sent']
-                    or partner_invoice_fields[partner_name]['invoice_sent'],
-                    'invoice_serial':
-                    invoice_details_map[key]['invoice_serial']
-                    or partner_invoice_fields[partner_name]['invoice_serial'],
-                    'invoice_number':
-                    invoice_details_map[key]['invoice_number']
-                    or partner_invoice_fields[partner_name]['invoice_number'],
-                    'invoice_amount':
-                    invoice_details_map[key]['invoice_amount']
-                    or partner_invoice_fields[partner_name]['invoice_amount'],
-                    "deliverables":
-                    deliverables
-                }
-                for key, deliverables in deliverables_by_partner.items()
-                for partner_name in [key.split('_')[0]]
+            partner_data[f"{partner_id}_{row['loi']}"] = {
+                'response_id': row['response_id'],
+                'partner_id': partner_id,
+                'partner_name': row['partner_name'],
+                'loi': row['loi'],
+                **details,
+                'totals': row['totals'],
+                'deliverables': row['deliverables']
             }
-        }
 
-        return jsonify(response_data)
+        # Always use the partner's default invoice fields if this LOI's are empty
+        for entry in partner_data.values():
+            defaults = partner_invoice_fields[entry['partner_id']]
+            for field in invoice_fields:
+                entry[field] = entry[field] or defaults[field]
+
+        return jsonify({"po_number": po_number, "partner_data": partner_data})
 
     except Exception as e:
         print(f"Error in get_partner_loi_data: {str(e)}")
@@ -2885,6 +2798,11 @@ def get_invoice_details(bid_id, partner_name, loi):
             conn.close()
 
 
+# Invoice columns of partner_responses the invoice screen may send
+INVOICE_FIELDS = ('invoice_date', 'invoice_sent', 'invoice_serial',
+                  'invoice_number', 'invoice_amount')
+
+
 @app.route('/api/invoice/<int:bid_number>/save', methods=['POST'])
 def save_invoice_data(bid_number):
     conn = None
@@ -2895,153 +2813,109 @@ def save_invoice_data(bid_number):
         conn = get_db_connection()
         cur = conn.cursor()
 
-        # Start transaction
-        cur.execute("BEGIN")
-
-        # First, get the actual bid_id from the bid_number
-        cur.execute("SELECT id FROM bids WHERE bid_number = %s",
-                    (str(bid_number), ))
-        bid_row = cur.fetchone()
-        if not bid_row:
-            raise Exception(f"Bid with number {bid_number} not found")
-
-        bid_id = bid_row[0]
-        print(f"Found bid_id {bid_id} for bid_number {bid_number}")
-
-        # Update invoice details in partner_responses
-        cur.execute(
-            """
-            UPDATE partner_responses pr
-            SET 
-                invoice_date = CASE 
-                    WHEN %s IS NOT NULL AND %s != '' THEN %s::DATE 
-                    ELSE invoice_date
-                END,
-                invoice_sent = CASE 
-                    WHEN %s IS NOT NULL AND %s != '' THEN %s::DATE 
-                    ELSE invoice_sent
-                END,
-                invoice_serial = CASE 
-                    WHEN %s IS NOT NULL THEN %s 
-                    ELSE invoice_serial
-                END,
-                invoice_number = CASE 
-                    WHEN %s IS NOT NULL THEN %s 
-                    ELSE invoice_number
-                END,
-                invoice_amount = CASE 
-                    WHEN %s IS NOT NULL THEN %s::DECIMAL 
-                    ELSE invoice_amount
-                END,
-                updated_at = CURRENT_TIMESTAMP
-            FROM partners p
-            WHERE pr.bid_id = %s
-            AND p.partner_name = %s
-            AND pr.partner_id = p.id
-            AND pr.loi = %s
-        """, (data['invoice_data'].get('invoice_date'),
-              data['invoice_data'].get('invoice_date'),
-              data['invoice_data'].get('invoice_date'),
-              data['invoice_data'].get('invoice_sent'),
-              data['invoice_data'].get('invoice_sent'),
-              data['invoice_data'].get('invoice_sent'),
-              data['invoice_data'].get('invoice_serial'),
-              data['invoice_data'].get('invoice_serial'),
-              data['invoice_data'].get('invoice_number'),
-              data['invoice_data'].get('invoice_number'),
-              data['invoice_data'].get('invoice_amount'),
-              data['invoice_data'].get('invoice_amount'), bid_id,
-              data['partner_name'], data['loi']))
-
-        # Get partner_id from partner_name
+        # Resolve bid, partner and partner_response ids in one lookup; the
+        # partner may be given by id or, as the invoice screen does, by name
         cur.execute(
             """
-            SELECT id FROM partners WHERE partner_name = %s
-        """, (data['partner_name'], ))
-
-        partner_row = cur.fetchone()
-        if not partner_row:
-            raise Exception(f"Partner '{data['partner_name']}' not found")
-
-        partner_id = partner_row[0]
-
-        # Get partner_response_id
+            SELECT b.id, p.id, pr.id
+            FROM bids b
+            JOIN partners p ON (
+                p.id = %s OR (%s IS NULL AND p.partner_name = %s)
+            )
+            LEFT JOIN partner_responses pr ON (
+                pr.bid_id = b.id
+                AND pr.partner_id = p.id
+                AND pr.loi = %s
+            )
+            WHERE b.bid_number = %s
+        """, (data.get('partner_id'), data.get('partner_id'),
+              data.get('partner_name'), data['loi'], str(bid_number)))
+        ids = cur.fetchone()
+        if not ids:
+            raise Exception(
+                f"Bid {bid_number} or partner '{data.get('partner_name')}' not found"
+            )
+        bid_id, partner_id, partner_response_id = ids
+        print(f"Found bid_id {bid_id}, partner_id {partner_id}, "
+              f"partner_response_id {partner_response_id}")
+
+        # Save invoice details, creating the partner_response if needed.
+        # Only the fields sent are changed; a field sent empty is cleared.
+        invoice = {
+            key: (value if value != '' else None)
+            for key, value in data.get('invoice_data', {}).items()
+            if key in INVOICE_FIELDS
+        }
+        assignments = ''.join(f"{field} = EXCLUDED.{field}, "
+                              for field in INVOICE_FIELDS
+                              if field in invoice)
         cur.execute(
-            """
-            SELECT id FROM partner_responses 
-            WHERE bid_id = %s AND partner_id = %s AND loi = %s
-        """, (bid_id, partner_id, data['loi']))
-
-        response_row = cur.fetchone()
-        if not response_row:
-            # If partner_response doesn't exist, create it
-            print(
-                f"Creating new partner_response for bid_id={bid_id}, partner_id={partner_id}, loi={data['loi']}"
+            f"""
+            INSERT INTO partner_responses (
+                bid_id, partner_id, loi, status, currency, pmf, created_at,
+                invoice_date, invoice_sent, invoice_serial, invoice_number,
+                invoice_amount
             )
-            cur.execute(
-                """
-                INSERT INTO partner_responses 
-                (bid_id, partner_id, loi, status, currency, pmf, created_at)
-                VALUES (%s, %s, %s, 'pending', 'USD', 0, CURRENT_TIMESTAMP)
-                RETURNING id
-            """, (bid_id, partner_id, data['loi']))
-            response_row = cur.fetchone()
-            if not response_row:
-                raise Exception("Failed to create partner_response record")
-
-        partner_response_id = response_row[0]
-
-        # Update partner_audience_responses for each deliverable
-        for deliverable in data['deliverables']:
-            print(f"Updating deliverable: {deliverable}")
+            VALUES (%s, %s, %s, 'pending', 'USD', 0, CURRENT_TIMESTAMP,
+                    %s::DATE, %s::DATE, %s, %s, %s::DECIMAL)
+            ON CONFLICT (bid_id, partner_id, loi) DO UPDATE SET
+                {assignments}updated_at = CURRENT_TIMESTAMP
+            RETURNING id
+        """, (bid_id, partner_id, data['loi'], invoice.get('invoice_date'),
+              invoice.get('invoice_sent'), invoice.get('invoice_serial'),
+              invoice.get('invoice_number'), invoice.get('invoice_amount')))
+        partner_response_id = cur.fetchone()[0]
 
-            # Check if partner_audience_response exists
+        # Apply every deliverable in one statement: update the cells that
+        # exist, insert the ones that don't
+        deliverables = data.get('deliverables') or []
+        if deliverables:
+            values = ','.join(
+                cur.mogrify("(%s::INTEGER, %s::TEXT, %s::NUMERIC, %s::NUMERIC)",
+                            (d['audience_id'], d['country'], d['final_cpi'],
+                             d['final_cost'])).decode('utf-8')
+                for d in deliverables).replace('%', '%%')
             cur.execute(
-                """
-                SELECT id FROM partner_audience_responses
-                WHERE partner_response_id = %s
-                AND audience_id = %s
-                AND country = %s
-            """, (partner_response_id, deliverable['audience_id'],
-                  deliverable['country']))
-
-            par_row = cur.fetchone()
-
-            if par_row:
-                # Update existing record
-                cur.execute(
-                    """
-                    UPDATE partner_audience_responses
-                    SET 
-                        final_cpi = %s,
-                        final_cost = %s,
-                        initial_cost = COALESCE(initial_cost, n_delivered * cpi),
-                        savings = COALESCE(n_delivered * cpi, 0) - %s
-                    WHERE id = %s
-                """, (deliverable['final_cpi'], deliverable['final_cost'],
-                      deliverable['final_cost'], par_row[0]))
-            else:
-                # Create a new record
-                print(
-                    f"Creating new partner_audience_response for response_id={partner_response_id}, audience_id={deliverable['audience_id']}, country={deliverable['country']}"
+                f"""
+                WITH changes (audience_id, country, final_cpi, final_cost) AS (
+                    VALUES {values}
+                ),
+                updated AS (
+                    UPDATE partner_audience_responses par
+                    SET
+                        final_cpi = c.final_cpi,
+                        final_cost = c.final_cost,
+                        initial_cost = COALESCE(par.initial_cost, par.n_delivered * par.cpi),
+                        savings = COALESCE(par.n_delivered * par.cpi, 0) - c.final_cost
+                    FROM changes c
+                    WHERE par.partner_response_id = %s
+                    AND par.audience_id = c.audience_id
+                    AND par.country = c.country
+                    RETURNING par.audience_id, par.country
                 )
-                cur.execute(
-                    """
-                    INSERT INTO partner_audience_responses 
-                    (bid_id, partner_response_id, audience_id, country, 
-                     cpi, final_cpi, final_cost, n_delivered, created_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                """,
-                    (
-                        bid_id,
-                        partner_response_id,
-                        deliverable['audience_id'],
-                        deliverable['country'],
-                        0,  # Initial CPI
-                        deliverable['final_cpi'],
-                        deliverable['final_cost'],
-                        deliverable['final_cost'] / deliverable['final_cpi']
-                        if deliverable['final_cpi'] > 0 else 0))
+                INSERT INTO partner_audience_responses
+                (bid_id, partner_response_id, audience_id, country,
+                 cpi, final_cpi, final_cost, n_delivered, created_at)
+                SELECT
+                    %s, %s, c.audience_id, c.country,
+                    0, c.final_cpi, c.final_cost,
+                    CASE WHEN c.final_cpi > 0
+                        THEN c.final_cost / c.final_cpi
+                        ELSE 0
+                    END,
+                    CURRENT_TIMESTAMP
+                FROM changes c
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM updated u
+                    WHERE u.audience_id = c.audience_id
+                    AND u.country = c.country
+                )
+                ON CONFLICT (bid_id, partner_response_id, audience_id, country)
+                DO NOTHING
+            """, (partner_response_id, bid_id, partner_response_id))
+            print(f"Saved {len(deliverables)} deliverables for "
+                  f"partner_response_id={partner_response_id} "
+                  f"({cur.rowcount} created)")
 
         conn.commit()
         return jsonify({"message": "Data saved successfully"})
@@ -3058,36 +2932,39 @@ def save_invoice_data(bid_number):
             conn.close()
 
 
+def next_bid_number(cur):
+    """One more than the highest numeric bid number (33485 for none)."""
+    # Matches the idx_bids_numeric_bid_number expression index
+    cur.execute("""
+        SELECT MAX(bid_number::bigint) as max_bid_number
+        FROM bids
+        WHERE bid_number ~ '^[0-9]+$'
+    """)
+
+    result = cur.fetchone()
+    current_max = result[0] if result and result[0] else 0
+
+    if current_max == 0:
+        # If no numeric bid numbers found, start from 33484
+        current_max = 33484
+        print("No numeric bid numbers found, starting from 33484")
+
+    # The next bid number should always be current_max + 1
+    return str(current_max + 1)
+
+
 @app.route('/api/bids/next-number', methods=['GET'])
 def get_next_bid_number():
     try:
         conn = get_db_connection()
         cur = conn.cursor()
 
-        # Get the maximum bid number from PostgreSQL
-        cur.execute("""
-            SELECT MAX(CAST(bid_number AS INTEGER)) as max_bid_number
-            FROM bids 
-            WHERE bid_number ~ '^[0-9]+$'
-        """)
-        
-        result = cur.fetchone()
-        current_max = result[0] if result and result[0] else 0
-
-        if current_max == 0:
-            # If no numeric bid numbers found, start from 33484
-            current_max = 33484
-            print("No numeric bid numbers found, starting from 33484")
-        else:
-            print(f"Found current max bid number: {current_max}")
-
-        # The next bid number should always be current_max + 1
-        next_bid_number = str(current_max + 1)
-        print(f"Returning next bid number: {next_bid_number}")
+        next_number = next_bid_number(cur)
+        print(f"Returning next bid number: {next_number}")
 
         cur.close()
         conn.close()
-        return jsonify({"next_bid_number": next_bid_number})
+        return jsonify({"next_bid_number": next_number})
 
     except Exception as e:
         print(f"Error getting next bid number: {str(e)}")
@@ -3099,6 +2976,52 @@ def get_next_bid_number():
             conn.close()
 
 
+@app.route('/api/bids/editor-bootstrap', methods=['GET'])
+@app.route('/api/bids/<int:bid_id>/editor-bootstrap', methods=['GET'])
+def get_bid_editor_bootstrap(bid_id=None):
+    """Everything the bid editor needs on one connection and one request.
+
+    Returns {bid, next_bid_number, reference}. bid is the same document as
+    GET /api/bids/<id> (null for a new bid). reference is the
+    /api/reference-data payload; pass ?reference_version= to get only the
+    version back when the client's copy is current.
+    """
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        document = None
+        if bid_id is not None:
+            document = fetch_bid_document(cur, bid_id)
+            if document is None:
+                return jsonify({"error": "Bid not found"}), 404
+
+        version, data = reference_cache.snapshot(conn)
+        if request.args.get('reference_version') == version:
+            reference = {'version': version, 'unchanged': True}
+        else:
+            reference = {'version': version, 'unchanged': False, **data}
+
+        rest = json.dumps(
+            {
+                'next_bid_number': next_bid_number(cur),
+                'reference': reference
+            },
+            cls=CustomJSONEncoder)
+        # Splice the bid document in as-is rather than re-encoding it
+        body = '{"bid": ' + (document or 'null') + ', ' + rest[1:]
+        return app.response_class(body, mimetype='application/json')
+
+    except Exception as e:
+        print(f"Error in get_bid_editor_bootstrap: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
+
+
 @app.route('/api/bids/<bid_id>/status', methods=['POST'])
 def update_bid_status(bid_id):
     try:
@@ -3113,6 +3036,7 @@ def update_bid_status(bid_id):
 
         # Start transaction
         cur.execute("BEGIN")
+        status_history.set_actor(cur, request.headers.get('X-User-Id'))
 
         # Standardize status values
         status_mapping = {
@@ -3338,6 +3262,7 @@ def get_invoice_data(bid_id):
 
 
 @app.route('/api/dashboard', methods=['GET'])
+@replica_read
 def get_dashboard_data():
     print("Dashboard endpoint called")  # Debug log
     try:
@@ -3352,6 +3277,15 @@ def get_dashboard_data():
         cur.execute("SELECT id, client_name FROM clients")
         clients_data = {str(client['id']): client for client in cur.fetchall()}
 
+        # Savings come from the per-bid rollups
+        cur.execute(
+            "SELECT COALESCE(SUM(savings), 0) as total_savings FROM bid_rollups"
+        )
+        total_savings = float(cur.fetchone()['total_savings'])
+
+        # Creation to first invoice, from the status history rollups
+        avg_turnaround_time = status_history.avg_turnaround_days(cur)
+
         # Calculate dashboard metrics
         total_bids = len(bids_data)
 
@@ -3415,8 +3349,8 @@ def get_dashboard_data():
         dashboard_data = {
             "total_bids": total_bids,
             "active_bids": active_bids,
-            "total_savings": 0,  # TODO: Calculate from partner responses
-            "avg_turnaround_time": 0,  # TODO: Calculate from bid dates
+            "total_savings": total_savings,
+            "avg_turnaround_time": avg_turnaround_time,
             "bids_by_status": status_counts,
             "client_summary": client_summary
         }
@@ -3453,43 +3387,118 @@ def get_dashboard_data():
             conn.close()
 
 
+@app.route('/api/metrics/turnaround', methods=['GET'])
+@replica_read
+def get_turnaround_metrics():
+    """Turnaround and mean days per status, grouped by team or client."""
+    try:
+        group_by = request.args.get('group_by', 'team')
+        since = status_history.parse_since(request.args.get('since'))
+
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+
+        cur.execute(*status_history.turnaround_query(group_by, since))
+        turnaround = [{
+            'name': row['name'],
+            'bids': row['bids'],
+            'avg_days': status_history.days(row['avg_days']),
+            'median_days': status_history.days(row['median_days'])
+        } for row in cur.fetchall()]
+
+        cur.execute(*status_history.stage_durations_query(group_by, since))
+        stages = {}
+        for row in cur.fetchall():
+            stages.setdefault(row['name'], {})[row['status']] = {
+                'bids': row['bids'],
+                'avg_days': status_history.days(row['avg_days'])
+            }
+
+        return jsonify({
+            'group_by': group_by,
+            'turnaround': turnaround,
+            'stage_durations': stages
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in get_turnaround_metrics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
+
+
+@app.route('/api/bids/<int:bid_id>/status-history', methods=['GET'])
+@replica_read
+def get_bid_status_history(bid_id):
+    """Status transitions of a bid, oldest first."""
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        history = status_history.bid_history(cur, bid_id)
+        return jsonify({'history': history})
+    except Exception as e:
+        print(f"Error in get_bid_status_history: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
+
+
 @app.route('/api/ready-for-invoice', methods=['GET'])
 def get_ready_for_invoice():
     try:
+        page, page_size = queues.parse_paging(request.args)
         conn = get_db_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
 
+        # Page through the invoice queue first, then read cells for those
+        # bids only instead of every partner_audience_responses row
+        bids, total = queues.fetch_queue(cur, 'invoice', request.args, page,
+                                         page_size)
+        bid_ids = [bid['id'] for bid in bids]
+
         cur.execute("""
-            WITH partner_loi_stats AS (
-                SELECT 
-                    pr.partner_id,
-                    p.partner_name AS audience_Partner,
-                    pr.loi,  -- Changed from par.loi to pr.loi
-                    par.country,
-                    par.commitment,
-                    par.cpi,
-                    par.timeline_d,
-                    par.comments,
-                    par.allocation,
-                    par.n_delivered
-                FROM partner_audience_responses par
-                JOIN partner_responses pr ON par.partner_response_id = pr.id
-                JOIN partners p ON pr.partner_id = p.id
-            )
             SELECT 
-                pls.*,
+                pr.bid_id,
+                b.bid_number,
+                pr.partner_id,
+                p.partner_name AS audience_Partner,
+                pr.loi,
+                par.country,
+                par.commitment,
+                par.cpi,
+                par.timeline_days,
+                par.comments,
+                par.allocation,
+                par.n_delivered,
                 CASE 
-                    WHEN pls.n_delivered = 0  -- Changed condition to only check n_delivered
+                    WHEN par.n_delivered = 0
                     THEN 'No respondents delivered for this LOI'
                     ELSE NULL 
                 END as message
-            FROM partner_loi_stats pls
-            ORDER BY pls.audience_Partner, pls.loi;
-        """)
+            FROM partner_audience_responses par
+            JOIN partner_responses pr ON par.partner_response_id = pr.id
+            JOIN partners p ON pr.partner_id = p.id
+            JOIN bids b ON pr.bid_id = b.id
+            WHERE pr.bid_id = ANY(%s)
+            ORDER BY array_position(%s, pr.bid_id), p.partner_name, pr.loi
+        """, (bid_ids, bid_ids))
 
-        results = cur.fetchall()
-        return jsonify(results)
+        return jsonify({
+            'rows': cur.fetchall(),
+            'total': total,
+            'page': page,
+            'page_size': page_size
+        })
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in get_ready_for_invoice: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -3500,21 +3509,6 @@ def get_ready_for_invoice():
             conn.close()
 
 
-# Add this at the beginning of your main.py, after the imports
-def init_db():
-    try:
-        print("Starting PostgreSQL database initialization...")
-
-        # Initialize PostgreSQL database
-        init_postgresql_db()
-
-        print("PostgreSQL database initialization completed successfully")
-
-    except Exception as e:
-        print(f"Error initializing PostgreSQL database: {str(e)}")
-        raise e
-
-
 @app.route('/api/bids/<bid_id>/closure', methods=['PUT'])
 def update_closure(bid_id):
     try:
@@ -3526,75 +3520,38 @@ def update_closure(bid_id):
             f"Updating closure data for bid {bid_id}, partner {data['partner']}, LOI {data['loi']}"
         )
 
-        # Update field close date and metrics for each audience per partner
+        # Allocated cells for this partner and LOI, grouped by audience
+        cells_by_audience = {}
+        for par_id, audience_id, country in closure_writes.fetch_cells(
+                cur, bid_id, data['partner'], data['loi']):
+            cells_by_audience.setdefault(str(audience_id), []).append(
+                (par_id, country))
+
+        # Field close date, metrics and n_delivered for every audience/country
+        updates = {}
         for audience in data['audienceData']:
-            metrics = audience.get('metrics', {})
-            field_close_date = audience.get('field_close_date')
+            records = cells_by_audience.get(str(audience['id']), [])
+            if not records:
+                print(f"No record found for audience {audience['id']}")
+                continue
 
-            # Get n_delivered values from the countries array
+            metrics = closure_writes.parse_metrics(audience.get('metrics', {}))
+            field_close_date = audience.get('field_close_date') or None
             n_delivered_values = {
                 country['name']: country['delivered']
                 for country in audience.get('countries', [])
             }
 
-            print(f"N delivered values: {n_delivered_values}")
-
-            # First, check if a record exists
-            cur.execute(
-                """
-                SELECT par.id, par.country 
-                FROM partner_audience_responses par
-                JOIN partner_responses pr ON par.partner_response_id = pr.id
-                JOIN partners p ON pr.partner_id = p.id
-                WHERE par.bid_id = %s 
-                AND par.audience_id = %s
-                AND p.partner_name = %s
-                AND pr.loi = %s
-                AND par.allocation > 0
-            """, (bid_id, audience['id'], data['partner'], data['loi']))
-
-            records = cur.fetchall()
-
-            if records:
-                print(f"Updating records for audience {audience['id']}")
-                print(f"Field close date: {field_close_date}")
-                print(f"Metrics: {metrics}")
-
-                # Update each country record
-                for record_id, country in records:
-                    n_delivered = n_delivered_values.get(country)
-                    print(
-                        f"Updating n_delivered for country {country}: {n_delivered}"
-                    )
+            for par_id, country in records:
+                updates[par_id] = {
+                    'field_close_date': field_close_date,
+                    'n_delivered': closure_writes.parse_delivered(
+                        n_delivered_values.get(country)),
+                    **metrics
+                }
 
-                    cur.execute(
-                        """
-                        UPDATE partner_audience_responses par
-                        SET 
-                            field_close_date = %s::date,
-                            n_delivered = %s,
-                            final_loi = %s,
-                            final_ir = %s,
-                            final_timeline = %s,
-                            quality_rejects = %s,
-                            communication = %s,
-                            engagement = %s,
-                            problem_solving = %s,
-                            additional_feedback = %s
-                        WHERE par.id = %s
-                    """, (field_close_date, n_delivered,
-                          metrics.get('finalLOI'), metrics.get('finalIR'),
-                          metrics.get('finalTimeline'),
-                          metrics.get('qualityRejects'),
-                          metrics.get('communication'),
-                          metrics.get('engagement'),
-                          metrics.get('problemSolving'),
-                          metrics.get('additionalFeedback'), record_id))
-                    print(
-                        f"Updated metrics and n_delivered for audience {audience['id']}, country {country}"
-                    )
-            else:
-                print(f"No record found for audience {audience['id']}")
+        updated = closure_writes.apply_cell_updates(cur, updates)
+        print(f"Updated {updated} closure records for bid {bid_id}")
 
         conn.commit()
         return jsonify({"message": "Closure data updated successfully"})
@@ -3614,12 +3571,14 @@ def update_bid_invoice_status(bid_id):
     try:
         conn = get_db_connection()
         cur = conn.cursor()
+        status_history.set_actor(cur, request.headers.get('X-User-Id'))
 
         # Update bid status to 'invoiced' (standardized status)
         cur.execute(
             """
             UPDATE bids 
-            SET status = 'invoiced'
+            SET status = 'invoiced',
+                updated_at = CURRENT_TIMESTAMP
             WHERE id = %s
         """, (bid_id, ))
 
@@ -3680,12 +3639,14 @@ def move_to_infield(bid_number):
         cur = conn.cursor()
 
         print(f"Moving bid {bid_number} to infield...")
+        status_history.set_actor(cur, request.headers.get('X-User-Id'))
 
         # Update bid status using bid_number
         cur.execute(
             """
             UPDATE bids 
-            SET status = 'infield'
+            SET status = 'infield',
+                updated_at = CURRENT_TIMESTAMP
             WHERE bid_number = %s
             RETURNING id, bid_number, status
         """, (bid_number, ))
@@ -4041,6 +4002,7 @@ def submit_invoice(bid_id):
             raise Exception(f"Bid with number {bid_id} not found")
 
         actual_bid_id = bid_row[0]
+        status_history.set_actor(cur, request.headers.get('X-User-Id'))
 
         # Update bid status to 'invoiced'
         cur.execute(
@@ -4070,14 +4032,6 @@ def submit_invoice(bid_id):
 
 
 # These functions are not needed for Replit DB (key-value store)
-def add_field_close_date_column():
-    print("Skipping field_close_date column addition - using Replit DB")
-
-
-def standardize_invoice_status():
-    print("Skipping invoice status standardization - using Replit DB")
-
-
 # Add a global OPTIONS route handler
 @app.route('/<path:path>', methods=['OPTIONS'])
 def options_handler(path):
@@ -4235,6 +4189,9 @@ def update_partner(partner_id):
 
         data = request.json
         print(f"Updating partner {partner_id} with data: {data}")
+        geographic_coverage = data.get('geographic_coverage')
+        if geographic_coverage is not None:
+            geographic_coverage = countries.canonical_list(geographic_coverage)
 
         # Update partner information
         cur.execute(
@@ -4256,11 +4213,11 @@ def update_partner(partner_id):
         """, (data.get('partner_name'), data.get('contact_person'),
               data.get('contact_email'), data.get('contact_phone'),
               data.get('website'), data.get('company_address'),
-              data.get('specialized'), data.get('geographic_coverage'),
-              partner_id))
+              data.get('specialized'), geographic_coverage, partner_id))
 
         updated_partner = cur.fetchone()
         conn.commit()
+        reference_cache.invalidate()
 
         if not updated_partner:
             return jsonify(
@@ -4293,6 +4250,7 @@ def delete_partner(partner_id):
         # Delete the partner
         cur.execute("DELETE FROM partners WHERE id = %s", (partner_id, ))
         conn.commit()
+        reference_cache.invalidate()
 
         return jsonify({"message": "Partner deleted successfully"})
 
@@ -4309,63 +4267,81 @@ def delete_partner(partner_id):
 @app.route('/api/vms/<int:vm_id>', methods=['PUT'])
 def update_vm(vm_id):
     try:
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+
         data = request.json
         print(f"Updating VM {vm_id} with data: {data}")
 
-        # Get VMs from Replit DB
-        vms = db.get('vendor_managers', {})
+        # Check if new vm_id already exists for a different VM
+        cur.execute(
+            'SELECT id FROM vendor_managers WHERE vm_id = %s AND id != %s',
+            (data.get('vm_id'), vm_id))
+        if cur.fetchone():
+            return jsonify({"error": "VM ID already exists"}), 400
 
-        # Find the VM to update
-        vm_key = str(vm_id)
-        if vm_key not in vms:
-            return jsonify({"error": f"VM with ID {vm_id} not found"}), 404
+        # Update VM information
+        cur.execute(
+            """
+            UPDATE vendor_managers
+            SET vm_id = %s,
+                vm_name = %s,
+                contact_person = %s,
+                reporting_manager = %s,
+                team = %s,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+            RETURNING id, vm_id, vm_name, contact_person, reporting_manager, team, created_at, updated_at
+        """, (data.get('vm_id'), data.get('vm_name'),
+              data.get('contact_person'), data.get('reporting_manager'),
+              data.get('team'), vm_id))
 
-        # Check if new vm_id already exists (if it's being changed)
-        if data.get('vm_id') and data.get('vm_id') != vms[vm_key].get('vm_id'):
-            for existing_vm in vms.values():
-                if existing_vm.get('vm_id') == data.get('vm_id'):
-                    return jsonify({"error": "VM ID already exists"}), 400
-
-        # Update VM data
-        vms[vm_key].update({
-            'vm_id': data.get('vm_id'),
-            'vm_name': data.get('vm_name'),
-            'contact_person': data.get('contact_person'),
-            'reporting_manager': data.get('reporting_manager'),
-            'team': data.get('team'),
-            'updated_at': datetime.now().isoformat()
-        })
+        updated_vm = cur.fetchone()
+        visibility.refresh_vm_bids(cur, vm_id)
+        conn.commit()
+        reference_cache.invalidate()
 
-        # Save back to Replit DB
-        db['vendor_managers'] = vms
+        if not updated_vm:
+            return jsonify({"error": f"VM with ID {vm_id} not found"}), 404
 
-        return jsonify(vms[vm_key])
+        return jsonify(updated_vm)
 
     except Exception as e:
         print(f"Error updating VM: {str(e)}")
         return jsonify({"error": str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
 
 
 @app.route('/api/vms/<int:vm_id>', methods=['DELETE'])
 def delete_vm(vm_id):
     try:
-        # Get VMs from Replit DB
-        vms = db.get('vendor_managers', {})
+        conn = get_db_connection()
+        cur = conn.cursor()
 
-        # Check if VM exists
-        vm_key = str(vm_id)
-        if vm_key not in vms:
+        # First check if VM exists
+        cur.execute("SELECT id FROM vendor_managers WHERE id = %s", (vm_id, ))
+        if not cur.fetchone():
             return jsonify({"error": f"VM with ID {vm_id} not found"}), 404
 
         # Delete the VM
-        del vms[vm_key]
-        db['vendor_managers'] = vms
+        cur.execute("DELETE FROM vendor_managers WHERE id = %s", (vm_id, ))
+        conn.commit()
+        reference_cache.invalidate()
 
         return jsonify({"message": "VM deleted successfully"})
 
     except Exception as e:
         print(f"Error deleting VM: {str(e)}")
         return jsonify({"error": str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
 
 
 @app.route('/api/sales/<int:sales_id>', methods=['PUT'])
@@ -4395,6 +4371,7 @@ def update_sales(sales_id):
 
         updated_sales = cur.fetchone()
         conn.commit()
+        reference_cache.invalidate()
 
         if not updated_sales:
             return jsonify({"error":
@@ -4427,6 +4404,7 @@ def delete_sales(sales_id):
         # Delete the sales
         cur.execute("DELETE FROM sales WHERE id = %s", (sales_id, ))
         conn.commit()
+        reference_cache.invalidate()
 
         return jsonify({"message": "Sales deleted successfully"})
 
@@ -5208,33 +5186,122 @@ def get_partner_responses_summary(bid_id):
         return jsonify({"error": str(e)}), 500
 
 
+# Typed proposals columns and the summary keys the proposal form posts
+PROPOSAL_SUMMARY_FIELDS = {
+    'total_cost': 'totalCost',
+    'total_revenue': 'totalRevenue',
+    'total_margin': 'totalMargin',
+    'effective_margin': 'effectiveMargin',
+    'avg_cpi': 'avgCPI'
+}
+
+
+def proposal_summary_columns(payload):
+    """Typed summary values for the proposals table from a proposal payload."""
+
+    def to_decimal(value):
+        try:
+            number = Decimal(str(value))
+        except (ArithmeticError, ValueError, TypeError):
+            return None
+        return number if number.is_finite() else None
+
+    document = payload.get('data') or {}
+    summary = document.get('summary') or {}
+    values = {
+        column: to_decimal(summary.get(key))
+        for column, key in PROPOSAL_SUMMARY_FIELDS.items()
+    }
+    values['margin_percentage'] = to_decimal(document.get('marginPercentage'))
+    return values
+
+
 @app.route('/api/proposals', methods=['GET'])
+@replica_read
 def list_proposals():
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    cur.execute("""
-        SELECT 
-            p.id as proposal_id,
-            p.bid_id,
-            b.bid_number,
-            b.study_name,
-            b.methodology,
-            c.client_name,
-            p.data->'data'->'summary'->>'totalCost' as total_cost,
-            p.data->'data'->'summary'->>'totalRevenue' as total_revenue,
-            p.data->'data'->'summary'->>'totalMargin' as total_margin,
-            p.data->'data'->'summary'->>'effectiveMargin' as effective_margin,
-            p.data->'data'->'summary'->>'avgCPI' as avg_cpi,
-            p.created_at
-        FROM proposals p
-        JOIN bids b ON p.bid_id = b.id
-        LEFT JOIN clients c ON b.client = c.id
-        ORDER BY p.created_at DESC
-    """)
-    proposals = cur.fetchall()
-    cur.close()
-    conn.close()
-    return jsonify(proposals)
+    try:
+        page, page_size = queues.parse_paging(request.args)
+        offset = (page - 1) * page_size
+
+        conditions = []
+        params = []
+        if request.args.get('bid_id'):
+            conditions.append("p.bid_id = %s")
+            params.append(int(request.args.get('bid_id')))
+        if request.args.get('client'):
+            conditions.append("b.client = %s")
+            params.append(int(request.args.get('client')))
+        if request.args.get('search'):
+            conditions.append(
+                "(b.bid_number ILIKE %s OR b.study_name ILIKE %s)")
+            search = f"%{request.args.get('search').strip()}%"
+            params.extend([search, search])
+        if request.args.get('date_from'):
+            conditions.append("p.created_at >= %s::date")
+            params.append(request.args.get('date_from'))
+        if request.args.get('date_to'):
+            conditions.append("p.created_at < %s::date + 1")
+            params.append(request.args.get('date_to'))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute(
+            f"""
+            SELECT 
+                p.id as proposal_id,
+                p.bid_id,
+                b.bid_number,
+                b.study_name,
+                b.methodology,
+                c.client_name,
+                p.total_cost,
+                p.total_revenue,
+                p.total_margin,
+                p.effective_margin,
+                p.avg_cpi,
+                p.margin_percentage,
+                p.created_at,
+                COUNT(*) OVER() as total_count
+            FROM proposals p
+            JOIN bids b ON p.bid_id = b.id
+            LEFT JOIN clients c ON b.client = c.id
+            {where}
+            ORDER BY p.created_at DESC, p.id DESC
+            LIMIT %s OFFSET %s
+        """, params + [page_size, offset])
+        proposals = cur.fetchall()
+
+        total = proposals[0]['total_count'] if proposals else 0
+        if not proposals and offset:
+            cur.execute(
+                f"""
+                SELECT COUNT(*) as total_count
+                FROM proposals p
+                JOIN bids b ON p.bid_id = b.id
+                {where}
+            """, params)
+            total = cur.fetchone()['total_count']
+        for proposal in proposals:
+            del proposal['total_count']
+
+        return jsonify({
+            'proposals': proposals,
+            'total': total,
+            'page': page,
+            'page_size': page_size
+        })
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in list_proposals: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
 
 
 @app.route('/api/proposals', methods=['POST'])
@@ -5243,25 +5310,36 @@ def create_proposal():
         data = request.json
         conn = get_db_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
+        apply_proposal_costing(conn, data)
+        summary = proposal_summary_columns(data)
 
         # Insert new proposal
         cur.execute(
             """
-            INSERT INTO proposals (bid_id, data)
-            VALUES (%s, %s)
+            INSERT INTO proposals (
+                bid_id, data, total_cost, total_revenue, total_margin,
+                effective_margin, avg_cpi, margin_percentage
+            )
+            VALUES (%(bid_id)s, %(data)s, %(total_cost)s, %(total_revenue)s,
+                    %(total_margin)s, %(effective_margin)s, %(avg_cpi)s,
+                    %(margin_percentage)s)
             RETURNING id
-        """, (data['bid_id'], json.dumps(data)))
+        """, {
+                'bid_id': data['bid_id'],
+                'data': json.dumps(data),
+                **summary
+            })
 
         new_id = cur.fetchone()['id']
         conn.commit()
-        cur.close()
-        conn.close()
 
         return jsonify({
             'id': new_id,
             'message': 'Proposal created successfully'
         }), 201
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in create_proposal: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -5278,29 +5356,43 @@ def update_proposal(proposal_id):
         data = request.json
         conn = get_db_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
+        if data.get('bid_id'):
+            apply_proposal_costing(conn, data)
+        summary = proposal_summary_columns(data)
 
         # Update proposal
         cur.execute(
             """
             UPDATE proposals 
-            SET data = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
+            SET data = %(data)s,
+                total_cost = %(total_cost)s,
+                total_revenue = %(total_revenue)s,
+                total_margin = %(total_margin)s,
+                effective_margin = %(effective_margin)s,
+                avg_cpi = %(avg_cpi)s,
+                margin_percentage = %(margin_percentage)s,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = %(proposal_id)s
             RETURNING id
-        """, (json.dumps(data), proposal_id))
+        """, {
+                'data': json.dumps(data),
+                'proposal_id': proposal_id,
+                **summary
+            })
 
         updated = cur.fetchone()
         if not updated:
             return jsonify({"error": "Proposal not found"}), 404
 
         conn.commit()
-        cur.close()
-        conn.close()
 
         return jsonify({
             'id': updated['id'],
             'message': 'Proposal updated successfully'
         })
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in update_proposal: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -5311,6 +5403,60 @@ def update_proposal(proposal_id):
             conn.close()
 
 
+@app.route('/api/bids/<int:bid_id>/proposal-costing', methods=['POST'])
+def get_proposal_costing(bid_id):
+    """Cost, revenue and margin for the proposal form's selected allocations.
+
+    Body: {allocations, margin_percentage, markups: [..], loi}. Each markup
+    is returned as an extra what-if scenario; rates lists the quote used for
+    every partner/audience/country, selected or not.
+    """
+    try:
+        data = request.json or {}
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        rates = proposal_costing.fetch_rates(cur, bid_id, data.get('loi'))
+        selections = proposal_costing.selections_from_allocations(
+            data.get('allocations'))
+        return jsonify({
+            **proposal_costing.cost_proposal(
+                rates, selections, data.get('margin_percentage', 30),
+                data.get('markups') or []),
+            'rates': proposal_costing.quotes(rates)
+        })
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in get_proposal_costing: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
+
+
+def apply_proposal_costing(conn, payload):
+    """Replace the posted proposal summary and line figures with the
+    server-side costing."""
+    document = payload.get('data')
+    if not isinstance(document, dict) or 'allocations' not in document:
+        return
+    with conn.cursor() as cur:
+        rates = proposal_costing.fetch_rates(cur, payload['bid_id'])
+    selections = proposal_costing.selections_from_allocations(
+        document['allocations'])
+    costing = proposal_costing.cost_proposal(
+        rates, selections, document.get('marginPercentage', 30))
+    proposal_costing.apply_lines(document['allocations'], costing['lines'])
+    document['summary'] = {
+        **(document.get('summary') or {}),
+        **costing['summary']
+    }
+
+
 @app.route('/api/proposals/<int:proposal_id>', methods=['GET'])
 def get_proposal(proposal_id):
     conn = get_db_connection()
@@ -5348,6 +5494,7 @@ def get_bid_partners(bid_id):
 
 
 @app.route('/api/bids/find-similar', methods=['POST'])
+@replica_read
 def find_similar_bids():
     try:
         data = request.json
@@ -5563,6 +5710,7 @@ def copy_bid(bid_id):
                              1) if max_bid_number else '10001'
 
         # 3. Insert the new bid
+        status_history.set_actor(cur, request.headers.get('X-User-Id'))
         cur.execute(
             '''
             INSERT INTO bids (
@@ -5659,6 +5807,7 @@ def copy_bid(bid_id):
                   row['communication'], row['engagement'],
                   row['problem_solving'], row['additional_feedback']))
 
+        visibility.refresh_bids(cur, [new_bid_id])
         conn.commit()
         return jsonify({
             'new_bid_id': new_bid_id,
@@ -5695,67 +5844,53 @@ def grant_bid_access(bid_id):
             VALUES (%s, %s, %s, %s)
             ON CONFLICT (bid_id, user_id, team) DO NOTHING
         ''', (bid_id, user_id, team, granted_by))
+        visibility.refresh_bids(cur, [bid_id])
+        # Emails go out from the outbox worker, not this request
+        queued = notifications.enqueue_bid_access(cur, bid_id, user_id, team)
         conn.commit()
-        # Fetch bid info for email
-        cur.execute('SELECT bid_number, study_name FROM bids WHERE id = %s',
-                    (bid_id, ))
-        bid_info = cur.fetchone()
-        bid_number = bid_info[0] if bid_info else bid_id
-        study_name = bid_info[1] if bid_info else ''
-        # Prepare recipients
-        recipients = []
-        if user_id:
-            cur.execute('SELECT email, name FROM users WHERE id = %s',
-                        (user_id, ))
-            user = cur.fetchone()
-            if user:
-                recipients.append({'email': user[0], 'name': user[1]})
-        if team:
-            cur.execute('SELECT email, name FROM users WHERE team = %s',
-                        (team, ))
-            team_users = cur.fetchall()
-            for u in team_users:
-                recipients.append({'email': u[0], 'name': u[1]})
-        # Remove duplicates
-        seen = set()
-        unique_recipients = []
-        for r in recipients:
-            if r['email'] not in seen:
-                unique_recipients.append(r)
-                seen.add(r['email'])
-        # Send email
-        for r in unique_recipients:
-            try:
-                msg = Message(subject=f"Bid Access Granted: {bid_number}",
-                              sender=app.config['MAIL_DEFAULT_SENDER'],
-                              recipients=[r['email']])
-                msg.body = f"""Hi {r['name']},
-
-You have been granted access to the following bid:
-
-Bid Number: {bid_number}
-Study Name: {study_name}
-
-You can now view and copy this bid in the system.
-
-Best regards,
-Bid Management Team"""
-
-                mail.send(msg)
-                print(f"Access granted email sent to {r['email']}")
-            except Exception as email_error:
-                print(f"Error sending access granted email to {r['email']}: {str(email_error)}")
-                import traceback
-                print(f"Email error traceback: {traceback.format_exc()}")
         cur.close()
         conn.close()
-        return jsonify({'message': 'Access granted successfully.'}), 200
+        wake_email_outbox()
+        return jsonify({
+            'message': 'Access granted successfully.',
+            'notifications_queued': queued
+        }), 200
     except Exception as e:
         print(f"Error in grant_bid_access: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/bids/<int:bid_id>/notifications', methods=['GET'])
+def get_bid_notifications(bid_id):
+    """Delivery status of the emails queued for a bid."""
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute(
+            '''
+            SELECT id, kind, email, name, status, attempts, last_error,
+                   created_at, sent_at
+            FROM email_outbox
+            WHERE bid_id = %s
+            ORDER BY id DESC
+        ''', (bid_id, ))
+        notifications_list = cur.fetchall()
+        counts = {}
+        for row in notifications_list:
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+        return jsonify({'notifications': notifications_list, 'counts': counts})
+    except Exception as e:
+        print(f"Error in get_bid_notifications: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if 'cur' in locals():
+            cur.close()
+        if 'conn' in locals():
+            conn.close()
+
+
 @app.route('/api/bids/<int:bid_id>/access', methods=['GET'])
+@replica_read
 def check_bid_access(bid_id):
     try:
         user_id = request.args.get('user_id')
@@ -5764,13 +5899,7 @@ def check_bid_access(bid_id):
             return jsonify({'error': 'user_id or team is required'}), 400
         conn = get_db_connection()
         cur = conn.cursor()
-        cur.execute(
-            '''
-            SELECT 1 FROM bid_access
-            WHERE bid_id = %s AND (user_id = %s OR team = %s)
-            LIMIT 1
-        ''', (bid_id, user_id, team))
-        has_access = cur.fetchone() is not None
+        has_access = visibility.can_see(cur, bid_id, user_id, team)
         cur.close()
         conn.close()
         return jsonify({'has_access': has_access}), 200
@@ -5839,6 +5968,7 @@ def grant_access_request(bid_id, request_id):
         # Mark request as granted
         cur.execute('UPDATE bid_access_requests SET status = %s WHERE id = %s',
                     ('granted', request_id))
+        visibility.refresh_bids(cur, [bid_id])
         conn.commit()
         
         # Verify the access was inserted
@@ -5937,7 +6067,8 @@ def revoke_bid_access(bid_id):
             DELETE FROM bid_access_requests
             WHERE bid_id = %s AND (user_id = %s OR team = %s)
         ''', (bid_id, user_id, team))
-        
+
+        visibility.refresh_bids(cur, [bid_id])
         conn.commit()
         cur.close()
         conn.close()
@@ -6004,119 +6135,28 @@ def get_granted_counts_batch():
         return jsonify({}), 500
 
 
-# Move app.run to the end after all routes are defined
-if __name__ == '__main__':
-    try:
-        print("Initializing application...")
-        # Initialize database when app starts
-        init_db()
-        add_field_close_date_column()
-        standardize_invoice_status()
-        print("Database initialization completed")
-
-        port = int(os.environ.get('PORT', 5000))
-        print(f"Starting server on port {port}...")
-
-        # Use Flask dev server with proper host binding
-        app.run(host='0.0.0.0', port=port, debug=False, use_reloader=False)
-        
-    except Exception as e:
-        print(f"Error starting server: {str(e)}")
-        import traceback
-        print(f"Full traceback: {traceback.format_exc()}")
-        
-        # Try alternative port if 5000 is busy
-        try:
-            alt_port = 5001
-            print(f"Trying alternative port {alt_port}...")
-            app.run(host='0.0.0.0', port=alt_port, debug=False, use_reloader=False)
-        except Exception as fallback_error:
-            print(f"Fallback server also failed: {str(fallback_error)}")
-            raise
-
-
-@app.before_first_request
-def create_tables():
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    # Create partner_links table if it doesn't exist
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS partner_links (
-            id SERIAL PRIMARY KEY,
-            bid_id INTEGER REFERENCES bids(id),
-            partner_id INTEGER REFERENCES partners(id),
-            token TEXT NOT NULL,
-            expires_at TIMESTAMP NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            notification_sent BOOLEAN DEFAULT FALSE,
-            UNIQUE(bid_id, partner_id)
-        )
-    """)
-
-    # Create proposals table if it doesn't exist
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS proposals (
-            id SERIAL PRIMARY KEY,
-            bid_id INTEGER REFERENCES bids(id),
-            data JSONB NOT NULL DEFAULT '{}',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    conn.commit()
-    cur.close()
-    conn.close()
+# The built frontend, indexed once per worker (see static_assets.py)
+static_assets = StaticAssets()
 
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve_react(path):
     try:
-        # Look for dist directory in the parent directory (project root)
-        project_root = os.path.dirname(
-            os.path.dirname(os.path.abspath(__file__)))
-        dist_dir = os.path.join(project_root, 'dist')
-
-        print(f"Looking for dist directory at: {dist_dir}")
-        print(f"Dist directory exists: {os.path.exists(dist_dir)}")
-
         # Skip API routes
         if path.startswith('api/'):
             return "API route not found", 404
 
-        # For non-empty paths, try to serve the specific file
-        if path and not path.startswith('api'):
-            file_path = os.path.join(dist_dir, path)
-            if os.path.exists(file_path) and os.path.isfile(file_path):
-                return send_from_directory(dist_dir, path)
-
-        # For root path or if specific file not found, serve index.html
-        index_path = os.path.join(dist_dir, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(dist_dir, 'index.html')
-
-        return "React app not built. Please run 'npm run build' from the project root first.", 404
+        response = static_assets.response(path, request)
+        if response is None:
+            return "React app not built. Please run 'npm run build' from the project root first.", 404
+        return response
 
     except Exception as e:
         print(f"Error serving file: {str(e)}")
         return f"Error serving file: {str(e)}", 500
 
 
-@app.route('/debug/routes', methods=['GET'])
-def debug_routes():
-    routes = []
-    for rule in app.url_map.iter_rules():
-        routes.append({
-            'endpoint': rule.endpoint,
-            'methods': list(rule.methods),
-            'path': str(rule)
-        })
-    return jsonify(routes)
-
-
 @app.route('/api/admin/reset-password', methods=['POST'])
 def reset_admin_password():
     """
@@ -6161,3 +6201,13 @@ def reset_admin_password():
             cur.close()
         if 'conn' in locals():
             conn.close()
+
+
+# Local development only; production runs gunicorn with gunicorn.conf.py
+if __name__ == '__main__':
+    # Schema changes and seed data are applied by migrate.py, once per
+    # deploy, not by each app process
+    start_scheduler()
+    port = int(os.environ.get('PORT', 5000))
+    print(f"Starting development server on port {port}...")
+    app.run(host='0.0.0.0', port=port, debug=False, use_reloader=False)
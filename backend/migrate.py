@@ -0,0 +1,261 @@
+"""Versioned schema migrations.
+
+Migrations are the NNNN_description.sql files in database/migrations, run
+in version order and recorded in schema_migrations. Run once per deploy,
+before the app starts:
+
+    python migrate.py            # apply pending migrations
+    python migrate.py status     # list applied and pending migrations
+    python migrate.py baseline --through 1
+                                 # record migrations as applied without
+                                 # running them (a database created before
+                                 # this runner existed)
+
+Each file runs in its own transaction. A file whose first line is
+'-- migrate: no-transaction' runs in autocommit mode instead, for
+statements such as CREATE INDEX CONCURRENTLY, sending each statement on
+its own and recording the file once they have all succeeded. Concurrent
+runs are serialised with an advisory lock, so only one of several
+deploying workers applies a given migration.
+"""
+import argparse
+import hashlib
+import os
+import re
+
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'database', 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.sql$')
+NO_TRANSACTION = '-- migrate: no-transaction'
+# Arbitrary key for pg_advisory_lock, shared by every runner
+LOCK_KEY = 734_210_046
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """[(version, name, path, checksum)] sorted by version."""
+    migrations = []
+    seen = {}
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in seen:
+            raise ValueError(f"Duplicate migration version {version}: "
+                             f"{seen[version]} and {filename}")
+        seen[version] = filename
+        path = os.path.join(directory, filename)
+        with open(path, 'rb') as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        migrations.append((version, match.group(2), path, checksum))
+    return migrations
+
+
+def ensure_table(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum VARCHAR(64) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    cur.close()
+
+
+def applied_versions(conn):
+    """{version: checksum} of the migrations already recorded."""
+    cur = conn.cursor()
+    cur.execute("SELECT version, checksum FROM schema_migrations")
+    applied = dict(cur.fetchall())
+    conn.rollback()
+    cur.close()
+    return applied
+
+
+def pending(conn, directory=MIGRATIONS_DIR):
+    """Migrations not yet recorded in schema_migrations."""
+    applied = applied_versions(conn)
+    return [m for m in discover(directory) if m[0] not in applied]
+
+
+def _record(cur, version, name, checksum):
+    cur.execute(
+        """
+        INSERT INTO schema_migrations (version, name, checksum)
+        VALUES (%s, %s, %s)
+    """, (version, name, checksum))
+
+
+# Dollar-quote opener ($$ or $tag$); a bare $1 is a parameter, and a $
+# inside an identifier (foo$bar$) is neither
+DOLLAR_QUOTE = re.compile(r'\$([A-Za-z_][A-Za-z0-9_]*)?\$')
+
+
+def split_statements(sql):
+    """The statements in sql, split on semicolons outside quotes and comments.
+
+    Only needed for no-transaction files; everything else is sent whole.
+    """
+    statements = []
+    start = i = 0
+    while i < len(sql):
+        char = sql[i]
+        if sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = len(sql) if end == -1 else end + 1
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            i = len(sql) if end == -1 else end + 2
+        elif char in ("'", '"'):
+            # A doubled quote inside the literal is an escaped quote, and
+            # scanning on from it lands in the same literal again
+            end = sql.find(char, i + 1)
+            i = len(sql) if end == -1 else end + 1
+        elif (char == '$' and DOLLAR_QUOTE.match(sql, i)
+              and not (i and (sql[i - 1].isalnum() or sql[i - 1] in '_$'))):
+            tag = DOLLAR_QUOTE.match(sql, i).group(0)
+            end = sql.find(tag, i + len(tag))
+            i = len(sql) if end == -1 else end + len(tag)
+        elif char == ';':
+            statements.append(sql[start:i])
+            start = i = i + 1
+        else:
+            i += 1
+    statements.append(sql[start:])
+    return [s.strip() for s in statements if _has_code(s)]
+
+
+def _has_code(statement):
+    """False for text that is only whitespace and comments."""
+    return bool(
+        re.sub(r'--[^\n]*|/\*.*?\*/', '', statement, flags=re.S).strip())
+
+
+def apply(conn, migration):
+    version, name, path, checksum = migration
+    with open(path) as f:
+        sql = f.read()
+
+    if sql.startswith(NO_TRANSACTION):
+        # One execute per statement: a multi-statement string is a single
+        # implicit transaction, which CREATE INDEX CONCURRENTLY refuses.
+        # Recorded only once every statement has succeeded, so a failed
+        # file is retried whole (write its statements with IF NOT EXISTS).
+        conn.autocommit = True
+        try:
+            cur = conn.cursor()
+            for statement in split_statements(sql):
+                cur.execute(statement)
+            _record(cur, version, name, checksum)
+            cur.close()
+        finally:
+            conn.autocommit = False
+        return
+
+    cur = conn.cursor()
+    try:
+        cur.execute(sql)
+        _record(cur, version, name, checksum)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def migrate(conn, directory=MIGRATIONS_DIR):
+    """Apply every pending migration; returns the versions applied."""
+    ensure_table(conn)
+    cur = conn.cursor()
+    cur.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY, ))
+    conn.commit()
+    try:
+        # Read after taking the lock, so a concurrent run's work is seen
+        done = []
+        for migration in pending(conn, directory):
+            print(f"Applying {migration[0]:04d}_{migration[1]}...")
+            apply(conn, migration)
+            done.append(migration[0])
+        return done
+    finally:
+        cur.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY, ))
+        conn.commit()
+        cur.close()
+
+
+def baseline(conn, through, directory=MIGRATIONS_DIR):
+    """Record migrations up to and including through as already applied."""
+    ensure_table(conn)
+    applied = applied_versions(conn)
+    cur = conn.cursor()
+    recorded = []
+    for version, name, _, checksum in discover(directory):
+        if version <= through and version not in applied:
+            _record(cur, version, name, checksum)
+            recorded.append(version)
+    conn.commit()
+    cur.close()
+    return recorded
+
+
+def status(conn, directory=MIGRATIONS_DIR):
+    """[(version, name, state)], state being applied, pending or changed."""
+    ensure_table(conn)
+    applied = applied_versions(conn)
+    rows = []
+    for version, name, _, checksum in discover(directory):
+        if version not in applied:
+            state = 'pending'
+        elif applied[version] != checksum:
+            state = 'changed'
+        else:
+            state = 'applied'
+        rows.append((version, name, state))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Apply or inspect the versioned schema migrations")
+    parser.add_argument('command',
+                        nargs='?',
+                        default='up',
+                        choices=['up', 'status', 'baseline'])
+    parser.add_argument('--through',
+                        type=int,
+                        help="with baseline, the last version to record")
+    args = parser.parse_args()
+    if args.command == 'baseline' and args.through is None:
+        parser.error("baseline needs --through")
+
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        if args.command == 'status':
+            rows = status(conn)
+            for version, name, state in rows:
+                print(f"{version:04d}_{name}: {state}")
+            if any(state == 'changed' for _, _, state in rows):
+                print("Applied migrations were edited afterwards; "
+                      "add a new migration instead")
+            return
+        if args.command == 'baseline':
+            recorded = baseline(conn, args.through)
+            print(f"Recorded {len(recorded)} migrations as applied")
+            return
+        done = migrate(conn)
+    finally:
+        conn.close()
+    print(f"Applied {len(done)} migrations" if done else "Schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
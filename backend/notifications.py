@@ -0,0 +1,116 @@
+import os
+
+# Rows claimed per worker run; all of them go out on one SMTP connection
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 50))
+# Delivery attempts before a recipient is marked failed
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 5))
+
+# kind -> (subject, body); formatted with name, bid_number and study_name
+TEMPLATES = {
+    'bid_access_granted': (
+        "Bid Access Granted: {bid_number}",
+        """Hi {name},
+
+You have been granted access to the following bid:
+
+Bid Number: {bid_number}
+Study Name: {study_name}
+
+You can now view and copy this bid in the system.
+
+Best regards,
+Bid Management Team""",
+    ),
+}
+
+
+def enqueue_bid_access_query(bid_id, user_id=None, team=None):
+    """(sql, params) queueing one 'bid_access_granted' email per recipient.
+
+    The team is expanded to its users here, in one statement; a user named
+    directly and also in the team gets a single email, and a recipient who
+    already has the same email pending is not queued twice.
+    """
+    return """
+        INSERT INTO email_outbox (kind, bid_id, email, name)
+        SELECT DISTINCT ON (u.email) 'bid_access_granted', %s, u.email, u.name
+        FROM users u
+        WHERE (u.id = %s OR (%s::text IS NOT NULL AND u.team = %s))
+        AND COALESCE(u.email, '') <> ''
+        ORDER BY u.email
+        ON CONFLICT DO NOTHING
+    """, [bid_id, user_id, team, team]
+
+
+def enqueue_bid_access(cur, bid_id, user_id=None, team=None):
+    """Queue the bid access emails (see enqueue_bid_access_query).
+
+    Returns the number of emails queued.
+    """
+    cur.execute(*enqueue_bid_access_query(bid_id, user_id, team))
+    return cur.rowcount
+
+
+def claim_batch_query(limit=EMAIL_BATCH_SIZE):
+    """(sql, params) locking up to limit due emails, skipping rows another
+    worker holds."""
+    return """
+        SELECT o.id, o.kind, o.email, o.name, o.attempts,
+               b.bid_number, b.study_name
+        FROM email_outbox o
+        LEFT JOIN bids b ON b.id = o.bid_id
+        WHERE o.status = 'pending'
+        AND o.next_attempt_at <= CURRENT_TIMESTAMP
+        ORDER BY o.id
+        LIMIT %s
+        FOR UPDATE OF o SKIP LOCKED
+    """, [limit]
+
+
+def claim_batch(cur, limit=EMAIL_BATCH_SIZE):
+    """Lock up to limit due emails (see claim_batch_query)."""
+    cur.execute(*claim_batch_query(limit))
+    return cur.fetchall()
+
+
+def render(row):
+    """(subject, body) for a claimed row."""
+    subject, body = TEMPLATES[row['kind']]
+    values = {
+        'name': row['name'] or row['email'],
+        'bid_number': row['bid_number'] or '',
+        'study_name': row['study_name'] or ''
+    }
+    return subject.format(**values), body.format(**values)
+
+
+def record_results(cur, sent_ids, failures):
+    """Mark sent rows and reschedule or fail the rest.
+
+    failures maps outbox id -> error message. Retries back off by a minute
+    per attempt.
+    """
+    if sent_ids:
+        cur.execute(
+            """
+            UPDATE email_outbox
+            SET status = 'sent',
+                attempts = attempts + 1,
+                last_error = NULL,
+                sent_at = CURRENT_TIMESTAMP
+            WHERE id = ANY(%s)
+        """, (sent_ids, ))
+    if failures:
+        ids = list(failures)
+        cur.execute(
+            """
+            UPDATE email_outbox o
+            SET attempts = o.attempts + 1,
+                last_error = f.error,
+                status = CASE WHEN o.attempts + 1 >= %s
+                              THEN 'failed' ELSE 'pending' END,
+                next_attempt_at = CURRENT_TIMESTAMP
+                    + (o.attempts + 1) * INTERVAL '1 minute'
+            FROM unnest(%s::integer[], %s::text[]) AS f (id, error)
+            WHERE o.id = f.id
+        """, (EMAIL_MAX_ATTEMPTS, ids, [failures[i] for i in ids]))
@@ -0,0 +1,92 @@
+# Partner directory search for the bid form's partner picker. The array
+# filters use the GIN indexes and the name prefix the lower(partner_name)
+# index from 0015_add_partner_search_indexes.sql.
+import countries
+from queues import parse_paging
+
+# Only what the picker shows; contact details stay on /api/partners
+PICKER_COLUMNS = """
+    p.id, p.partner_id, p.partner_name, p.specialized, p.geographic_coverage
+"""
+
+
+def _list_arg(args, name):
+    """?name=a&name=b and ?name=a,b both give ['a', 'b']."""
+    values = []
+    for value in args.getlist(name):
+        values.extend(v.strip() for v in value.split(',') if v.strip())
+    return values
+
+
+def partner_filters(args):
+    """(conditions, params) from the query string.
+
+    specialized and countries match partners covering any of the values
+    (&&), or every value with match=all (@>). A country matches under any
+    of its spellings (countries.spellings), so "United States" finds
+    partners stored with "USA". name is a case-insensitive prefix of the
+    partner name.
+    """
+    operator = '@>' if args.get('match') == 'all' else '&&'
+    conditions = []
+    params = []
+    specialized = _list_arg(args, 'specialized')
+    if specialized:
+        conditions.append(f"p.specialized {operator} %s::text[]")
+        params.append(specialized)
+    wanted = countries.canonical_list(_list_arg(args, 'countries'))
+    if wanted and operator == '@>':
+        # Every country covered, each under any of its spellings
+        for country in wanted:
+            conditions.append("p.geographic_coverage && %s::text[]")
+            params.append(countries.spellings(country))
+    elif wanted:
+        conditions.append("p.geographic_coverage && %s::text[]")
+        params.append(
+            [name for country in wanted for name in countries.spellings(country)])
+    name = args.get('name', '').strip()
+    if name:
+        escaped = (name.lower().replace('\\', '\\\\').replace('%', '\\%')
+                   .replace('_', '\\_'))
+        conditions.append("LOWER(p.partner_name) LIKE %s")
+        params.append(f"{escaped}%")
+    ids = [int(i) for i in _list_arg(args, 'ids')]
+    if ids:
+        conditions.append("p.id = ANY(%s)")
+        params.append(ids)
+    return conditions, params
+
+
+def partner_query(args, page, page_size):
+    """(sql, params) for one page of matching partners, ordered by name."""
+    conditions, params = partner_filters(args)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    sql = f"""
+        SELECT {PICKER_COLUMNS}, COUNT(*) OVER() as total_count
+        FROM partners p
+        {where}
+        ORDER BY LOWER(p.partner_name), p.id
+        LIMIT %s OFFSET %s
+    """
+    return sql, params + [page_size, (page - 1) * page_size]
+
+
+def search_partners(cur, args):
+    """One page of matching partners.
+
+    Returns (partners, total, page, page_size).
+    """
+    page, page_size = parse_paging(args)
+    cur.execute(*partner_query(args, page, page_size))
+    partners = cur.fetchall()
+
+    total = partners[0]['total_count'] if partners else 0
+    if not partners and page > 1:
+        conditions, params = partner_filters(args)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        cur.execute(f"SELECT COUNT(*) as total_count FROM partners p {where}",
+                    params)
+        total = cur.fetchone()['total_count']
+    for partner in partners:
+        del partner['total_count']
+    return partners, total, page, page_size
@@ -0,0 +1,200 @@
+import numpy as np
+
+
+def fetch_rates(cur, bid_id, loi=None):
+    """Partner quotes for a bid, one row per partner/audience/country.
+
+    When no LOI is given each partner's shortest quoted LOI is used.
+    """
+    cur.execute(
+        """
+        SELECT DISTINCT ON (pr.partner_id, par.audience_id, par.country)
+            pr.partner_id,
+            par.audience_id,
+            par.country,
+            pr.loi,
+            COALESCE(par.cpi, 0),
+            COALESCE(pr.pmf, 0),
+            COALESCE(pr.currency, 'USD'),
+            COALESCE(par.commitment, 0),
+            COALESCE(par.commitment_type, 'fixed'),
+            COALESCE(par.timeline_days, 0)
+        FROM partner_audience_responses par
+        JOIN partner_responses pr ON par.partner_response_id = pr.id
+        WHERE pr.bid_id = %s
+        AND (%s IS NULL OR pr.loi = %s)
+        ORDER BY pr.partner_id, par.audience_id, par.country, pr.loi
+    """, (bid_id, loi, loi))
+    return cur.fetchall()
+
+
+def selections_from_allocations(allocations):
+    """Flatten the proposal form's {audience: {country: {partner: cell}}}
+    structure into (audience_id, country, partner_id, allocation) for the
+    selected cells.
+
+    Raises ValueError when an audience or partner id is not an integer.
+    """
+    selections = []
+    for audience_id, countries in (allocations or {}).items():
+        for country, partners in (countries or {}).items():
+            for partner_id, cell in (partners or {}).items():
+                if not cell or not cell.get('selected'):
+                    continue
+                try:
+                    allocation = float(cell.get('allocation') or 0)
+                except (TypeError, ValueError):
+                    allocation = 0.0
+                selections.append((_id(audience_id, 'audience'), country,
+                                   _id(partner_id, 'partner'), allocation))
+    return selections
+
+
+def _id(value, kind):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {kind} id: {value!r}")
+
+
+def quotes(rates):
+    """fetch_rates rows as dicts, for showing rates on unselected cells."""
+    return [{
+        'partner_id': row[0],
+        'audience_id': row[1],
+        'country': row[2],
+        'loi': row[3],
+        'cpi': round(float(row[4]), 2),
+        'commitment': float(row[7]),
+        'commitment_type': row[8],
+        'timeline': float(row[9])
+    } for row in rates]
+
+
+def apply_lines(allocations, lines):
+    """Copy the costed lines' figures onto the matching selected cells of
+    the form's allocations structure, so a saved proposal's line items
+    agree with its summary."""
+    by_cell = {(line['audience_id'], line['country'], line['partner_id']):
+               line
+               for line in lines}
+    for audience_id, countries in (allocations or {}).items():
+        for country, partners in (countries or {}).items():
+            for partner_id, cell in (partners or {}).items():
+                if not cell or not cell.get('selected'):
+                    continue
+                line = by_cell.get((_id(audience_id, 'audience'), country,
+                                    _id(partner_id, 'partner')))
+                if not line:
+                    continue
+                for field in ('cpi', 'salesPrice', 'cost', 'revenue',
+                              'commitment', 'timeline'):
+                    cell[field] = line[field]
+
+
+def _summary(cost, revenue, completes, partners_used):
+    margin = revenue - cost
+    return {
+        'totalCost': round(cost, 2),
+        'totalRevenue': round(revenue, 2),
+        'totalMargin': round(margin, 2),
+        'effectiveMargin': round(margin / revenue * 100, 2) if revenue else 0.0,
+        'totalCompletes': int(round(completes)),
+        'partnersUsed': partners_used,
+        'avgCPI': round(cost / completes, 2) if completes else 0.0
+    }
+
+
+def cost_proposal(rates, selections, margin_percentage, markups=()):
+    """Cost, revenue and margin for a set of selected allocations.
+
+    rates come from fetch_rates and selections from
+    selections_from_allocations. Sales price is CPI marked up by
+    margin_percentage, as on the proposal form; each value in markups is
+    evaluated as an extra what-if scenario over the same allocations. PMF is
+    reported separately as a percentage of partner cost.
+    """
+    rate_index = {(row[0], row[1], row[2]): i for i, row in enumerate(rates)}
+    n_rates = len(rates)
+
+    rate_cpi = np.array([float(row[4]) for row in rates] + [0.0])
+    rate_pmf = np.array([float(row[5]) for row in rates] + [0.0])
+    rate_commitment = np.array([float(row[7]) for row in rates] + [0.0])
+    rate_be_max = np.array([row[8] == 'be_max' for row in rates] + [False])
+    rate_currency = np.array([row[6] for row in rates] + ['USD'])
+    rate_timeline = np.array([float(row[9]) for row in rates] + [0.0])
+    rate_loi = [row[3] for row in rates] + [None]
+
+    # Selections without a quote point at the trailing zero rate
+    index = np.array([
+        rate_index.get((partner_id, audience_id, country), n_rates)
+        for audience_id, country, partner_id, _ in selections
+    ], dtype=int)
+    allocation = np.array([s[3] for s in selections], dtype=float)
+
+    cpi = rate_cpi[index]
+    cost = allocation * cpi
+    pmf_cost = cost * rate_pmf[index] / 100
+    currency = rate_currency[index]
+    over_commitment = (~rate_be_max[index]) & (allocation >
+                                               rate_commitment[index])
+
+    # One row per markup scenario, the base margin first
+    scenario_margins = np.array([float(margin_percentage)] +
+                                [float(m) for m in markups])
+    revenue = np.outer(1 + scenario_margins / 100, cost)
+
+    total_cost = float(cost.sum())
+    completes = float(allocation.sum())
+    partners_used = len({s[2] for s in selections})
+    totals_revenue = revenue.sum(axis=1)
+
+    summary = _summary(total_cost, float(totals_revenue[0]), completes,
+                       partners_used)
+    summary['pmfCost'] = round(float(pmf_cost.sum()), 2)
+
+    scenarios = [{
+        'margin_percentage': float(m),
+        **_summary(total_cost, float(r), completes, partners_used)
+    } for m, r in zip(scenario_margins[1:], totals_revenue[1:])]
+
+    by_currency = {}
+    if len(selections):
+        codes, inverse = np.unique(currency, return_inverse=True)
+        currency_cost = np.bincount(inverse, weights=cost, minlength=len(codes))
+        currency_revenue = np.bincount(inverse,
+                                       weights=revenue[0],
+                                       minlength=len(codes))
+        by_currency = {
+            str(code): {
+                'totalCost': round(float(c), 2),
+                'totalRevenue': round(float(r), 2)
+            }
+            for code, c, r in zip(codes, currency_cost, currency_revenue)
+        }
+
+    sales_price = cpi * (1 + scenario_margins[0] / 100)
+    lines = [{
+        'audience_id': audience_id,
+        'country': country,
+        'partner_id': partner_id,
+        'allocation': float(allocation[i]),
+        'cpi': round(float(cpi[i]), 2),
+        'salesPrice': round(float(sales_price[i]), 2),
+        'cost': round(float(cost[i]), 2),
+        'revenue': round(float(revenue[0][i]), 2),
+        'currency': str(currency[i]),
+        'loi': rate_loi[index[i]],
+        'timeline': float(rate_timeline[index[i]]),
+        'commitment': float(rate_commitment[index[i]]),
+        'over_commitment': bool(over_commitment[i]),
+        'missing_rate': bool(index[i] == n_rates)
+    } for i, (audience_id, country, partner_id, _) in enumerate(selections)]
+
+    return {
+        'summary': summary,
+        'scenarios': scenarios,
+        'by_currency': by_currency,
+        'mixed_currency': len(by_currency) > 1,
+        'lines': lines
+    }
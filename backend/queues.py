@@ -0,0 +1,168 @@
+import bid_search
+
+# Per-bid metrics for each queue, read from the bid_rollups row of each bid
+# on the requested page (see 0011_add_bid_rollups.sql)
+CLOSURE_METRICS = """
+    COALESCE(r.n_delivered, 0) as total_delivered,
+    COALESCE(r.quality_rejects, 0) as quality_rejects,
+    COALESCE(r.avg_final_loi, 0) as avg_loi,
+    COALESCE(r.avg_final_ir, 0) as avg_ir
+"""
+
+# Averages and allocation over delivered cells only (0021)
+INVOICE_METRICS = """
+    COALESCE(r.delivered_avg_initial_cpi, 0) as avg_initial_cpi,
+    COALESCE(r.delivered_allocation, 0) as allocation,
+    COALESCE(r.n_delivered, 0) as n_delivered,
+    COALESCE(r.delivered_avg_final_loi, 0) as avg_final_loi,
+    COALESCE(r.delivered_avg_final_ir, 0) as avg_final_ir,
+    COALESCE(r.delivered_avg_final_cpi, 0) as avg_final_cpi,
+    COALESCE(r.final_cost, 0) as invoice_amount,
+    COALESCE(r.savings, 0) as savings
+"""
+
+QUEUES = {
+    'infield': {
+        'statuses': ['infield'],
+        'metrics': None
+    },
+    'closure': {
+        'statuses': ['closure'],
+        'metrics': CLOSURE_METRICS
+    },
+    'invoice': {
+        'statuses': ['ready_for_invoice', 'invoiced'],
+        'metrics': INVOICE_METRICS
+    },
+}
+
+SORT_COLUMNS = {
+    'updated_at': 'b.updated_at',
+    'bid_date': 'b.bid_date',
+    'bid_number': 'b.bid_number',
+    'study_name': 'b.study_name',
+    'client_name': 'c.client_name',
+    'status': 'b.status',
+}
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+
+
+def parse_paging(args):
+    """Return (page, page_size) from the query string, as get_bids does."""
+    page = max(int(args.get('page', 1)), 1)
+    page_size = min(max(int(args.get('page_size', DEFAULT_PAGE_SIZE)), 1),
+                    MAX_PAGE_SIZE)
+    return page, page_size
+
+
+def queue_query(queue, args, page=None, page_size=None, with_metrics=True):
+    """SQL for one page of a status queue.
+
+    Filters: client (id), team, search (bid number, study or client name)
+    and date_from/date_to on the date the bid last changed. sort is one of
+    SORT_COLUMNS with order asc/desc, defaulting to the most recently
+    updated first. Without page_size every bid in the queue is returned.
+    """
+    if queue not in QUEUES:
+        raise ValueError(f"Unknown queue: {queue}")
+    spec = QUEUES[queue]
+
+    sort = args.get('sort') or 'updated_at'
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Unsupported sort column: {sort}")
+    direction = (args.get('order') or 'desc').lower()
+    if direction not in ('asc', 'desc'):
+        raise ValueError(f"Unsupported sort order: {direction}")
+    order_by = f"{SORT_COLUMNS[sort]} {direction.upper()} NULLS LAST, b.id {direction.upper()}"
+
+    # Compare on the enum itself so idx_bids_status_updated_at applies
+    conditions = ["b.status = ANY(%s::bid_status[])"]
+    params = [spec['statuses']]
+
+    if args.get('client'):
+        conditions.append("b.client = %s")
+        params.append(int(args.get('client')))
+    if args.get('team'):
+        conditions.append(
+            "LOWER(REPLACE(vm.team, ' ', '')) = LOWER(REPLACE(%s, ' ', ''))")
+        params.append(args.get('team'))
+    if args.get('search', '').strip():
+        # Same indexed match as the bid list (see bid_search.py)
+        match_sql, match_params = bid_search.match_ids_sql(
+            args.get('search').strip())
+        conditions.append(f"b.id IN ({match_sql})")
+        params.extend(match_params)
+    if args.get('date_from'):
+        conditions.append("b.updated_at >= %s::date")
+        params.append(args.get('date_from'))
+    if args.get('date_to'):
+        conditions.append("b.updated_at < %s::date + 1")
+        params.append(args.get('date_to'))
+
+    limit = ''
+    if page_size:
+        limit = 'LIMIT %s OFFSET %s'
+        params.extend([page_size, ((page or 1) - 1) * page_size])
+
+    metrics_select = ''
+    metrics_join = ''
+    if with_metrics and spec['metrics']:
+        metrics_select = f",{spec['metrics']}"
+        metrics_join = "LEFT JOIN bid_rollups r ON r.bid_id = q.id"
+
+    sql = f"""
+        WITH q AS (
+            SELECT
+                b.id,
+                bpo.po_number,
+                b.bid_number,
+                b.bid_date,
+                b.study_name,
+                b.methodology,
+                c.client_name,
+                s.sales_person as sales_contact,
+                vm.vm_name as vm_contact,
+                vm.team,
+                b.status,
+                b.updated_at,
+                ROW_NUMBER() OVER (ORDER BY {order_by}) as queue_position,
+                COUNT(*) OVER() as total_count
+            FROM bids b
+            LEFT JOIN clients c ON b.client = c.id
+            LEFT JOIN sales s ON b.sales_contact = s.id
+            LEFT JOIN vendor_managers vm ON b.vm_contact = vm.id
+            LEFT JOIN bid_po_numbers bpo ON bpo.bid_id = b.id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {order_by}
+            {limit}
+        )
+        SELECT q.*{metrics_select}
+        FROM q
+        {metrics_join}
+        ORDER BY q.queue_position
+    """
+    return sql, params
+
+
+def fetch_queue(cur, queue, args, page=None, page_size=None):
+    """Run queue_query on a RealDictCursor, returning (bids, total)."""
+    sql, params = queue_query(queue, args, page, page_size)
+    cur.execute(sql, params)
+    bids = cur.fetchall()
+
+    total = bids[0]['total_count'] if bids else 0
+    if not bids and page and page > 1:
+        # Past the last page: count the queue without fetching rows
+        count_sql, count_params = queue_query(queue,
+                                              args,
+                                              with_metrics=False)
+        cur.execute(f"SELECT COUNT(*) as total_count FROM ({count_sql}) t",
+                    count_params)
+        total = cur.fetchone()['total_count']
+
+    for bid in bids:
+        del bid['total_count']
+        del bid['queue_position']
+    return bids, total
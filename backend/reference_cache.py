@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from psycopg2.extras import RealDictCursor
+
+# Queries backing each reference list; kept identical to the column lists the
+# /api/sales, /api/vms, /api/clients and /api/partners handlers always returned.
+REFERENCE_QUERIES = {
+    'sales': """
+        SELECT id, sales_id, sales_person, contact_person, reporting_manager, region, created_at, updated_at
+        FROM sales ORDER BY id
+    """,
+    'vms': """
+        SELECT id, vm_id, vm_name, contact_person, reporting_manager, team, created_at, updated_at
+        FROM vendor_managers ORDER BY id
+    """,
+    'clients': """
+        SELECT id, client_id, client_name, contact_person, email, phone, country, created_at, updated_at
+        FROM clients ORDER BY id
+    """,
+    'partners': """
+        SELECT id, partner_id, partner_name, contact_person, contact_email, contact_phone,
+               website, company_address, specialized, geographic_coverage, created_at, updated_at
+        FROM partners ORDER BY id
+    """,
+}
+
+# Writes in one worker invalidate that worker immediately. Other workers
+# notice the change from reference_data_stamp (0020), a counter the database
+# bumps on every write to these tables, which they read at most once per
+# REFERENCE_CACHE_CHECK_SECONDS. The TTL is only a backstop.
+REFERENCE_CACHE_TTL = int(os.getenv('REFERENCE_CACHE_TTL', 300))
+REFERENCE_CACHE_CHECK_SECONDS = float(
+    os.getenv('REFERENCE_CACHE_CHECK_SECONDS', 1))
+
+STAMP_QUERY = "SELECT counter FROM reference_data_stamp"
+
+
+class ReferenceDataCache:
+    """In-memory copy of the clients, VMs, sales and partners tables.
+
+    The version stamp is a hash of the cached content, so every worker holding
+    the same data reports the same version and the frontend can keep its own
+    copy across page loads.
+    """
+
+    def __init__(self,
+                 connection_factory,
+                 ttl=REFERENCE_CACHE_TTL,
+                 check_interval=REFERENCE_CACHE_CHECK_SECONDS):
+        self._connection_factory = connection_factory
+        self._ttl = ttl
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        # (version, data, loaded_at, stamp), swapped as a whole so readers
+        # never see a version paired with another load's data
+        self._entry = None
+        self._checked_at = 0
+
+    def _read_stamp(self, conn=None):
+        own_conn = conn is None
+        if own_conn:
+            conn = self._connection_factory()
+        try:
+            cur = conn.cursor()
+            cur.execute(STAMP_QUERY)
+            row = cur.fetchone()
+            cur.close()
+        finally:
+            if own_conn:
+                conn.close()
+        return row[0] if row else None
+
+    def _fresh_entry(self, conn=None):
+        entry = self._entry
+        now = time.monotonic()
+        if entry is None or now - entry[2] >= self._ttl:
+            return None
+        if now - self._checked_at < self._check_interval:
+            return entry
+        if self._read_stamp(conn) != entry[3]:
+            return None
+        self._checked_at = now
+        return entry
+
+    def _load(self, conn=None):
+        own_conn = conn is None
+        if own_conn:
+            conn = self._connection_factory()
+        try:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            # Read before the data: a write landing in between leaves an old
+            # stamp, which only costs one extra reload
+            cur.execute(STAMP_QUERY)
+            row = cur.fetchone()
+            stamp = row['counter'] if row else None
+            data = {}
+            for name, query in REFERENCE_QUERIES.items():
+                cur.execute(query)
+                data[name] = cur.fetchall()
+            cur.close()
+        finally:
+            if own_conn:
+                conn.close()
+
+        payload = json.dumps(data, sort_keys=True, default=str)
+        version = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+        self._entry = (version, data, time.monotonic(), stamp)
+        self._checked_at = self._entry[2]
+        print(f"Reference data cache loaded (version {version})")
+        return self._entry
+
+    def snapshot(self, conn=None):
+        """Return (version, data), reloading from the database when stale.
+
+        An open connection may be passed in to avoid opening a new one.
+        """
+        entry = self._fresh_entry(conn)
+        if entry is None:
+            with self._lock:
+                entry = self._fresh_entry(conn) or self._load(conn)
+        return entry[0], entry[1]
+
+    def get(self, name, conn=None):
+        """Return a single reference list, e.g. get('clients')."""
+        return self.snapshot(conn)[1][name]
+
+    def version(self, conn=None):
+        return self.snapshot(conn)[0]
+
+    def invalidate(self):
+        """Drop the cached copy; the next read reloads from the database."""
+        with self._lock:
+            self._entry = None
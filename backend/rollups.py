@@ -0,0 +1,165 @@
+import argparse
+import os
+
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Columns maintained by refresh_bid_rollups (see 0011_add_bid_rollups.sql);
+# savings is generated from the two cost columns
+ROLLUP_COLUMNS = [
+    'cell_count', 'allocation', 'n_delivered', 'quality_rejects',
+    'avg_final_loi', 'avg_final_ir', 'avg_initial_cpi', 'avg_final_cpi',
+    'initial_cost', 'final_cost'
+]
+# Per-bid only: the invoice queue's delivered-cell figures (0021)
+DELIVERED_COLUMNS = [
+    'delivered_allocation', 'delivered_avg_final_loi',
+    'delivered_avg_final_ir', 'delivered_avg_initial_cpi',
+    'delivered_avg_final_cpi'
+]
+
+# level -> (rollup table, source view, key columns, compared columns)
+ROLLUP_LEVELS = {
+    'bid': ('bid_rollups', 'bid_rollup_source', ['bid_id'],
+            ROLLUP_COLUMNS + DELIVERED_COLUMNS),
+    'partner': ('bid_partner_rollups', 'bid_partner_rollup_source',
+                ['partner_response_id'], ROLLUP_COLUMNS),
+}
+
+
+def _mismatches(cur, level, bid_ids=None):
+    table, view, keys, columns = ROLLUP_LEVELS[level]
+    bid_filter = 'WHERE bid_id = ANY(%s)' if bid_ids else ''
+    params = [bid_ids, bid_ids] if bid_ids else []
+
+    stored = ', '.join(f"r.{c}" for c in columns)
+    expected = ', '.join(f"s.{c}" for c in columns)
+    key_join = ' AND '.join(f"s.{k} = r.{k}" for k in keys)
+
+    cur.execute(
+        f"""
+        SELECT
+            COALESCE(r.bid_id, s.bid_id) as bid_id,
+            {', '.join(f"COALESCE(r.{k}, s.{k})" for k in keys)},
+            row_to_json(r) as stored,
+            row_to_json(s) as expected
+        FROM (SELECT * FROM {table} {bid_filter}) r
+        FULL JOIN (SELECT * FROM {view} {bid_filter}) s ON {key_join}
+        WHERE r.{keys[0]} IS NULL
+        OR s.{keys[0]} IS NULL
+        OR ({stored}) IS DISTINCT FROM ({expected})
+    """, params)
+
+    mismatches = []
+    for bid_id, key, stored_row, expected_row in cur.fetchall():
+        if stored_row is None or expected_row is None:
+            differing = ['missing' if stored_row is None else 'stale']
+        else:
+            differing = [
+                c for c in columns
+                if stored_row.get(c) != expected_row.get(c)
+            ]
+        mismatches.append({
+            'level': level,
+            'bid_id': bid_id,
+            keys[0]: key,
+            'columns': differing,
+            'stored': stored_row,
+            'expected': expected_row
+        })
+    return mismatches
+
+
+def check_rollups(conn, bid_ids=None, fix=False):
+    """Compare the stored rollups with a fresh aggregation of the raw cells.
+
+    Returns {'checked_bids', 'mismatches': [...], 'fixed'}. With fix, every
+    bid with a mismatch is recomputed and committed.
+    """
+    cur = conn.cursor()
+    try:
+        mismatches = []
+        for level in ROLLUP_LEVELS:
+            mismatches += _mismatches(cur, level, bid_ids)
+
+        if bid_ids:
+            checked = len(bid_ids)
+        else:
+            cur.execute("SELECT COUNT(*) FROM bids")
+            checked = cur.fetchone()[0]
+
+        fixed = []
+        if fix and mismatches:
+            fixed = sorted({m['bid_id'] for m in mismatches})
+            cur.execute("SELECT refresh_bid_rollups(%s)", (fixed, ))
+            conn.commit()
+        else:
+            conn.rollback()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return {
+        'checked_bids': checked,
+        'mismatches': mismatches,
+        'fixed': fixed
+    }
+
+
+def rebuild_rollups(conn, bid_ids=None):
+    """Recompute rollups for the given bids, or for every bid."""
+    cur = conn.cursor()
+    try:
+        if bid_ids:
+            cur.execute("SELECT refresh_bid_rollups(%s)", (bid_ids, ))
+        else:
+            cur.execute(
+                "SELECT refresh_bid_rollups(ARRAY(SELECT id FROM bids))")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check or rebuild the per-bid delivery and cost rollups")
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    parser.add_argument('--bid-id',
+                        type=int,
+                        action='append',
+                        dest='bid_ids',
+                        help="limit to this bid (repeatable)")
+    parser.add_argument('--fix',
+                        action='store_true',
+                        help="with check, recompute bids that disagree")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        if args.command == 'rebuild':
+            rebuild_rollups(conn, args.bid_ids)
+            print("Rollups rebuilt")
+            return
+        result = check_rollups(conn, args.bid_ids, fix=args.fix)
+    finally:
+        conn.close()
+
+    print(f"Checked {result['checked_bids']} bids, "
+          f"{len(result['mismatches'])} mismatched rollup rows")
+    for m in result['mismatches']:
+        print(f"  {m['level']} bid {m['bid_id']}: {', '.join(m['columns'])}")
+    if result['fixed']:
+        print(f"Recomputed {len(result['fixed'])} bids")
+    if result['mismatches'] and not result['fixed']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
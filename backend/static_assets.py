@@ -0,0 +1,148 @@
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import Response, send_file
+
+# Vite's default output, one level above backend/
+DIST_DIR = os.getenv(
+    'STATIC_DIST_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                 'dist'))
+# Vite's build.assetsDir; everything in it has a content hash in its name
+ASSETS_PREFIX = 'assets/'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Precompressed variants written next to each file at build time (see
+# vite.config.ts), in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def _manifest_files(dist_dir):
+    """Output files named in the Vite manifest, all content-hashed."""
+    for name in (os.path.join('.vite', 'manifest.json'), 'manifest.json'):
+        path = os.path.join(dist_dir, name)
+        if os.path.isfile(path):
+            with open(path) as f:
+                manifest = json.load(f)
+            files = set()
+            for chunk in manifest.values():
+                files.add(chunk['file'])
+                files.update(chunk.get('css', []))
+                files.update(chunk.get('assets', []))
+            return files
+    return set()
+
+
+class StaticAssets:
+    """The built SPA, indexed once at startup.
+
+    Requests are answered from the in-memory index without touching the
+    filesystem to look anything up: hashed assets with a one-year immutable
+    Cache-Control, .br/.gz variants when the client accepts them, and
+    index.html from memory with an ETag so a reload costs a 304.
+    """
+
+    def __init__(self, dist_dir=DIST_DIR):
+        self.dist_dir = dist_dir
+        self.files = {}  # relative path -> absolute path
+        self.variants = {}  # relative path -> {encoding: absolute path}
+        self.immutable = set()
+        self.index_html = None
+        self.index_etag = None
+        if os.path.isdir(dist_dir):
+            self._scan()
+
+    @property
+    def built(self):
+        return self.index_html is not None
+
+    def _scan(self):
+        suffixes = {suffix: encoding for encoding, suffix in ENCODINGS}
+        found = {}
+        for root, _, filenames in os.walk(self.dist_dir):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                rel = os.path.relpath(path, self.dist_dir).replace(os.sep, '/')
+                found[rel] = path
+
+        for rel, path in found.items():
+            base, suffix = os.path.splitext(rel)
+            if suffix in suffixes and base in found:
+                self.variants.setdefault(base, {})[suffixes[suffix]] = path
+            else:
+                self.files[rel] = path
+
+        manifest = _manifest_files(self.dist_dir)
+        self.immutable = {
+            rel
+            for rel in self.files
+            if rel in manifest or rel.startswith(ASSETS_PREFIX)
+        }
+
+        index_path = self.files.get('index.html')
+        if index_path:
+            with open(index_path, 'rb') as f:
+                self.index_html = f.read()
+            self.index_etag = hashlib.sha1(self.index_html).hexdigest()[:16]
+        print(f"Static assets: {len(self.files)} files, "
+              f"{len(self.immutable)} immutable, "
+              f"{len(self.variants)} precompressed")
+
+    def _best_variant(self, rel, accept_encoding):
+        qualities = {}
+        for part in (accept_encoding or '').split(','):
+            name, _, params = part.partition(';')
+            name = name.strip().lower()
+            if not name:
+                continue
+            q = 1.0
+            for param in params.split(';'):
+                key, _, value = param.partition('=')
+                if key.strip().lower() == 'q':
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            qualities[name] = q
+        for encoding, _ in ENCODINGS:
+            path = self.variants.get(rel, {}).get(encoding)
+            # "gzip;q=0" refuses gzip outright; "*" covers anything unlisted
+            if path and qualities.get(encoding, qualities.get('*', 0)) > 0:
+                return encoding, path
+        return None, self.files[rel]
+
+    def index_response(self, if_none_match):
+        if self.index_etag in if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(self.index_html, mimetype='text/html')
+        response.set_etag(self.index_etag)
+        # Always revalidate, so a deploy is picked up on the next load
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def response(self, path, request):
+        """Response for a GET of /<path>, or None when not built."""
+        if not self.built:
+            return None
+        if path in ('', 'index.html') or path not in self.files:
+            if path.startswith(ASSETS_PREFIX):
+                # A missing hashed chunk (stale tab after a deploy) must not
+                # get index.html served as JavaScript
+                return Response("Not found", status=404)
+            # Client-side routes all load the SPA shell
+            return self.index_response(request.if_none_match)
+
+        encoding, file_path = self._best_variant(
+            path, request.headers.get('Accept-Encoding'))
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        response = send_file(file_path, mimetype=mimetype, conditional=True,
+                             download_name=os.path.basename(path))
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if path in self.variants:
+            response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = (IMMUTABLE if path
+                                             in self.immutable else 'no-cache')
+        return response
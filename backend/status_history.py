@@ -0,0 +1,142 @@
+"""Bid status history and turnaround metrics.
+
+Every change to bids.status is logged by the triggers in
+0018_add_bid_status_history.sql into bid_status_history, which also keep
+bid_state_durations (time spent per bid in each status) current. Handlers
+that change a status call set_actor first so the log names the user.
+"""
+from datetime import datetime
+
+# group_by -> (label expression, joins)
+GROUPS = {
+    'team': ("COALESCE(NULLIF(b.team, ''), 'Unassigned')", ""),
+    'client': ("COALESCE(c.client_name, 'Unknown Client')",
+               "LEFT JOIN clients c ON c.id = b.client"),
+}
+
+# A bid's turnaround runs from creation to its first invoice
+TURNAROUND_STATUS = 'invoiced'
+
+
+# Largest value the trigger's ::integer cast accepts
+MAX_USER_ID = 2**31 - 1
+
+
+def set_actor(cur, user_id):
+    """Record user_id as the changer of any status set in this transaction.
+
+    Anything that is not a valid user id (a missing or malformed X-User-Id
+    header) records the change as by an unknown user rather than failing it.
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        user_id = None
+    if user_id is not None and not 0 < user_id <= MAX_USER_ID:
+        user_id = None
+    cur.execute("SELECT set_config('bidm.user_id', %s, true)",
+                ('' if user_id is None else str(user_id), ))
+
+
+def parse_since(value):
+    """The since filter as a datetime, or None when not given."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(
+            "since must be an ISO date or datetime, e.g. 2024-01-31")
+
+
+def days(value):
+    """A rounded day count from SQL as a float; NULL stays None."""
+    return float(value) if value is not None else None
+
+
+def _group(group_by):
+    if group_by not in GROUPS:
+        raise ValueError(
+            f"group_by must be one of: {', '.join(sorted(GROUPS))}")
+    return GROUPS[group_by]
+
+
+def avg_turnaround_days(cur):
+    """Mean days from creation to first invoice over all invoiced bids."""
+    cur.execute(
+        """
+        SELECT ROUND(AVG(EXTRACT(EPOCH FROM d.first_entered_at - b.created_at))
+                     / 86400, 1) as avg_days
+        FROM bid_state_durations d
+        JOIN bids b ON b.id = d.bid_id
+        WHERE d.status = %s
+    """, (TURNAROUND_STATUS, ))
+    row = cur.fetchone()
+    value = row['avg_days'] if isinstance(row, dict) else row[0]
+    return float(value) if value is not None else 0
+
+
+def turnaround_query(group_by, since=None):
+    """(sql, params) for turnaround per team or client."""
+    label, joins = _group(group_by)
+    where = ["d.status = %s"]
+    params = [TURNAROUND_STATUS]
+    if since:
+        where.append("d.first_entered_at >= %s")
+        params.append(since)
+    return f"""
+        SELECT
+            {label} as name,
+            COUNT(*) as bids,
+            ROUND(AVG(EXTRACT(EPOCH FROM d.first_entered_at - b.created_at)) / 86400, 1) as avg_days,
+            ROUND((PERCENTILE_CONT(0.5) WITHIN GROUP (
+                ORDER BY EXTRACT(EPOCH FROM d.first_entered_at - b.created_at)
+            ) / 86400)::numeric, 1) as median_days
+        FROM bid_state_durations d
+        JOIN bids b ON b.id = d.bid_id
+        {joins}
+        WHERE {' AND '.join(where)}
+        GROUP BY 1
+        ORDER BY 1
+    """, params
+
+
+def stage_durations_query(group_by, since=None):
+    """(sql, params) for the mean days spent per status, per team or client.
+
+    Only completed stays count, so a bid still in a status does not pull
+    that status's average down.
+    """
+    label, joins = _group(group_by)
+    where = ["d.left_at IS NOT NULL"]
+    params = []
+    if since:
+        where.append("d.first_entered_at >= %s")
+        params.append(since)
+    return f"""
+        SELECT
+            {label} as name,
+            d.status,
+            COUNT(*) as bids,
+            ROUND(AVG(d.seconds / d.visits) / 86400, 1) as avg_days
+        FROM bid_state_durations d
+        JOIN bids b ON b.id = d.bid_id
+        {joins}
+        WHERE {' AND '.join(where)}
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """, params
+
+
+def bid_history(cur, bid_id):
+    """Transitions of one bid, oldest first."""
+    cur.execute(
+        """
+        SELECT h.from_status, h.to_status, h.changed_at, h.changed_by,
+               u.name as changed_by_name, h.seconds_in_previous
+        FROM bid_status_history h
+        LEFT JOIN users u ON u.id = h.changed_by
+        WHERE h.bid_id = %s
+        ORDER BY h.changed_at, h.id
+    """, (bid_id, ))
+    return cur.fetchall()
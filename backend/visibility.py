@@ -0,0 +1,138 @@
+import argparse
+import os
+
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# First key of the per-bid pg_advisory_xact_lock taken by _refresh
+LOCK_NAMESPACE = 734_210_041
+
+# Who can see a bid, one row per (principal, bid, reason). Principals are
+# 'user:<users.id>' or 'team:<team>' with the team lower-cased and spaces
+# removed, the same normalisation get_bids always applied. Super admins see
+# every bid and have no rows.
+#
+#   grant   - a bid_access row for the user or the team
+#   creator - bids.created_by
+#   team    - the team of the bid's VM contact
+#
+# 0012_add_bid_visibility.sql backfilled the table with a copy of this
+# query. Migrations are not re-run, so after changing it add a migration
+# for any new rows or run `python visibility.py` to rebuild.
+VISIBILITY_SOURCE = """
+    SELECT 'user:' || ba.user_id as principal, ba.bid_id, 'grant' as reason
+    FROM bid_access ba
+    WHERE ba.user_id IS NOT NULL
+    UNION
+    SELECT 'team:' || LOWER(REPLACE(ba.team, ' ', '')), ba.bid_id, 'grant'
+    FROM bid_access ba
+    WHERE COALESCE(ba.team, '') <> ''
+    UNION
+    SELECT 'user:' || b.created_by, b.id, 'creator'
+    FROM bids b
+    WHERE b.created_by IS NOT NULL
+    UNION
+    SELECT 'team:' || LOWER(REPLACE(vm.team, ' ', '')), b.id, 'team'
+    FROM bids b
+    JOIN vendor_managers vm ON b.vm_contact = vm.id
+    WHERE COALESCE(vm.team, '') <> ''
+"""
+
+
+def principals(user_id, team):
+    """Visibility principals for the user/team in the request headers."""
+    result = []
+    if user_id:
+        result.append(f"user:{user_id}")
+    if team:
+        result.append(f"team:{team.replace(' ', '').lower()}")
+    return result
+
+
+def _refresh(cur, bid_filter, params):
+    # Concurrent grants, revokes or edits of one bid queue here; otherwise
+    # the second DELETE misses rows the first has inserted and its INSERT
+    # hits the primary key. Locks are taken in bid order to avoid deadlocks.
+    cur.execute(
+        f"""
+        SELECT pg_advisory_xact_lock(%s, id)
+        FROM bids
+        WHERE id {bid_filter}
+        ORDER BY id
+    """, (LOCK_NAMESPACE, ) + tuple(params))
+    cur.execute(f"DELETE FROM bid_visibility WHERE bid_id {bid_filter}",
+                params)
+    cur.execute(
+        f"""
+        INSERT INTO bid_visibility (principal, bid_id, reason)
+        SELECT principal, bid_id, reason
+        FROM ({VISIBILITY_SOURCE}) v
+        WHERE v.bid_id {bid_filter}
+        ON CONFLICT DO NOTHING
+    """, params)
+
+
+def refresh_bids(cur, bid_ids):
+    """Recompute the visibility rows of the given bids.
+
+    Called in the same transaction as the write that changed them, so the
+    list never sees a half-applied grant.
+    """
+    bid_ids = [int(b) for b in bid_ids if b is not None]
+    if bid_ids:
+        _refresh(cur, "= ANY(%s)", (bid_ids, ))
+
+
+def refresh_vm_bids(cur, vm_id):
+    """Recompute every bid whose VM contact is vm_id (its team changed)."""
+    _refresh(cur, "IN (SELECT id FROM bids WHERE vm_contact = %s)", (vm_id, ))
+
+
+def can_see(cur, bid_id, user_id, team):
+    cur.execute(
+        """
+        SELECT EXISTS (
+            SELECT 1 FROM bid_visibility
+            WHERE principal = ANY(%s) AND bid_id = %s
+        )
+    """, (principals(user_id, team), bid_id))
+    return cur.fetchone()[0]
+
+
+def rebuild(conn):
+    """Recompute the whole table from bid_access, bids and vendor_managers."""
+    cur = conn.cursor()
+    try:
+        cur.execute("LOCK TABLE bid_visibility IN EXCLUSIVE MODE")
+        cur.execute("DELETE FROM bid_visibility")
+        cur.execute(f"""
+            INSERT INTO bid_visibility (principal, bid_id, reason)
+            SELECT principal, bid_id, reason FROM ({VISIBILITY_SOURCE}) v
+        """)
+        rows = cur.rowcount
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild the bid visibility table from scratch")
+    parser.parse_args()
+
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        rows = rebuild(conn)
+    finally:
+        conn.close()
+    print(f"Rebuilt bid visibility: {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
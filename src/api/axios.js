@@ -38,6 +38,13 @@ instance.interceptors.request.use(
         console.error('Error parsing user data:', error);
       }
     }
+
+    // Keep reading from the primary database until our own writes reach
+    // the read replica
+    const primaryUntil = localStorage.getItem('primaryUntil');
+    if (primaryUntil && Number(primaryUntil) * 1000 > Date.now()) {
+      config.headers['X-Primary-Until'] = primaryUntil;
+    }
     return config;
   },
   (error) => {
@@ -47,7 +54,13 @@ instance.interceptors.request.use(
 
 // Add response interceptor for better error handling
 instance.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const primaryUntil = response.headers['x-primary-until'];
+    if (primaryUntil) {
+      localStorage.setItem('primaryUntil', primaryUntil);
+    }
+    return response;
+  },
   (error) => {
     if (error.code === 'ERR_NETWORK') {
       console.error('Network error - backend server may not be running');
@@ -0,0 +1,48 @@
+import axios from './axios';
+
+const STORAGE_KEY = 'referenceData';
+
+const readCached = () => {
+  try {
+    const cached = sessionStorage.getItem(STORAGE_KEY);
+    return cached ? JSON.parse(cached) : null;
+  } catch (error) {
+    console.error('Error reading cached reference data:', error);
+    return null;
+  }
+};
+
+// Turns a reference-data payload ({ version, unchanged, ...lists }) into
+// { version, sales, vms, clients, partners }, re-using and refreshing the
+// session copy. Also used for the reference block of the bid editor
+// bootstrap response.
+export const resolveReferenceData = (payload) => {
+  const cached = readCached();
+  if (payload.unchanged && cached) {
+    return cached;
+  }
+
+  const { version, sales, vms, clients, partners } = payload;
+  const fresh = { version, sales, vms, clients, partners };
+  try {
+    sessionStorage.setItem(STORAGE_KEY, JSON.stringify(fresh));
+  } catch (error) {
+    console.error('Error caching reference data:', error);
+  }
+  return fresh;
+};
+
+// Version of the session copy, to send as ?version= / ?reference_version=
+export const cachedReferenceVersion = () => readCached()?.version;
+
+// Returns { version, sales, vms, clients, partners }. The cached copy is
+// re-used whenever the backend reports the same version.
+export const getReferenceData = async () => {
+  const version = cachedReferenceVersion();
+  const response = await axios.get('/api/reference-data', {
+    params: version ? { version } : {},
+  });
+  return resolveReferenceData(response.data);
+};
+
+export default getReferenceData;
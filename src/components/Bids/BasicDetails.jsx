@@ -21,9 +21,14 @@ import {
   CircularProgress,
   FormControlLabel,
   Checkbox,
+  Autocomplete,
 } from "@mui/material";
 import { useNavigate, useLocation, useParams } from "react-router-dom";
 import axios from "../../api/axios";
+import {
+  cachedReferenceVersion,
+  resolveReferenceData,
+} from "../../api/referenceData";
 import "./Bids.css";
 import GlobeIcon from "@mui/icons-material/Public"; // Import globe icon
 import { useAuth } from "../../contexts/AuthContext";
@@ -46,7 +51,12 @@ function BasicDetails() {
   const [salesContacts, setSalesContacts] = useState([]);
   const [vmContacts, setVmContacts] = useState([]);
   const [clients, setClients] = useState([]);
+  // Partner picker: one page of server-side matches, plus the names of the
+  // partners already selected so their chips render without the directory
   const [partners, setPartners] = useState([]);
+  const [partnerNames, setPartnerNames] = useState({});
+  const [partnerQuery, setPartnerQuery] = useState("");
+  const [partnersInBidCountries, setPartnersInBidCountries] = useState(false);
   const [countries] = useState([
     "Afghanistan",
     "Albania",
@@ -376,79 +386,67 @@ function BasicDetails() {
           bidId,
         );
 
-        // Get next bid number first if it's a new bid
+        // Bid, next bid number and reference lists in one request
+        const version = cachedReferenceVersion();
+        const response = await axios.get(
+          isEditMode && bidId
+            ? `/api/bids/${bidId}/editor-bootstrap`
+            : "/api/bids/editor-bootstrap",
+          { params: version ? { reference_version: version } : {} },
+        );
+        const { bid: bidData, next_bid_number, reference } = response.data;
+
         if (!isEditMode) {
-          try {
-            const bidNumberResponse = await axios.get("/api/bids/next-number");
-            setFormData({
-              ...defaultFormData,
-              bid_number: bidNumberResponse.data.next_bid_number,
-            });
-          } catch (error) {
-            console.error("Error getting next bid number:", error);
-          }
+          setFormData({
+            ...defaultFormData,
+            bid_number: next_bid_number,
+          });
         }
 
-        if (isEditMode && bidId) {
-          console.log("Fetching bid data for ID:", bidId);
-          try {
-            const response = await axios.get(`/api/bids/${bidId}`);
-            const bidData = response.data;
+        if (bidData) {
+          console.log("Received bid data:", bidData);
 
-            console.log("Received bid data:", bidData);
-            console.log("Partners from API:", bidData.partners);
+          // Convert partners and loi to arrays if they're not already
+          // Extract just the IDs from the partners array
+          const partnersArray = bidData.partners
+            ? Array.isArray(bidData.partners)
+              ? bidData.partners.map((p) => p.id || p)
+              : [bidData.partners.id || bidData.partners]
+            : [];
+          const loiArray = bidData.loi
+            ? Array.isArray(bidData.loi)
+              ? bidData.loi
+              : [bidData.loi]
+            : [];
 
-            // Convert partners and loi to arrays if they're not already
-            // Extract just the IDs from the partners array
-            const partnersArray = bidData.partners
-              ? Array.isArray(bidData.partners)
-                ? bidData.partners.map((p) => p.id || p)
-                : [bidData.partners.id || bidData.partners]
-              : [];
-            const loiArray = bidData.loi
-              ? Array.isArray(bidData.loi)
-                ? bidData.loi
-                : [bidData.loi]
-              : [];
+          setFormData((prevData) => ({
+            ...prevData,
+            ...bidData,
+            partners: partnersArray,
+            loi: loiArray,
+            countries: Array.isArray(bidData.countries)
+              ? bidData.countries
+              : [],
+          }));
 
-            console.log("Processed partners array:", partnersArray);
-
-            setFormData((prevData) => ({
-              ...prevData,
-              ...bidData,
-              partners: partnersArray,
-              loi: loiArray,
-              countries: Array.isArray(bidData.countries)
-                ? bidData.countries
-                : [],
-            }));
-
-            // Set selected partners and LOIs
-            setSelectedPartners(partnersArray);
-            setSelectedLOIs(loiArray);
-          } catch (error) {
-            console.error("Error fetching bid data:", error);
+          // Set selected partners and LOIs
+          setSelectedPartners(partnersArray);
+          if (Array.isArray(bidData.partners)) {
+            setPartnerNames((prev) => {
+              const names = { ...prev };
+              bidData.partners.forEach((p) => {
+                if (p && p.id) names[p.id] = p.partner_name;
+              });
+              return names;
+            });
           }
+          setSelectedLOIs(loiArray);
         }
 
-        // Load reference data
-        try {
-          const [salesRes, vmRes, clientsRes, partnersRes] = await Promise.all([
-            axios.get("/api/sales"),
-            axios.get("/api/vms"),
-            axios.get("/api/clients"),
-            axios.get("/api/partners"),
-          ]);
-
-          console.log("Available partners from API:", partnersRes.data);
-
-          setSalesContacts(salesRes.data);
-          setVmContacts(vmRes.data);
-          setClients(clientsRes.data);
-          setPartners(partnersRes.data);
-        } catch (error) {
-          console.error("Error loading reference data:", error);
-        }
+        const referenceData = resolveReferenceData(reference);
+        setSalesContacts(referenceData.sales);
+        setVmContacts(referenceData.vms);
+        setClients(referenceData.clients);
       } catch (error) {
         console.error("Error in loadInitialData:", error);
       } finally {
@@ -537,6 +535,35 @@ function BasicDetails() {
     }));
   };
 
+  useEffect(() => {
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const params = { name: partnerQuery.trim(), page_size: 50 };
+        if (partnersInBidCountries && formData.countries.length > 0) {
+          params.countries = formData.countries.join(",");
+        }
+        const response = await axios.get("/api/partners/search", { params });
+        if (cancelled) return;
+        const found = response.data.partners || [];
+        setPartners(found);
+        setPartnerNames((prev) => {
+          const names = { ...prev };
+          found.forEach((p) => {
+            names[p.id] = p.partner_name;
+          });
+          return names;
+        });
+      } catch (error) {
+        console.error("Error searching partners:", error);
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [partnerQuery, partnersInBidCountries, formData.countries]);
+
   // Keep both distribution change handlers
   const handlePartnerLOIChange = (type, value) => {
     // Ensure value is always an array
@@ -887,31 +914,45 @@ function BasicDetails() {
                 value={formData.project_requirement}
                 onChange={handleInputChange}
               />
-              <FormControl fullWidth>
-                <InputLabel>Partners</InputLabel>
-                <Select
-                  multiple
-                  value={selectedPartners || []}
-                  onChange={(e) =>
-                    handlePartnerLOIChange("partners", e.target.value)
-                  }
-                  renderValue={(selected) => {
-                    // Find partner names for selected IDs
-                    const selectedNames = selected
-                      .map(
-                        (id) => partners.find((p) => p.id === id)?.partner_name,
-                      )
-                      .filter(Boolean);
-                    return selectedNames.join(", ");
-                  }}
-                >
-                  {partners.map((partner) => (
-                    <MenuItem key={partner.id} value={partner.id}>
-                      {partner.partner_name}
-                    </MenuItem>
-                  ))}
-                </Select>
-              </FormControl>
+              <Autocomplete
+                multiple
+                options={partners}
+                filterOptions={(options) => options}
+                getOptionLabel={(option) => option.partner_name || ""}
+                isOptionEqualToValue={(option, value) => option.id === value.id}
+                value={(selectedPartners || []).map((id) => ({
+                  id,
+                  partner_name: partnerNames[id] || String(id),
+                }))}
+                onChange={(e, newValue) =>
+                  handlePartnerLOIChange(
+                    "partners",
+                    newValue.map((p) => p.id),
+                  )
+                }
+                onInputChange={(e, newInput, reason) => {
+                  if (reason !== "reset") setPartnerQuery(newInput);
+                }}
+                disableCloseOnSelect
+                renderInput={(params) => (
+                  <TextField
+                    {...params}
+                    label="Partners"
+                    placeholder="Type a partner name"
+                  />
+                )}
+              />
+              <FormControlLabel
+                control={
+                  <Checkbox
+                    checked={partnersInBidCountries}
+                    onChange={(e) =>
+                      setPartnersInBidCountries(e.target.checked)
+                    }
+                  />
+                }
+                label="Only partners covering the selected countries"
+              />
               <FormControl fullWidth>
                 <InputLabel>LOI (mins)</InputLabel>
                 <Select
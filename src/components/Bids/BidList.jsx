@@ -51,6 +51,7 @@ function BidList() {
   const { user: currentUser } = useAuth();
   const [bids, setBids] = useState([]);
   const [searchTerm, setSearchTerm] = useState('');
+  const [debouncedSearch, setDebouncedSearch] = useState('');
   const [loading, setLoading] = useState(true);
   const navigate = useNavigate();
   const [poDialogOpen, setPoDialogOpen] = useState(false);
@@ -92,46 +93,30 @@ function BidList() {
     console.log('Current user team (normalized):', normalizeTeam(currentUser?.team));
   }, [currentUser]);
 
+  // Wait for a pause in typing before asking the server
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedSearch(searchTerm), 250);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
   useEffect(() => {
     fetchBids();
     // eslint-disable-next-line
-  }, [page, pageSize, searchTerm]);
+  }, [page, pageSize, debouncedSearch]);
 
-  // NEW: Check per-bid access for non-admin/non-owner
+  // Access comes back with each bid from the visibility table
   useEffect(() => {
-    const checkAccessForBids = async () => {
-      if (!currentUser || !bids.length) return;
-      const isAdmin = currentUser?.role === 'admin';
-      const isKamal = currentUser?.name && currentUser.name.trim().toLowerCase().includes('kamal vallecha');
-      const normalizedUserTeam = normalizeTeam(currentUser?.team);
-      const accessResults = {};
-      await Promise.all(
-        bids.map(async (bid) => {
-          const normalizedBidTeam = normalizeTeam(bid.team);
-          const isOwnTeam = normalizedUserTeam === normalizedBidTeam;
-          if (isAdmin || isKamal || isOwnTeam) {
-            accessResults[bid.id] = true;
-          } else {
-            try {
-              const res = await axios.get(`/api/bids/${bid.id}/access`, {
-                params: { user_id: currentUser.id, team: currentUser.team }
-              });
-              accessResults[bid.id] = res.data.has_access;
-            } catch {
-              accessResults[bid.id] = false;
-            }
-          }
-        })
-      );
-      setBidAccessMap(accessResults);
-    };
-    checkAccessForBids();
-  }, [bids, currentUser]);
+    const accessResults = {};
+    bids.forEach((bid) => {
+      accessResults[bid.id] = !!bid.has_access;
+    });
+    setBidAccessMap(accessResults);
+  }, [bids]);
 
   const fetchBids = async () => {
     try {
       setLoading(true);
-      const response = await axios.get(`/api/bids?page=${page}&page_size=${pageSize}&search=${encodeURIComponent(searchTerm)}`, {
+      const response = await axios.get(`/api/bids?page=${page}&page_size=${pageSize}&search=${encodeURIComponent(debouncedSearch)}`, {
         headers: {
           'X-User-Id': currentUser?.id,
           'X-User-Team': currentUser?.team,
@@ -8,6 +8,7 @@ import {
   TableContainer,
   TableHead,
   TableRow,
+  TablePagination,
   Button,
   Typography,
   TextField,
@@ -23,7 +24,7 @@ import EditIcon from '@mui/icons-material/Edit';
 import ReplayIcon from '@mui/icons-material/Replay';
 import ReceiptIcon from '@mui/icons-material/Receipt';
 import './Bids.css';
-import axios from 'axios';
+import axios from '../../api/axios';
 import { useAuth } from '../../contexts/AuthContext';
 
 function Closure() {
@@ -34,20 +35,33 @@ function Closure() {
   const [searchTerm, setSearchTerm] = useState('');
   const [startDate, setStartDate] = useState('');
   const [endDate, setEndDate] = useState('');
+  const [page, setPage] = useState(0);
+  const [rowsPerPage, setRowsPerPage] = useState(20);
+  const [total, setTotal] = useState(0);
   const { user } = useAuth();
   const canEdit = user?.role === 'admin' || user?.permissions?.can_edit_closure;
 
   useEffect(() => {
-    fetchClosureBids();
-  }, []);
+    const timer = setTimeout(fetchClosureBids, 300);
+    return () => clearTimeout(timer);
+  }, [page, rowsPerPage, searchTerm]);
 
   const fetchClosureBids = async () => {
     try {
       setLoading(true);
       console.log('Fetching closure bids...');
-      const response = await axios.get('/api/bids/closure');
+      const response = await axios.get('/api/queues/closure', {
+        params: {
+          page: page + 1,
+          page_size: rowsPerPage,
+          search: searchTerm || undefined,
+          date_from: startDate || undefined,
+          date_to: endDate || undefined
+        }
+      });
       console.log('Closure bids response:', response.data);
-      setBids(response.data || []);
+      setBids(response.data.bids || []);
+      setTotal(response.data.total || 0);
     } catch (error) {
       console.error('Error fetching closure bids:', error);
       setError('Failed to fetch closure bids');
@@ -114,7 +128,10 @@ function Closure() {
           size="small"
           placeholder="Search bids..."
           value={searchTerm}
-          onChange={(e) => setSearchTerm(e.target.value)}
+          onChange={(e) => {
+            setSearchTerm(e.target.value);
+            setPage(0);
+          }}
           sx={{ width: 200 }}
         />
       </Box>
@@ -203,6 +220,18 @@ function Closure() {
             )}
           </TableBody>
         </Table>
+        <TablePagination
+          component="div"
+          count={total}
+          page={page}
+          onPageChange={(e, newPage) => setPage(newPage)}
+          rowsPerPage={rowsPerPage}
+          onRowsPerPageChange={(e) => {
+            setRowsPerPage(parseInt(e.target.value, 10));
+            setPage(0);
+          }}
+          rowsPerPageOptions={[10, 20, 50, 100]}
+        />
       </TableContainer>
     </div>
   );
@@ -18,7 +18,8 @@ import {
   InputLabel,
   Box,
   Button,
-  Stack
+  Stack,
+  Alert
 } from '@mui/material';
 import axios from '../../api/axios';
 import './Bids.css';
@@ -34,6 +35,7 @@ function FieldAllocation() {
   const [selectedLOI, setSelectedLOI] = useState('');
   const [loiOptions, setLoiOptions] = useState([]);
   const [tempAllocations, setTempAllocations] = useState({}); // Store temporary changes
+  const [saveErrors, setSaveErrors] = useState([]); // Cells the last submit could not apply
 
   useEffect(() => {
     fetchData();
@@ -54,37 +56,15 @@ function FieldAllocation() {
 
       setPartners(response.data.partners);
       
-      // Ensure audiences are unique by ID
-      const uniqueAudiences = response.data.audiences.reduce((acc, curr) => {
-        if (!acc.find(a => a.id === curr.id)) {
-          // Ensure countries are unique within each audience
-          curr.countries = curr.countries.filter((country, index, self) =>
-            index === self.findIndex(c => c.country === country.country)
-          );
-          acc.push(curr);
-        }
-        return acc;
-      }, []);
-      
-      setAudiences(uniqueAudiences);
+      setAudiences(response.data.audiences);
       
       if (response.data.loi_options && response.data.loi_options.length > 0) {
         setSelectedLOI(response.data.loi_options[0].loi);
         setLoiOptions(response.data.loi_options);
       }
 
-      // Format responses with deduplication
-      const formattedResponses = {};
-      if (response.data.responses) {
-        response.data.responses.forEach(resp => {
-          const key = `${resp.partner_id}-${resp.audience_id}-${resp.country}-${resp.loi}`;
-          // Only update if the key doesn't exist or if the existing allocation is less than the new one
-          if (!formattedResponses[key] || formattedResponses[key].allocation < resp.allocation) {
-            formattedResponses[key] = resp;
-          }
-        });
-      }
-      setResponses(formattedResponses);
+      // Responses arrive keyed by partner-audience-country-loi
+      setResponses(response.data.responses || {});
 
       setLoading(false);
     } catch (error) {
@@ -116,19 +96,85 @@ function FieldAllocation() {
     }));
   };
 
+  const partnerName = (partnerId) =>
+    partners.find(p => String(p.id) === String(partnerId))?.partner_name || `Partner ${partnerId}`;
+
+  const audienceName = (audienceId) => {
+    const audience = audiences.find(a => String(a.id) === String(audienceId));
+    return audience ? `${audience.ta_category} - ${audience.broader_category}` : `Audience ${audienceId}`;
+  };
+
+  const CELL_ERRORS = {
+    not_found: 'no partner response recorded for this cell',
+    invalid: 'invalid value',
+    duplicate: 'sent twice, only the later value was kept'
+  };
+
   const handleSubmit = async () => {
     try {
-      // Submit all allocation changes
-      const promises = Object.values(tempAllocations).map(allocation =>
-        axios.post(`/api/bids/${bidId}/field-allocations`, allocation)
-      );
+      // Submit all allocation changes in one request; strict rolls the whole
+      // save back if any audience/country would be allocated over its sample
+      const response = await axios.post(`/api/bids/${bidId}/field-allocations/bulk`, {
+        allocations: Object.values(tempAllocations),
+        strict: true
+      });
 
-      await Promise.all(promises);
+      const failed = response.data.cells.filter(cell => cell.status !== 'updated');
+      if (failed.length > 0) {
+        // Keep only the unapplied cells as pending changes and stay here
+        const pending = {};
+        failed.forEach(cell => {
+          const key = `${cell.partner_id}-${cell.audience_id}-${cell.country}-${cell.loi}`;
+          if (tempAllocations[key]) pending[key] = tempAllocations[key];
+        });
+        setTempAllocations(pending);
+        setSaveErrors(failed.map(cell =>
+          `${partnerName(cell.partner_id)}, ${audienceName(cell.audience_id)}, ${cell.country}, LOI ${cell.loi}: ` +
+          (cell.error || CELL_ERRORS[cell.status] || cell.status)
+        ));
+        return;
+      }
+      setSaveErrors([]);
       alert('Allocations saved successfully!');
       navigate('/infield'); // Navigate back to InField page
     } catch (error) {
       console.error('Error saving allocations:', error);
-      alert('Failed to save allocations');
+      const over = (error.response?.data?.totals || []).filter(total => total.status === 'over');
+      if (over.length > 0) {
+        setSaveErrors(over.map(total =>
+          `${audienceName(total.audience_id)}, ${total.country}, LOI ${total.loi}: ` +
+          `${total.allocated} allocated, ${total.required} required. Nothing was saved.`
+        ));
+      } else {
+        setSaveErrors([error.response?.data?.error || 'Failed to save allocations']);
+      }
+    }
+  };
+
+  const handleSuggest = async () => {
+    try {
+      const response = await axios.post(`/api/bids/${bidId}/field-allocations/solve`, {
+        loi: selectedLOI
+      });
+      const draft = response.data.allocations;
+
+      // Load the draft as unsaved changes so the PM can adjust before submitting
+      setTempAllocations(prev => ({ ...prev, ...draft }));
+      setResponses(prev => {
+        const updated = { ...prev };
+        Object.entries(draft).forEach(([key, cell]) => {
+          updated[key] = { ...updated[key], allocation: cell.allocation };
+        });
+        return updated;
+      });
+
+      const short = response.data.groups.filter(group => group.shortfall > 0);
+      if (short.length > 0) {
+        alert(`Commitments do not cover the required sample for ${short.length} audience/country combination(s).`);
+      }
+    } catch (error) {
+      console.error('Error suggesting allocations:', error);
+      alert('Failed to suggest allocations');
     }
   };
 
@@ -233,8 +279,25 @@ function FieldAllocation() {
           </div>
         ))}
 
+        {saveErrors.length > 0 && (
+          <Alert severity="error" sx={{ mt: 3 }} onClose={() => setSaveErrors([])}>
+            Some allocations were not saved:
+            <ul style={{ margin: 0 }}>
+              {saveErrors.map((message) => (
+                <li key={message}>{message}</li>
+              ))}
+            </ul>
+          </Alert>
+        )}
+
         {/* Add buttons at the bottom */}
         <Box sx={{ mt: 3, display: 'flex', justifyContent: 'flex-end', gap: 2 }}>
+          <Button 
+            variant="outlined" 
+            onClick={handleSuggest}
+          >
+            Suggest Allocation
+          </Button>
           <Button 
             variant="outlined" 
             color="secondary" 
@@ -8,6 +8,7 @@ import {
   TableContainer,
   TableHead,
   TableRow,
+  TablePagination,
   IconButton,
   Typography,
   TextField,
@@ -27,19 +28,26 @@ function InField() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
+  const [page, setPage] = useState(0);
+  const [rowsPerPage, setRowsPerPage] = useState(20);
+  const [total, setTotal] = useState(0);
   const { user } = useAuth();
   const canEdit = user?.role === 'admin' || user?.permissions?.can_edit_infield;
 
   useEffect(() => {
-    fetchInFieldBids();
-  }, []);
+    const timer = setTimeout(fetchInFieldBids, 300);
+    return () => clearTimeout(timer);
+  }, [page, rowsPerPage, searchTerm]);
 
   const fetchInFieldBids = async () => {
     try {
       setLoading(true);
       setError(null);
-      const response = await axios.get('/api/bids/infield');
-      setBids(response.data);
+      const response = await axios.get('/api/queues/infield', {
+        params: { page: page + 1, page_size: rowsPerPage, search: searchTerm || undefined }
+      });
+      setBids(response.data.bids);
+      setTotal(response.data.total);
       setLoading(false);
     } catch (error) {
       console.error('Error fetching infield bids:', error);
@@ -71,16 +79,6 @@ function InField() {
     }
   };
 
-  const filteredBids = bids.filter(bid =>
-    Object.values(bid).some(value =>
-      value?.toString().toLowerCase().includes(searchTerm.toLowerCase())
-    )
-  );
-
-  if (loading) {
-    return <div>Loading...</div>;
-  }
-
   return (
     <div className="bids-container">
       <div className="bids-header">
@@ -89,7 +87,10 @@ function InField() {
           size="small"
           placeholder="Search bids..."
           value={searchTerm}
-          onChange={(e) => setSearchTerm(e.target.value)}
+          onChange={(e) => {
+            setSearchTerm(e.target.value);
+            setPage(0);
+          }}
         />
       </div>
 
@@ -115,7 +116,12 @@ function InField() {
             </TableRow>
           </TableHead>
           <TableBody>
-            {filteredBids.map((bid) => (
+            {loading && (
+              <TableRow>
+                <TableCell colSpan={9} align="center">Loading...</TableCell>
+              </TableRow>
+            )}
+            {!loading && bids.map((bid) => (
               <TableRow key={bid.id}>
                 <TableCell>{bid.po_number}</TableCell>
                 <TableCell>{bid.bid_number}</TableCell>
@@ -152,6 +158,18 @@ function InField() {
             ))}
           </TableBody>
         </Table>
+        <TablePagination
+          component="div"
+          count={total}
+          page={page}
+          onPageChange={(e, newPage) => setPage(newPage)}
+          rowsPerPage={rowsPerPage}
+          onRowsPerPageChange={(e) => {
+            setRowsPerPage(parseInt(e.target.value, 10));
+            setPage(0);
+          }}
+          rowsPerPageOptions={[10, 20, 50, 100]}
+        />
       </TableContainer>
     </div>
   );
@@ -9,6 +9,7 @@ import {
   TableContainer,
   TableHead,
   TableRow,
+  TablePagination,
   Paper,
   IconButton,
   Stack,
@@ -23,21 +24,32 @@ import EditIcon from "@mui/icons-material/Edit";
 import KeyboardReturnIcon from "@mui/icons-material/KeyboardReturn";
 import SwapHorizIcon from "@mui/icons-material/SwapHoriz";
 import { useNavigate } from "react-router-dom";
-import axios from "axios";
+import axios from "../../api/axios";
 
 const ReadyForInvoiceBids = () => {
   const navigate = useNavigate();
   const [bids, setBids] = useState([]);
   const [searchTerm, setSearchTerm] = useState("");
+  const [page, setPage] = useState(0);
+  const [rowsPerPage, setRowsPerPage] = useState(20);
+  const [total, setTotal] = useState(0);
 
   useEffect(() => {
-    fetchBids();
-  }, []);
+    const timer = setTimeout(fetchBids, 300);
+    return () => clearTimeout(timer);
+  }, [page, rowsPerPage, searchTerm]);
 
   const fetchBids = async () => {
     try {
-      const response = await axios.get("/api/bids/ready-for-invoice");
-      setBids(response.data);
+      const response = await axios.get("/api/queues/invoice", {
+        params: {
+          page: page + 1,
+          page_size: rowsPerPage,
+          search: searchTerm || undefined,
+        },
+      });
+      setBids(response.data.bids);
+      setTotal(response.data.total);
     } catch (error) {
       console.error("Error fetching bids:", error);
     }
@@ -95,13 +107,6 @@ const ReadyForInvoiceBids = () => {
     }
   };
 
-  const filteredBids = bids.filter(
-    (bid) =>
-      bid.bid_number.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      bid.study_name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      bid.client_name.toLowerCase().includes(searchTerm.toLowerCase()),
-  );
-
   return (
     <Box>
       <Typography variant="h5" gutterBottom>
@@ -112,7 +117,10 @@ const ReadyForInvoiceBids = () => {
         variant="outlined"
         placeholder="Search bids..."
         value={searchTerm}
-        onChange={(e) => setSearchTerm(e.target.value)}
+        onChange={(e) => {
+          setSearchTerm(e.target.value);
+          setPage(0);
+        }}
         sx={{ 
           mb: 2,
           width: '300px',
@@ -141,7 +149,7 @@ const ReadyForInvoiceBids = () => {
             </TableRow>
           </TableHead>
           <TableBody>
-            {filteredBids.map((bid) => (
+            {bids.map((bid) => (
               <TableRow key={bid.bid_number}>
                 <TableCell>{bid.po_number}</TableCell>
                 <TableCell>{bid.bid_number}</TableCell>
@@ -190,6 +198,18 @@ const ReadyForInvoiceBids = () => {
             ))}
           </TableBody>
         </Table>
+        <TablePagination
+          component="div"
+          count={total}
+          page={page}
+          onPageChange={(e, newPage) => setPage(newPage)}
+          rowsPerPage={rowsPerPage}
+          onRowsPerPageChange={(e) => {
+            setRowsPerPage(parseInt(e.target.value, 10));
+            setPage(0);
+          }}
+          rowsPerPageOptions={[10, 20, 50, 100]}
+        />
       </TableContainer>
     </Box>
   );
@@ -151,17 +151,15 @@ const InvoiceEdit = () => {
       const response = await axios.get(`/api/invoice/${bidId}/partner-data`);
       const data = response.data;
 
-      // Extract unique partners and LOIs from partner_data keys
+      // Extract unique partners and LOIs from the partner_data entries
       const uniquePartners = [
         ...new Set(
-          Object.keys(data.partner_data).map((key) => key.split("_")[0]),
+          Object.values(data.partner_data).map((pd) => pd.partner_name),
         ),
       ];
       const uniqueLois = [
         ...new Set(
-          Object.keys(data.partner_data).map((key) =>
-            parseInt(key.split("_")[1]),
-          ),
+          Object.values(data.partner_data).map((pd) => parseInt(pd.loi)),
         ),
       ].sort((a, b) => a - b);
       const uniqueAudiences = [
@@ -178,8 +176,8 @@ const InvoiceEdit = () => {
 
       // Store invoice details for each partner-LOI combination
       const partnerDetails = {};
-      Object.entries(data.partner_data).forEach(([key, value]) => {
-        partnerDetails[key] = {
+      Object.values(data.partner_data).forEach((value) => {
+        partnerDetails[`${value.partner_name}_${value.loi}`] = {
           poNumber: data.po_number || "",
           invoiceDate: value.invoice_date || "",
           invoiceSent: value.invoice_sent || "",
@@ -26,7 +26,9 @@ const ProposalForm = () => {
   const navigate = useNavigate();
   const { user: currentUser } = useAuth();
   const [loading, setLoading] = useState(false);
-  const [bids, setBids] = useState([]);
+  const [bidOptions, setBidOptions] = useState([]);
+  const [bidQuery, setBidQuery] = useState('');
+  const [selectedBid, setSelectedBid] = useState(null);
   const [selectedBidId, setSelectedBidId] = useState('');
   const [bidDetails, setBidDetails] = useState(null);
   const [partnerResponses, setPartnerResponses] = useState(null);
@@ -43,40 +45,46 @@ const ProposalForm = () => {
   const [loadedProposalData, setLoadedProposalData] = useState(null);
 
   useEffect(() => {
-    const fetchBidsAndProposals = async () => {
+    const fetchProposals = async () => {
       try {
-        const [bidsRes, proposalsRes] = await Promise.all([
-          axios.get('/api/bids', {
-            headers: {
-              'X-User-Id': currentUser?.id,
-              'X-User-Team': currentUser?.team,
-              'X-User-Role': currentUser?.role,
-              'X-User-Name': currentUser?.name,
-            }
-          }),
-          axios.get('/api/proposals')
-        ]);
-        setBids(bidsRes.data.bids || []);
-        setProposals(proposalsRes.data);
-        // Debug logs after fetching
-        console.log('DEBUG fetched bids:', bidsRes.data.bids);
-        console.log('DEBUG fetched proposals:', proposalsRes.data);
+        const proposalsRes = await axios.get('/api/proposals');
+        setProposals(proposalsRes.data.proposals || []);
       } catch (error) {
-        console.error('Error fetching bids or proposals:', error);
+        console.error('Error fetching proposals:', error);
       }
     };
-    fetchBidsAndProposals();
+    fetchProposals();
   }, [currentUser]);
 
-  // Show all bids in the dropdown, regardless of proposals
-  const safeBids = Array.isArray(bids) ? bids : [];
-  const availableBids = safeBids;
-  // When editing, always show the current bid
-  const dropdownBids = (!proposalId || proposalId === 'new') ? availableBids : safeBids.filter(bid => Number(bid.id) === Number(selectedBidId));
-
-  // Debug logs for dropdown logic
-  console.log('DEBUG availableBids:', availableBids);
-  console.log('DEBUG dropdownBids:', dropdownBids);
+  // Typeahead: ask the server for the best matches instead of loading every bid
+  useEffect(() => {
+    const term = bidQuery.trim();
+    if (!term) {
+      setBidOptions([]);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const res = await axios.get('/api/bids/search', {
+          params: { q: term },
+          headers: {
+            'X-User-Id': currentUser?.id,
+            'X-User-Team': currentUser?.team,
+            'X-User-Role': currentUser?.role,
+            'X-User-Name': currentUser?.name,
+          }
+        });
+        if (!cancelled) setBidOptions(res.data.bids || []);
+      } catch (error) {
+        console.error('Error searching bids:', error);
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [bidQuery, currentUser]);
 
   // If editing, ensure we can't change the bid
   useEffect(() => {
@@ -216,51 +224,6 @@ const ProposalForm = () => {
     }
   }, [selectedBidId, proposalId]);
 
-  // Helper to get partner response for a given audience, country, partner
-  const getPartnerResponse = (audienceId, country, partnerId) => {
-    if (!partnerResponses || !partnerResponses.responses) return {};
-    // Find the key where partner_id matches (convert to number for robust match)
-    const partnerKey = Object.keys(partnerResponses.responses).find(
-      key => {
-        const resp = partnerResponses.responses[key];
-        return resp?.partner_id == partnerId; // loose equality to match string/number
-      }
-    );
-    if (!partnerKey) return {};
-    return (
-      partnerResponses.responses[partnerKey]?.audiences?.[audienceId]?.[country] || {}
-    );
-  };
-
-  // Update all allocations' salesPrice and revenue when margin or CPI changes
-  useEffect(() => {
-    if (!bidDetails || !partnerResponses) return;
-    setAllocations((prev) => {
-      const updated = { ...prev };
-      Object.keys(updated).forEach((audId) => {
-        Object.keys(updated[audId]).forEach((country) => {
-          Object.keys(updated[audId][country]).forEach((partnerId) => {
-            const alloc = updated[audId][country][partnerId];
-            const resp = getPartnerResponse(audId, country, partnerId);
-            const cpi = parseFloat(resp.cpi) || 0;
-            const allocation = parseFloat(alloc.allocation) || 0;
-            const salesPrice = (cpi * (1 + marginPercentage / 100)).toFixed(2);
-            updated[audId][country][partnerId] = {
-              ...alloc,
-              cpi: resp.cpi || '',
-              timeline: resp.timeline || '',
-              salesPrice: salesPrice,
-              cost: (allocation * cpi).toFixed(2),
-              revenue: (allocation * salesPrice).toFixed(2),
-              commitment: resp.commitment || '',
-            };
-          });
-        });
-      });
-      return updated;
-    });
-  }, [marginPercentage, partnerResponses]);
-
   const handleChange = (e) => {
     const { name, value } = e.target;
     setFormData(prev => ({
@@ -318,12 +281,6 @@ const ProposalForm = () => {
         ...updated[audienceId][country][partnerId],
         [field]: value
       };
-      // Live calculate cost/revenue if allocation and cpi/salesPrice are present
-      const alloc = parseFloat(updated[audienceId][country][partnerId].allocation) || 0;
-      const cpi = parseFloat(updated[audienceId][country][partnerId].cpi) || 0;
-      const sales = parseFloat(updated[audienceId][country][partnerId].salesPrice) || 0;
-      updated[audienceId][country][partnerId].cost = (alloc * cpi).toFixed(2);
-      updated[audienceId][country][partnerId].revenue = (alloc * sales).toFixed(2);
       return updated;
     });
   };
@@ -371,7 +328,7 @@ const ProposalForm = () => {
             studyName: bidDetails?.study_name || '',
             clientName: bidDetails?.client_name || '',
             methodology: bidDetails?.methodology || '',
-            bidNumber: bids.find(b => b.id === selectedBidId)?.bid_number || ''
+            bidNumber: bidDetails?.bid_number || ''
           },
           marginPercentage
         }
@@ -390,54 +347,50 @@ const ProposalForm = () => {
   };
 
   // --- Summary Calculations ---
-  console.log('DEBUG allocations:', allocations);
-  const summary = React.useMemo(() => {
-    let totalCost = 0;
-    let totalRevenue = 0;
-    let totalCompletes = 0;
-    let partnersUsedSet = new Set();
-    const summedAllocations = [];
-    Object.keys(allocations).forEach(audId => {
-      Object.keys(allocations[audId]).forEach(country => {
-        Object.keys(allocations[audId][country]).forEach(partnerId => {
-          // Ensure all keys are strings
-          const sAudId = String(audId);
-          const sCountry = String(country);
-          const sPartnerId = String(partnerId);
-          const alloc = allocations[sAudId][sCountry][sPartnerId];
-          if (alloc.selected) {
-            // Recalculate cost and revenue live
-            const allocation = parseFloat(alloc.allocation) || 0;
-            // Get latest CPI from partnerResponses
-            const resp = getPartnerResponse(sAudId, sCountry, sPartnerId);
-            console.log('DEBUG summary getPartnerResponse:', {audId: sAudId, country: sCountry, partnerId: sPartnerId, resp});
-            const cpi = parseFloat(resp.cpi) || 0;
-            const salesPrice = cpi * (1 + marginPercentage / 100);
-            const cost = allocation * cpi;
-            const revenue = allocation * salesPrice;
-            totalCost += cost;
-            totalRevenue += revenue;
-            totalCompletes += allocation;
-            partnersUsedSet.add(sPartnerId);
-            summedAllocations.push({audId: sAudId, country: sCountry, partnerId: sPartnerId, allocation, cpi, cost, revenue});
-          }
+  // Costed on the server so large proposals don't block the browser. The
+  // per-line figures come from the same response, keyed
+  // `${audienceId}|${country}|${partnerId}`, so the grid always agrees with
+  // the summary; rates holds the quote shown on unselected rows.
+  const [lines, setLines] = useState({});
+  const [rates, setRates] = useState({});
+  const [summary, setSummary] = useState({
+    totalCost: '0.00',
+    totalRevenue: '0.00',
+    totalMargin: '0.00',
+    effectiveMargin: '0.00',
+    totalCompletes: '0',
+    partnersUsed: 0,
+    avgCPI: '0.00'
+  });
+  useEffect(() => {
+    if (!selectedBidId) return;
+    const timer = setTimeout(async () => {
+      try {
+        const res = await axios.post(`/api/bids/${selectedBidId}/proposal-costing`, {
+          allocations,
+          margin_percentage: marginPercentage
         });
-      });
-    });
-    console.log('DEBUG summedAllocations:', summedAllocations);
-    const totalMargin = totalRevenue - totalCost;
-    const effectiveMargin = totalRevenue > 0 ? (totalMargin / totalRevenue) * 100 : 0;
-    const avgCPI = totalCompletes > 0 ? totalCost / totalCompletes : 0;
-    return {
-      totalCost: totalCost.toFixed(2),
-      totalRevenue: totalRevenue.toFixed(2),
-      totalMargin: totalMargin.toFixed(2),
-      effectiveMargin: effectiveMargin.toFixed(2),
-      totalCompletes: totalCompletes.toFixed(0),
-      partnersUsed: partnersUsedSet.size,
-      avgCPI: avgCPI.toFixed(2)
-    };
-  }, [allocations, partnerResponses, marginPercentage]);
+        const byCell = (rows) => Object.fromEntries(
+          rows.map(row => [`${row.audience_id}|${row.country}|${row.partner_id}`, row])
+        );
+        setLines(byCell(res.data.lines));
+        setRates(byCell(res.data.rates));
+        const costed = res.data.summary;
+        setSummary({
+          totalCost: costed.totalCost.toFixed(2),
+          totalRevenue: costed.totalRevenue.toFixed(2),
+          totalMargin: costed.totalMargin.toFixed(2),
+          effectiveMargin: costed.effectiveMargin.toFixed(2),
+          totalCompletes: costed.totalCompletes.toFixed(0),
+          partnersUsed: costed.partnersUsed,
+          avgCPI: costed.avgCPI.toFixed(2)
+        });
+      } catch (error) {
+        console.error('Error costing proposal:', error);
+      }
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [allocations, marginPercentage, selectedBidId]);
 
   if (loading) {
     return (
@@ -457,10 +410,19 @@ const ProposalForm = () => {
         {(!proposalId || proposalId === 'new') ? (
           <Box sx={{ mb: 3 }}>
             <Autocomplete
-              options={dropdownBids}
+              options={bidOptions}
+              filterOptions={(options) => options}
               getOptionLabel={(option) => option.bid_number || ''}
-              value={dropdownBids.find(b => b.id === selectedBidId) || null}
+              renderOption={(props, option) => (
+                <li {...props} key={option.id}>
+                  {option.bid_number} - {option.study_name} ({option.client_name})
+                </li>
+              )}
+              value={selectedBid}
+              onInputChange={(event, newInput) => setBidQuery(newInput)}
+              noOptionsText={bidQuery.trim() ? 'No matching bids' : 'Type to search bids'}
               onChange={(event, newValue) => {
+                setSelectedBid(newValue);
                 setSelectedBidId(newValue ? newValue.id : '');
                 setFormData(prev => ({ ...prev, bid_id: newValue ? newValue.id : '' }));
               }}
@@ -488,7 +450,7 @@ const ProposalForm = () => {
           <Box sx={{ flex: 1 }}>
             <Typography variant="subtitle1" sx={{ fontWeight: 700, mb: 1 }}>Bid Information</Typography>
             <Box sx={{ display: 'flex', flexDirection: 'column', gap: 0.5 }}>
-              <Box><b>Bid Number:</b> {selectedBidId ? (bids.find(b => b.id === selectedBidId)?.bid_number || '') : ''}</Box>
+              <Box><b>Bid Number:</b> {selectedBidId ? (bidDetails?.bid_number || '') : ''}</Box>
               <Box><b>Study Name:</b> {bidDetails?.study_name || ''}</Box>
               <Box><b>Client:</b> {bidDetails?.client_name || ''}</Box>
               <Box><b>Methodology:</b> {bidDetails?.methodology || ''}</Box>
@@ -552,14 +514,10 @@ const ProposalForm = () => {
                                 {bidDetails.partners.map(partner => {
                                   const alloc = allocations[audience.id]?.[country]?.[partner.id] || {};
                                   console.log('DEBUG table alloc:', {audienceId: audience.id, country, partnerId: partner.id, alloc});
-                                  const resp = getPartnerResponse(audience.id, country, partner.id);
-                                  console.log('DEBUG row:', {audienceId: audience.id, country, partnerId: partner.id, resp, timeline: resp.timeline});
+                                  const cellKey = `${audience.id}|${country}|${partner.id}`;
+                                  const rate = rates[cellKey] || {};
                                   const isSelected = !!alloc.selected;
-                                  const allocation = parseFloat(alloc.allocation) || 0;
-                                  const cpi = parseFloat(resp.cpi) || 0;
-                                  const salesPrice = cpi ? (cpi * (1 + marginPercentage / 100)) : 0;
-                                  const cost = isSelected ? (allocation * cpi).toFixed(2) : '0.00';
-                                  const revenue = isSelected ? (allocation * salesPrice).toFixed(2) : '0.00';
+                                  const line = isSelected ? lines[cellKey] : null;
                                   return (
                                     <TableRow key={partner.id}>
                                       <TableCell>
@@ -569,7 +527,7 @@ const ProposalForm = () => {
                                         />
                                       </TableCell>
                                       <TableCell>{partner.partner_name}</TableCell>
-                                      <TableCell>{resp.commitment_type === 'be_max' ? 'BE/Max' : (resp.commitment ?? '')}</TableCell>
+                                      <TableCell>{rate.commitment_type === 'be_max' ? 'BE/Max' : (rate.commitment ?? '')}</TableCell>
                                       <TableCell>
                                         <TextField
                                           size="small"
@@ -582,7 +540,7 @@ const ProposalForm = () => {
                                       <TableCell>
                                         <TextField
                                           size="small"
-                                          value={resp.cpi || ''}
+                                          value={(line ? line.cpi : rate.cpi) || ''}
                                           disabled
                                           sx={{ width: 80 }}
                                         />
@@ -590,13 +548,13 @@ const ProposalForm = () => {
                                       <TableCell>
                                         <TextField
                                           size="small"
-                                          value={isSelected && resp.cpi ? salesPrice.toFixed(2) : ''}
+                                          value={line && line.cpi ? line.salesPrice.toFixed(2) : ''}
                                           disabled
                                           sx={{ width: 80 }}
                                         />
                                       </TableCell>
-                                      <TableCell>{isSelected ? cost : '0.00'}</TableCell>
-                                      <TableCell>{isSelected ? revenue : '0.00'}</TableCell>
+                                      <TableCell>{line ? line.cost.toFixed(2) : '0.00'}</TableCell>
+                                      <TableCell>{line ? line.revenue.toFixed(2) : '0.00'}</TableCell>
                                     </TableRow>
                                   );
                                 })}
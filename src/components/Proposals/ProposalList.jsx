@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import axios from '../../api/axios';
-import { Table, TableBody, TableCell, TableContainer, TableHead, TableRow, Paper, Button, Typography, Box, Tooltip, IconButton } from '@mui/material';
+import { Table, TableBody, TableCell, TableContainer, TableHead, TableRow, TablePagination, Paper, Button, Typography, Box, Tooltip, IconButton } from '@mui/material';
 import { useNavigate } from 'react-router-dom';
 import AddIcon from '@mui/icons-material/Add';
 import EditIcon from '@mui/icons-material/Edit';
@@ -10,6 +10,9 @@ const ProposalList = () => {
   console.log('ProposalList component rendered'); // Debug log
   
   const [proposals, setProposals] = useState([]);
+  const [page, setPage] = useState(0);
+  const [rowsPerPage, setRowsPerPage] = useState(20);
+  const [total, setTotal] = useState(0);
   const navigate = useNavigate();
 
   useEffect(() => {
@@ -17,15 +20,18 @@ const ProposalList = () => {
     const fetchProposals = async () => {
       try {
         console.log('Fetching proposals...'); // Debug log
-        const res = await axios.get('/api/proposals');
+        const res = await axios.get('/api/proposals', {
+          params: { page: page + 1, page_size: rowsPerPage }
+        });
         console.log('Proposals response:', res.data); // Debug log
-        setProposals(res.data);
+        setProposals(res.data.proposals);
+        setTotal(res.data.total);
       } catch (error) {
         console.error('Error fetching proposals:', error);
       }
     };
     fetchProposals();
-  }, []);
+  }, [page, rowsPerPage]);
 
   // Helper to flatten allocations for CSV
   function flattenAllocations(proposal) {
@@ -187,6 +193,18 @@ const ProposalList = () => {
               ))}
             </TableBody>
           </Table>
+          <TablePagination
+            component="div"
+            count={total}
+            page={page}
+            onPageChange={(e, newPage) => setPage(newPage)}
+            rowsPerPage={rowsPerPage}
+            onRowsPerPageChange={(e) => {
+              setRowsPerPage(parseInt(e.target.value, 10));
+              setPage(0);
+            }}
+            rowsPerPageOptions={[10, 20, 50, 100]}
+          />
         </TableContainer>
       )}
     </Box>
@@ -1,14 +1,56 @@
 import { defineConfig } from "vite";
+import type { Plugin } from "vite";
 import react from "@vitejs/plugin-react";
+import { brotliCompressSync, gzipSync, constants } from "node:zlib";
+import { readdirSync, readFileSync, statSync, writeFileSync } from "node:fs";
+import { join, resolve } from "node:path";
+
+const COMPRESSIBLE = /\.(js|mjs|css|html|svg|json|txt|map)$/;
+
+// Writes .br and .gz copies of the text build output, which the Flask
+// static layer (backend/static_assets.py) serves as-is instead of
+// compressing on every request.
+function precompress(): Plugin {
+  let outDir = "dist";
+  const walk = (dir: string): string[] =>
+    readdirSync(dir).flatMap((name) => {
+      const path = join(dir, name);
+      return statSync(path).isDirectory() ? walk(path) : [path];
+    });
+  return {
+    name: "precompress",
+    apply: "build",
+    configResolved(config) {
+      outDir = resolve(config.root, config.build.outDir);
+    },
+    closeBundle() {
+      for (const file of walk(outDir)) {
+        if (!COMPRESSIBLE.test(file)) continue;
+        const source = readFileSync(file);
+        if (source.length < 1024) continue;
+        const br = brotliCompressSync(source, {
+          params: { [constants.BROTLI_PARAM_QUALITY]: 11 },
+        });
+        if (br.length < source.length) writeFileSync(`${file}.br`, br);
+        const gz = gzipSync(source, { level: 9 });
+        if (gz.length < source.length) writeFileSync(`${file}.gz`, gz);
+      }
+    },
+  };
+}
 
 export default defineConfig({
-  plugins: [react()],
+  plugins: [react(), precompress()],
+  build: {
+    // dist/.vite/manifest.json lists the content-hashed files
+    manifest: true,
+  },
   server: {
     host: "0.0.0.0",
     port: 3000,
     proxy: {
       "/api": {
-        target: process.env.NODE_ENV === "production" 
+        target: process.env.NODE_ENV === "production"
           ? "https://bidm-smartprocure.replit.app"
           : "http://0.0.0.0:5000",
         changeOrigin: true,
@@ -25,4 +67,4 @@ export default defineConfig({
     host: "0.0.0.0",
     port: 3000,
   },
-});
\ No newline at end of file
+});